@@ -1,5 +1,5 @@
 from django.contrib import admin 
-from accounts.models import CustomUserModel  , Role
+from accounts.models import CustomUserModel  , Role , ProfileSample
 # Register your models here.
 
 @admin.register(CustomUserModel)
@@ -9,3 +9,9 @@ class Custom(admin.ModelAdmin):
 @admin.register(Role)
 class RoleAdmin(admin.ModelAdmin):
     pass
+
+@admin.register(ProfileSample)
+class ProfileSampleAdmin(admin.ModelAdmin):
+    list_display = ["created_at", "method", "path", "status", "duration_ms", "queries", "forced"]
+    list_filter = ["forced", "method", "status"]
+    search_fields = ["path", "view_name", "=sample_id"]
@@ -0,0 +1,247 @@
+"""
+Async variants of the login, refresh, logout and Google callback views.
+
+DRF has no async views, so these are plain Django async views that mirror the
+request/response contract of their DRF counterparts in views.py (same JSON
+bodies, cookies, expiry headers and throttles). Under ASGI (uvicorn) they
+never hold a worker thread while waiting: the ORM is used through its async
+API, Redis through redis.asyncio (common.aio_redis), password hashing and the
+Google HTTP calls run on worker threads.
+
+Routed on the canonical paths, in place of the DRF views, only when
+ASYNC_AUTH_VIEWS is on (see accounts/urls.py).
+"""
+import json
+import logging
+import math
+from django.conf import settings
+from django.contrib.auth import aauthenticate
+from django.http import JsonResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from authentication import EncryptedRefreshToken, oauth_state, google
+from authentication.tokens import arefresh_flight_key, aforget_refresh_flights
+from authentication.expiry_hints import set_expiry_headers
+from authentication.hashers import HashingOverloaded
+from middleware import get_refresh_token
+from common.exceptions import as_api_exception
+from common.throttling import SlidingWindowThrottle
+from common.single_flight import asingle_flight
+
+logger = logging.getLogger(__name__)
+
+
+# ===============================
+# Base for the async views
+# JSON body parsing and the sliding-window throttle, no DRF machinery
+# ===============================
+class AsyncAPIView(View):
+    throttle_scope = None
+    throttle_account_field = None
+    throttle_account_header = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Cookie-authenticated JSON endpoints, exempt like DRF's APIView
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.content_type == "application/json":
+            try:
+                request.data = json.loads(request.body or b"{}")
+            except ValueError:
+                return JsonResponse({"detail": "JSON parse error"}, status=400)
+            if not isinstance(request.data, dict):
+                return JsonResponse({"detail": "Expected a JSON object"}, status=400)
+        else:
+            request.data = request.POST
+
+        throttle = SlidingWindowThrottle()
+        if not await throttle.aallow_request(request, self):
+            wait = throttle.wait()
+            response = JsonResponse({"detail": f"Request was throttled. Expected available in {wait} seconds."}, status=429)
+            response["Retry-After"] = str(wait)
+            return response
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except (APIException, HashingOverloaded) as exc:
+            # What DRF's exception handler does, e.g. a 503 when the hash pool is full
+            exc = as_api_exception(exc)
+            response = JsonResponse({"detail": exc.detail}, status=exc.status_code)
+            if getattr(exc, "wait", None):
+                response["Retry-After"] = str(math.ceil(exc.wait))
+            return response
+
+
+# ===============================
+# Login endpoint (async)
+# Authenticates user and sets JWT tokens in HttpOnly cookies
+# ===============================
+class AsyncLogInView(AsyncAPIView):
+    throttle_scope = "login"
+    throttle_account_field = "username_or_email"
+
+    async def post(self, request):
+        username_or_email = request.data.get("username_or_email")
+        password = request.data.get("password")
+        errors = {name: ["This field is required."] for name in ("username_or_email", "password") if not request.data.get(name)}
+        if errors:
+            return JsonResponse(errors, status=400)
+
+        # UsernameOrEmailBackend.aauthenticate: async ORM, hashing on a worker thread
+        user = await aauthenticate(request, username=username_or_email, password=password)
+        if not user:
+            return JsonResponse({"non_field_errors": ["Invalid username or email"]}, status=400)
+        if not user.is_active:
+            return JsonResponse({"non_field_errors": ["Incorrect password or inactive user"]}, status=400)
+
+        refresh = await EncryptedRefreshToken.afor_user(user)
+        token = await refresh.aaccess_token()
+        uid = user.id
+
+        response = JsonResponse({
+            "detail": "Logged in successfully",
+            "user_id": uid,
+        }, status=200)
+        response.set_cookie(key=f"access_token_{uid}", value=str(token), samesite="None", secure=True, httponly=True, max_age=60*60*60*60)
+        response.set_cookie(key=f"refresh_token_{uid}", value=refresh.encrypt(), samesite="None", secure=True, httponly=True, max_age=60*60*60*60)
+        set_expiry_headers(response, token)
+
+        logger.debug(f"User {uid} logged in successfully (async)")
+        return response
+
+
+# ===============================
+# Google OAuth callback (async)
+# Exchanges authorization code for tokens, creates/updates user
+# ===============================
+class AsyncGoogleAuthCallbackView(AsyncAPIView):
+
+    async def get(self, request):
+        code = request.GET.get('code')
+        state = request.GET.get('state')
+
+        if not await oauth_state.aconsume(request, state):
+            logger.warning("State mismatch in Google callback")
+            response = JsonResponse({"error": "Invalid state"}, status=400)
+            oauth_state.clear_cookie(response)
+            return response
+
+        try:
+            claims = await google.alogin_claims(code)
+        except google.GoogleAuthError as e:
+            logger.warning(f"Google login failed: {e}")
+            return JsonResponse({"error": "token Error with google"}, status=400)
+
+        user, created = await google.aupsert_user(claims)
+        if created:
+            logger.debug(f"New user created from Google login: {user.email}")
+
+        refresh = await EncryptedRefreshToken.afor_user(user)
+        access = await refresh.aaccess_token()
+
+        response = JsonResponse({
+            "message": "Login successful",
+            "user": {
+                "email": user.email,
+                "first_name": user.first_name,
+                "last_name": user.last_name
+            }
+        })
+        uid = user.id
+        response.set_cookie(key=f"access_token_{uid}", value=str(access), httponly=True, secure=True, samesite="None")
+        response.set_cookie(key=f"refresh_token_{uid}", value=str(refresh), httponly=True, secure=True, samesite="None")
+        set_expiry_headers(response, access)
+        oauth_state.clear_cookie(response)
+        return response
+
+
+# ===============================
+# Refresh token endpoint (async)
+# Same single-flight key as RefreshTokenView, so sync and async workers share results
+# ===============================
+class AsyncRefreshTokenView(AsyncAPIView):
+    throttle_scope = "refresh"
+    throttle_account_header = "X-Active-User"
+
+    async def post(self, request):
+        active_user_id = request.headers.get("X-Active-User")
+        if not active_user_id:
+            logger.warning("Missing X-Active-User header on token refresh")
+            return JsonResponse({"error": "Missing X-Active-User"}, status=400)
+
+        refresh_token = get_refresh_token(request)
+        if not refresh_token:
+            logger.warning(f"No refresh token found for user {active_user_id}")
+            return JsonResponse({"error": "No refresh token"}, status=400)
+
+        flight_key = await arefresh_flight_key(refresh_token)
+        if flight_key is None:
+            logger.warning(f"Malformed refresh token for user {active_user_id}")
+            return JsonResponse({"error": "Invalid refresh"}, status=400)
+
+        result = await asingle_flight(
+            flight_key,
+            lambda: self.mint(refresh_token),
+            ttl=getattr(settings, "REFRESH_SINGLE_FLIGHT_TTL", 2),
+            wait=getattr(settings, "REFRESH_SINGLE_FLIGHT_WAIT", 3),
+        )
+        if "error" in result:
+            logger.warning(f"Invalid refresh token for user {active_user_id}")
+            return JsonResponse({"error": result["error"]}, status=400)
+
+        response = JsonResponse({"message": "Token refreshed"}, status=200)
+        response.set_cookie(key=f"access_token_{active_user_id}", value=result["access"])
+        if result.get("refresh"):
+            response.set_cookie(key=f"refresh_token_{active_user_id}", value=result["refresh"], samesite="None", secure=True, httponly=True)
+        set_expiry_headers(response, result["access"])
+        return response
+
+    @staticmethod
+    async def mint(refresh_token):
+        """RefreshTokenView.mint() with async token-state and user lookups."""
+        try:
+            refresh = await EncryptedRefreshToken.averified(refresh_token)
+            result = {"access": str(await refresh.aaccess_token())}
+            if api_settings.ROTATE_REFRESH_TOKENS:
+                if api_settings.BLACKLIST_AFTER_ROTATION:
+                    await refresh.ablacklist()
+                refresh.set_jti()
+                refresh.set_exp()
+                refresh.set_iat()
+                await refresh.aoutstand()
+                result["refresh"] = refresh.encrypt()
+        except TokenError:
+            return {"error": "Invalid refresh"}
+        return result
+
+
+# ===============================
+# Logout endpoint (async)
+# Blacklists refresh token and deletes cookies; the refresh cookie is the credential
+# ===============================
+class AsyncLogoutView(AsyncAPIView):
+
+    async def post(self, request):
+        active_user_id = request.headers.get("X-Active-User")
+        if not active_user_id:
+            logger.warning("Missing X-Active-User header on logout")
+            return JsonResponse({"error": "Missing X-Active-User header"}, status=400)
+
+        refresh_token = get_refresh_token(request)
+        if refresh_token:
+            try:
+                token = await EncryptedRefreshToken.averified(refresh_token)
+                await token.ablacklist()
+                logger.debug(f"Refresh token blacklisted for user {active_user_id}")
+            except TokenError:
+                logger.warning(f"Refresh token invalid or expired for user {active_user_id}")
+            await aforget_refresh_flights(refresh_token)
+
+        response = JsonResponse({"message": "Logged out successfully"}, status=200)
+        response.delete_cookie(f"access_token_{active_user_id}")
+        response.delete_cookie(f"refresh_token_{active_user_id}")
+        return response
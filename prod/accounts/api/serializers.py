@@ -81,13 +81,24 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUserModel
         fields = [
-            'username', 'email', 'first_name', 'last_name',
+            'id', 'username', 'email', 'first_name', 'last_name',
             'password', 'password2', 'role', 'is_active',
             'is_verified', 'role_id'
         ]
         read_only_fields = ['is_active', 'is_verified']
         extra_kwargs = {'password': {'write_only': True}}
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Sparse fieldsets: context['fields'] (from ?fields=) limits readable output;
+        # `id` is only included when explicitly requested
+        requested = self.context.get('fields')
+        for name in list(self.fields):
+            if self.fields[name].write_only:
+                continue
+            if requested is None and name == 'id' or requested is not None and name not in requested:
+                self.fields.pop(name)
+
     def get_role(self, obj):
         # Serialize roles assigned to user
         roles = obj.role.all()
@@ -98,7 +109,7 @@ class UserSerializer(serializers.ModelSerializer):
         user = self.context['request'].user
         data = super().to_representation(instance)
         if not user.is_superuser and user != instance:
-            allowed = ['username', 'first_name', 'last_name', 'role']
+            allowed = ['id', 'username', 'first_name', 'last_name', 'role']
             data = {k: v for k, v in data.items() if k in allowed}
         return data
 
@@ -151,6 +162,89 @@ class UserSerializer(serializers.ModelSerializer):
         return instance
 
 
+# ===============================
+# Read-only fast path for user listings
+# Rows come from queryset.values(); roles are fetched with one join query
+# and every distinct role dict is built once per page and shared
+# Output is identical to UserSerializer (same keys, order and visibility)
+# ===============================
+class UserListSerializer(serializers.BaseSerializer):
+    # UserSerializer readable fields, in output order; `id` only when asked for
+    FIELDS = ['id', 'username', 'email', 'first_name', 'last_name', 'role', 'is_active', 'is_verified']
+    DEFAULT_FIELDS = FIELDS[1:]
+    # What non-superusers may see of other users
+    PUBLIC_FIELDS = {'id', 'username', 'first_name', 'last_name', 'role'}
+
+    @classmethod
+    def output_fields(cls, fields=None):
+        if fields is None:
+            return cls.DEFAULT_FIELDS
+        return [name for name in cls.FIELDS if name in fields]
+
+    @classmethod
+    def values_for(cls, user, fields=None):
+        """Columns to select with .values(); id and username are always needed (roles, cursor)."""
+        names = cls.output_fields(fields)
+        if not user.is_superuser:
+            names = [name for name in names if name in cls.PUBLIC_FIELDS]
+        return ['id', 'username'] + [name for name in names if name not in ('id', 'username', 'role')]
+
+    @classmethod
+    def row_for(cls, user):
+        """Row for an in-memory user (the requester), without a query."""
+        return {name: getattr(user, name) for name in cls.FIELDS if name != 'role'}
+
+    @staticmethod
+    def fetch_roles(user_ids):
+        """user id -> list of role dicts; one query, one dict per distinct role."""
+        through = CustomUserModel.role.through
+        rows = through.objects.filter(customusermodel_id__in=user_ids).order_by('id').values_list(
+            'customusermodel_id', 'role_id', 'role__permissions', 'role__level'
+        )
+        roles, by_user = {}, {}
+        for user_id, role_id, permissions, level in rows:
+            role = roles.get(role_id)
+            if role is None:
+                role = roles[role_id] = {'id': role_id, 'permissions': permissions, 'level': level}
+            by_user.setdefault(user_id, []).append(role)
+        return by_user
+
+    def to_representation(self, rows):
+        user = self.context['request'].user
+        private = self.output_fields(self.context.get('fields'))
+        public = [name for name in private if name in self.PUBLIC_FIELDS]
+        with_roles = 'role' in private
+
+        rows = list(rows)
+        roles = self.fetch_roles([row['id'] for row in rows]) if with_roles else {}
+        data = []
+        for row in rows:
+            row_id = row['id']
+            is_self = row_id == user.pk
+            names = private if user.is_superuser or is_self else public
+            if is_self and any(name not in row for name in names if name != 'role'):
+                row = self.row_for(user)
+            if with_roles:
+                row['role'] = roles.get(row_id, [])
+            data.append({name: row[name] for name in names})
+        return data
+
+
+# ===============================
+# Serializer for one bulk provisioning row
+# No per-row uniqueness queries; duplicates are checked per chunk by accounts.provisioning
+# ===============================
+class BulkUserRowSerializer(serializers.Serializer):
+    """Validates one input row without per-row uniqueness queries."""
+    username = serializers.CharField(max_length=20)
+    email = serializers.EmailField()
+    first_name = serializers.CharField(max_length=30, required=False, allow_blank=True, default="")
+    last_name = serializers.CharField(max_length=40, required=False, allow_blank=True, default="")
+    password = serializers.CharField(required=False, allow_null=True, default=None, write_only=True)
+    roles = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    is_active = serializers.BooleanField(required=False, default=False)
+
+
 # ===============================
 # Serializer for login
 # Handles username/email authentication and JWT token generation
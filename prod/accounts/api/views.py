@@ -1,28 +1,38 @@
 import logging
-import uuid
-import requests
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.http import urlsafe_base64_decode
 from django.utils.encoding import force_str
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework_simplejwt.tokens import RefreshToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.authentication import JWTAuthentication 
 from accounts.models import CustomUserModel
-from .serializers import UserSerializer, SignUpSer, LogInSerializer , ResetSerializer , PasswordSerializer
+from accounts.provisioning import provision_users
+from .serializers import UserSerializer, UserListSerializer, SignUpSer, LogInSerializer , ResetSerializer , PasswordSerializer
 from common.permissions import RoleBasePermission
+from common.throttling import SlidingWindowThrottle
+from common.single_flight import single_flight
 from authentication import activation_token_generator , password_reset_token
 from authentication import EncryptedRefreshToken
-from common.pagination import UserPagination
+from common.pagination import UserPagination, UserCursorPagination
 from django.core.cache import cache
 from accounts.models import Role
-from django.db.models import Prefetch , Case , When , BooleanField
+from django.db.models import Prefetch , Case , When , BooleanField , Max
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.http import JsonResponse
+from common import metrics
+from common.conditional import make_etag, not_modified, list_generation, set_validators
+from authentication import user_cache, hashers, token_cache, oauth_state, google
+from authentication.tokens import refresh_flight_key, forget_refresh_flights
+from authentication.expiry_hints import set_expiry_headers
+from middleware import get_refresh_token
 
 logger = logging.getLogger(__name__)
 User = CustomUserModel
@@ -34,32 +44,140 @@ User = CustomUserModel
 class UserViewSet(viewsets.ModelViewSet):
     serializer_class = UserSerializer
     permission_classes = [RoleBasePermission]
-    pagination_class = UserPagination
     queryset = CustomUserModel.objects.none()
-    
+
+    @property
+    def pagination_class(self):
+        # "cursor" (keyset, default) or "page" (legacy page numbers)
+        if getattr(settings, "USER_LIST_PAGINATION", "cursor") == "page":
+            return UserPagination
+        return UserCursorPagination
+
+    def get_requested_fields(self):
+        """Parse ?fields=username,id into a list (None when not given)."""
+        if not hasattr(self, '_requested_fields'):
+            raw = self.request.query_params.get('fields') if self.request else None
+            fields = None
+            if raw:
+                fields = [name.strip() for name in raw.split(',') if name.strip()]
+                unknown = sorted(set(fields) - set(UserListSerializer.FIELDS))
+                if unknown:
+                    raise ValidationError({"fields": f"Unknown fields: {', '.join(unknown)}"})
+            self._requested_fields = fields
+        return self._requested_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = self.get_requested_fields()
+        return context
+
     def get_queryset(self):
         user = self.request.user
-
-        # Superuser receives full dataset
-        if user.is_superuser:
-            return CustomUserModel.objects.all().select_related('manager').prefetch_related(
+        listing = self.action == 'list'
+        fields = self.get_requested_fields()
+
+        qs = CustomUserModel.objects.all()
+        if listing:
+            # Flat rows for UserListSerializer; roles are fetched per page
+            qs = qs.values(*UserListSerializer.values_for(user, fields))
+        elif fields is not None and self.action == 'retrieve':
+            # Sparse fieldset: load only the requested columns, roles only if asked
+            columns = UserListSerializer.values_for(user, fields)
+            qs = qs.only(*columns)
+            if 'role' in fields:
+                qs = qs.prefetch_related(Prefetch('role', queryset=Role.objects.all()))
+            return qs
+        else:
+            qs = qs.select_related('manager').prefetch_related(
                 Prefetch('role', queryset=Role.objects.all())
             )
 
-        # Annotate current user to appear first in the list
-        qs = CustomUserModel.objects.all().select_related('manager').prefetch_related(
-            Prefetch('role', queryset=Role.objects.all())
-        ).annotate(
-            is_current_user=Case(
-                When(pk=user.pk, then=True),
-                default=False,
-                output_field=BooleanField()
-            )
-        ).order_by('-is_current_user', 'username')  # current user first
+        # Superuser receives full dataset
+        if user.is_superuser:
+            return qs
+
+        if self.pagination_class is UserPagination:
+            # Annotate current user to appear first in the list
+            qs = qs.annotate(
+                is_current_user=Case(
+                    When(pk=user.pk, then=True),
+                    default=False,
+                    output_field=BooleanField()
+                )
+            ).order_by('-is_current_user', 'username')  # current user first
 
         # Defer sensitive fields for other users
-        qs = qs.defer('password', 'email')
+        if not listing:
+            qs = qs.defer('password', 'email')
         return qs
+
+    def get_validator_parts(self):
+        """None when validators can't be trusted (generation counter unavailable)."""
+        generation = list_generation()
+        if generation is None:
+            return None
+        # Who is asking decides visibility; the query string decides page/fields
+        user = self.request.user
+        return (user.pk, user.is_superuser, self.request.get_full_path(), generation)
+
+    def list_etag(self):
+        """
+        Inserts/updates move max(updated_at) (index-only lookup); deletes and role
+        changes bump the list generation. No COUNT(*) over the table.
+        """
+        parts = self.get_validator_parts()
+        if parts is None:
+            return None
+        last = CustomUserModel.objects.aggregate(last=Max('updated_at'))['last']
+        return make_etag('list', *parts, last)
+
+    def list(self, request, *args, **kwargs):
+        etag = self.list_etag()
+        if etag is None:
+            return self._list(request)
+        response = not_modified(request, etag=etag)
+        if response is not None:
+            return response
+        response = self._list(request)
+        return set_validators(response, etag=etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        parts = self.get_validator_parts()
+        try:
+            state = CustomUserModel.objects.filter(pk=kwargs.get(self.lookup_field)).values_list(
+                'updated_at', 'roles_version'
+            ).first()
+        except (TypeError, ValueError):
+            state = None
+        if parts is None or state is None:
+            return super().retrieve(request, *args, **kwargs)
+        # ETag only: role changes move roles_version but not updated_at, and
+        # updated_at has one-second resolution, so Last-Modified would go stale
+        etag = make_etag('detail', *parts, *state)
+        response = not_modified(request, etag=etag)
+        if response is not None:
+            return response
+        response = super().retrieve(request, *args, **kwargs)
+        return set_validators(response, etag=etag)
+
+    def _list(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        # In cursor mode the current user is prepended to the first page instead
+        # of being sorted in with a CASE (which defeats the keyset index)
+        current_first = self.pagination_class is UserCursorPagination and not request.user.is_superuser
+        if current_first:
+            queryset = queryset.exclude(pk=request.user.pk)
+
+        page = self.paginate_queryset(queryset)
+        rows = list(page if page is not None else queryset)
+        if current_first and self.paginator.is_first_page():
+            rows.insert(0, UserListSerializer.row_for(request.user))
+
+        data = UserListSerializer(rows, context=self.get_serializer_context()).data
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
     
     def create(self, request, *args, **kwargs):
         # Create user using serializer
@@ -69,6 +187,21 @@ class UserViewSet(viewsets.ModelViewSet):
         logger.debug(f"Created user {result.get('user')}")
         return Response(result, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'], url_path='bulk', permission_classes=[IsAdminUser])
+    def bulk(self, request):
+        # Bulk provisioning: {"users": [...], "send_emails": true}; bad rows are reported, not fatal
+        rows = request.data.get('users') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list):
+            raise ValidationError({'users': 'Expected a list of user objects'})
+        limit = getattr(settings, 'BULK_PROVISION_MAX_ROWS', 5000)
+        if len(rows) > limit:
+            raise ValidationError({'users': f'At most {limit} rows per request; use the provision_users command'})
+        send_emails = request.data.get('send_emails', True) if isinstance(request.data, dict) else True
+        result = provision_users(rows, send_emails=bool(send_emails))
+        logger.info(f"Bulk provisioned {len(result.created)} users, {len(result.errors)} rejected")
+        code = status.HTTP_201_CREATED if not result.errors else status.HTTP_207_MULTI_STATUS
+        return Response(result.as_dict(), status=code)
+
 
 # ===============================
 # Sign-up endpoint
@@ -77,6 +210,9 @@ class UserViewSet(viewsets.ModelViewSet):
 class SignUpView(APIView):
     authentication_classes = []
     permission_classes = [AllowAny]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = "signup"
+    throttle_account_field = "email"
     serializer_class = SignUpSer
 
     def post(self, request):
@@ -95,6 +231,7 @@ class SignUpView(APIView):
         # Set HttpOnly cookies for JWT access and refresh tokens
         response.set_cookie(key=f"access_token_{uid}", value=str(token) , samesite="Lax" ,max_age=3600)
         response.set_cookie(key=f"refresh_token_{uid}", value=str(refresh) , samesite="Lax",httponly=True,secure=False,max_age=3600)
+        set_expiry_headers(response, token)
 
         logger.debug(f"Signup completed for user id {uid}")
         
@@ -108,6 +245,9 @@ class SignUpView(APIView):
 class LogInView(APIView):
     authentication_classes = []
     permission_classes = [AllowAny]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = "login"
+    throttle_account_field = "username_or_email"
     serializer_class = LogInSerializer
 
     def post(self, request):
@@ -126,6 +266,7 @@ class LogInView(APIView):
         # Set HttpOnly cookies
         response.set_cookie(key=f"access_token_{uid}",value=str(token),samesite="None" ,secure=True , httponly=True, max_age=60*60*60*60)
         response.set_cookie(key=f"refresh_token_{uid}", value=str(refresh),samesite="None", secure=True,httponly=True, max_age=60*60*60*60)
+        set_expiry_headers(response, token)
     
         logger.debug(f"User {uid} logged in successfully")
         logger.debug(f"it`s the response before edition {response}")
@@ -168,23 +309,11 @@ class GoogleAuthInitView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        state = str(uuid.uuid4())
-        request.session['google_auth_state'] = state
-        request.session.modified = True
+        state = oauth_state.new_state()
         logger.debug(f"Generated state: {state}")
-        logger.debug(f"Session after setting state: {request.session.items()}")
-        google_url = (
-            f"https://accounts.google.com/o/oauth2/v2/auth?"
-            f"client_id={settings.GOOGLE_CLIENT_ID}&"
-            f"redirect_uri={settings.GOOGLE_REDIRECT_URI}&"
-            f"response_type=code&"
-            f"scope=openid email profile&"
-            f"state={state}"
-        )
-        
-        
-        
-        return JsonResponse({"url": google_url})
+        response = JsonResponse({"url": google.auth_url(state)})
+        oauth_state.set_cookie(response, state)
+        return response
 
 
 # ===============================
@@ -196,67 +325,27 @@ class GoogleAuthCallbackView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        # ✅ اطبع session info للـ debugging
-        logger.debug(f"=== CALLBACK DEBUG ===")
-        logger.debug(f"Session key: {request.session.session_key}")
-        logger.debug(f"Cookies received: {request.COOKIES}")
-        
         code = request.query_params.get('code')
         state = request.query_params.get('state')
-        session_state = request.session.get('google_auth_state')
-
         logger.debug(f"State from Google callback: {state}")
-        logger.debug(f"State from session: {session_state}")
 
-        # CSRF protection: state must match
-        if state != session_state:
+        # CSRF protection: state must match the signed cookie, once
+        if not oauth_state.consume(request, state):
             logger.warning("State mismatch in Google callback")
-            return Response({"error": "Invalid state"}, status=400)
-        del request.session['google_auth_state']
-
-        # Exchange code for tokens
-        token_url = "https://oauth2.googleapis.com/token"
-        data = {
-            "code": code,
-            "client_id": settings.GOOGLE_CLIENT_ID,
-            "client_secret": settings.GOOGLE_CLIENT_SECRET,
-            "redirect_uri": settings.GOOGLE_REDIRECT_URI,
-            "grant_type": "authorization_code",
-        }
-        
+            response = Response({"error": "Invalid state"}, status=400)
+            oauth_state.clear_cookie(response)
+            return response
 
-        token_done = requests.post(token_url, data=data)
-        token_status = token_done.status_code
-        logger.debug(f"Token response: {token_status}")
-        if  token_status != 200:
-            return Response({"error":"token Error with google"})
-        token_res = token_done.json()
-
-        access_token = token_res.get('access_token')
-
-        # Retrieve user info from Google
-        user_info_res = requests.get(
-            "https://openidconnect.googleapis.com/v1/userinfo",
-            headers={"Authorization": f"Bearer {access_token}"}
-        ).json()
-        logger.debug(f"Full Google user info: {user_info_res}")
-
-        email = user_info_res.get('email')
-        if not email:
-            logger.warning("Google account did not provide email")
-            return Response({"error": "Email not provided by Google"}, status=400)
-
-        first_name = user_info_res.get('given_name')
-        last_name = user_info_res.get('family_name')
+        # Exchange the code, then verify the id_token locally (no userinfo call)
+        try:
+            claims = google.login_claims(code)
+        except google.GoogleAuthError as e:
+            logger.warning(f"Google login failed: {e}")
+            return Response({"error": "token Error with google"}, status=400)
+        email = claims["email"]
 
-        # Create or update user
-        user, created = User.objects.get_or_create(email=email)
+        user, created = google.upsert_user(claims)
         if created:
-            user.first_name = first_name
-            user.last_name = last_name
-            user.set_unusable_password()
-            user.is_active = True
-            user.save()
             logger.debug(f"New user created from Google login: {email}")
 
         # Generate JWT tokens
@@ -275,6 +364,8 @@ class GoogleAuthCallbackView(APIView):
         # Set HttpOnly cookies
         response.set_cookie(key=f"access_token_{uid}", value=str(access), httponly=True, secure=True, samesite="None")
         response.set_cookie(key=f"refresh_token_{uid}", value=str(refresh), httponly=True, secure=True, samesite="None")
+        set_expiry_headers(response, access)
+        oauth_state.clear_cookie(response)
 
         logger.debug(f"Google login completed for user {email}")
         return response
@@ -288,6 +379,9 @@ class GoogleAuthCallbackView(APIView):
 class RefreshTokenView(APIView):
     authentication_classes = [] 
     permission_classes = [AllowAny]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = "refresh"
+    throttle_account_header = "X-Active-User"
 
     def post(self, request):
         active_user_id = request.headers.get("X-Active-User")
@@ -295,25 +389,55 @@ class RefreshTokenView(APIView):
             logger.warning("Missing X-Active-User header on token refresh")
             return Response({"error": "Missing X-Active-User"}, status=400)
 
-        refresh_token = request.refresh_token_decrypted
+        refresh_token = get_refresh_token(request)
         logger.debug(f"refresh_token: {refresh_token}")
 
         if not refresh_token:
             logger.warning(f"No refresh token found for user {active_user_id}")
             return Response({"error": "No refresh token"}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            refresh = EncryptedRefreshToken(refresh_token)
-            new_access = refresh.access_token
-        except TokenError:
-            logger.warning(f"Invalid refresh token for user {active_user_id}")
+        flight_key = refresh_flight_key(refresh_token)
+        if flight_key is None:
+            logger.warning(f"Malformed refresh token for user {active_user_id}")
             return Response({"error": "Invalid refresh"}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Tabs refreshing together share one result for REFRESH_SINGLE_FLIGHT_TTL seconds
+        result = single_flight(
+            flight_key,
+            lambda: self.mint(refresh_token),
+            ttl=getattr(settings, "REFRESH_SINGLE_FLIGHT_TTL", 2),
+            wait=getattr(settings, "REFRESH_SINGLE_FLIGHT_WAIT", 3),
+        )
+        if "error" in result:
+            logger.warning(f"Invalid refresh token for user {active_user_id}")
+            return Response({"error": result["error"]}, status=status.HTTP_400_BAD_REQUEST)
+
         response = Response({"message": "Token refreshed"}, status=200)
-        response.set_cookie(key=f"access_token_{active_user_id}", value=str(new_access))
+        response.set_cookie(key=f"access_token_{active_user_id}", value=result["access"])
+        if result.get("refresh"):
+            response.set_cookie(key=f"refresh_token_{active_user_id}", value=result["refresh"], samesite="None", secure=True, httponly=True)
+        set_expiry_headers(response, result["access"])
         logger.debug(f"Access token refreshed for user {active_user_id}")
         return response
 
+    @staticmethod
+    def mint(refresh_token):
+        """New access token, plus a rotated (encrypted) refresh token when rotation is on."""
+        try:
+            refresh = EncryptedRefreshToken(refresh_token)
+            result = {"access": str(refresh.access_token)}
+            if api_settings.ROTATE_REFRESH_TOKENS:
+                if api_settings.BLACKLIST_AFTER_ROTATION:
+                    refresh.blacklist()
+                refresh.set_jti()
+                refresh.set_exp()
+                refresh.set_iat()
+                refresh.outstand()
+                result["refresh"] = refresh.encrypt()
+        except TokenError:
+            return {"error": "Invalid refresh"}
+        return result
+
 
 # ===============================
 # Logout endpoint
@@ -326,7 +450,7 @@ class LogoutView(APIView):
             logger.warning("Missing X-Active-User header on logout")
             return Response({"error": "Missing X-Active-User header"}, status=400)
 
-        refresh_token = request.refresh_token_decrypted
+        refresh_token = get_refresh_token(request)
 
         if refresh_token:
             try:
@@ -335,6 +459,7 @@ class LogoutView(APIView):
                 logger.debug(f"Refresh token blacklisted for user {active_user_id}")
             except TokenError:
                 logger.warning(f"Refresh token invalid or expired for user {active_user_id}")
+            forget_refresh_flights(refresh_token)
 
         response = Response({"message": "Logged out successfully"}, status=status.HTTP_200_OK)
         response.delete_cookie(f"access_token_{active_user_id}")
@@ -344,12 +469,35 @@ class LogoutView(APIView):
         return response
 
 
+# ===============================
+# Logout everywhere endpoint
+# Revokes every token of the user with one epoch bump and deletes cookies
+# ===============================
+class LogoutAllView(APIView):
+    # Only the caller's own sessions are touched: no role check
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        active_user_id = request.headers.get("X-Active-User")
+        request.user.revoke_all_sessions()
+
+        response = Response({"message": "Logged out of all sessions"}, status=status.HTTP_200_OK)
+        response.delete_cookie(f"access_token_{active_user_id}")
+        response.delete_cookie(f"refresh_token_{active_user_id}")
+
+        logger.debug(f"User {request.user.pk} logged out of all sessions")
+        return response
+
+
 # ===============================
 # Password reset initiation endpoint
 # Sends reset link via email
 # ===============================
 class ResetPassword(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [SlidingWindowThrottle]
+    throttle_scope = "reset"
+    throttle_account_field = "email"
     serializer_class = ResetSerializer
 
     def post(self, request):
@@ -390,3 +538,18 @@ class PasswordResetConfirmView(APIView):
         logger.debug(f"Password reset successful for user {uid}")
 
         return Response({"detail": "Password updated successfully."}, status=status.HTTP_200_OK)
+
+
+# ===============================
+# Worker metrics endpoint
+# Per-process counters (cache hit rates ...) of the worker serving the request
+# ===============================
+class MetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        data = metrics.snapshot_all()
+        data["user_cache"] = user_cache.get_stats()
+        data["password_hashing"] = hashers.get_stats()
+        data["access_token_cache"] = token_cache.get_stats()
+        return Response(data, status=status.HTTP_200_OK)
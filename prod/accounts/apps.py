@@ -10,7 +10,13 @@ class AccountsConfig(AppConfig):
 
 
     def ready(self):
+        from django.core import checks
+        from authentication.token_state import check_token_state_cache
+        checks.register(check_token_state_cache)
         from accounts.signals import assign_default_role
         from accounts.signals import clear_role_cache
+        from accounts.signals import clear_user_cache
+        from accounts.signals import bump_roles_version_on_assignment
+        from accounts.signals import sync_manager_path
         
         
@@ -1,36 +1,77 @@
 import logging
+from functools import lru_cache
 from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, make_password
+from django.db.models import Case, IntegerField, Q, Value, When
+from common.hashing import averify_password
 
 User = get_user_model()
-logger = logging.getLogger(__name__) 
+logger = logging.getLogger(__name__)
 
-class EmailAuthBackend:
-    
-    def authenticate(self, request ,username=None, password=None):
-        logger.info(f"Trying to authenticate user/email: {username}")
+
+@lru_cache(maxsize=1)
+def _dummy_password():
+    # Encoded once per process with the current default hasher, so a miss
+    # costs the same single (pooled) verification as a real user
+    return make_password("dummy-password-for-timing")
+
+
+class UsernameOrEmailBackend(ModelBackend):
+    """
+    Resolves `username` as a username or a (case-insensitive) email with one
+    query, then verifies exactly one password hash, real or dummy.
+    A username match wins; an email shared by several users never logs in.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
         if not username or not password:
             logger.warning("Username or password not provided")
             return None
 
-        try:
-            user = User.objects.get(email=username)
-            logger.info(f"Found user: {user.email}")
-            if user.check_password(password):
-                logger.info("Password correct, authentication successful")
-                return user
-            else:
-                logger.warning("Password incorrect")
-                return None
-        except User.DoesNotExist:
-            logger.warning(f"No user found with email: {username}")
+        user = self._pick(username, list(self._candidates(username)))
+        if user is None:
+            check_password(password, _dummy_password())
             return None
-        except User.MultipleObjectsReturned:
-            logger.error(f"Multiple users found with email: {username}")
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        logger.warning(f"Failed login for user {user.pk}")
+        return None
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        """Async ORM lookup; the hash is verified off the event loop."""
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if not username or not password:
+            logger.warning("Username or password not provided")
+            return None
+
+        user = self._pick(username, [candidate async for candidate in self._candidates(username)])
+        if user is None:
+            await averify_password(password, _dummy_password())
             return None
+        if await user.acheck_password(password) and self.user_can_authenticate(user):
+            return user
+        logger.warning(f"Failed login for user {user.pk}")
+        return None
+
+    def _candidates(self, username):
+        return (
+            User._default_manager
+            .filter(Q(username=username) | Q(email__iexact=username))
+            .annotate(by_username=Case(When(username=username, then=Value(0)), default=Value(1), output_field=IntegerField()))
+            .order_by("by_username", "pk")[:2]
+        )
+
+    def _pick(self, username, candidates):
+        if candidates and (candidates[0].username == username or len(candidates) == 1):
+            return candidates[0]
+        if candidates:
+            logger.error(f"Multiple users found with email: {username}")
+        return None
+
 
-    def get_user(self, user_id):
-        try:
-            return User.objects.get(pk=user_id)
-        except User.DoesNotExist:
-            logger.warning(f"No user found with id: {user_id}")
-            return None
\ No newline at end of file
+# Old dotted path, kept importable for existing references
+EmailAuthBackend = UsernameOrEmailBackend
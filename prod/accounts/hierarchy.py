@@ -0,0 +1,46 @@
+"""
+Materialized manager hierarchy.
+
+Every user stores `manager_path`: the ids of all its managers plus its own id,
+root first, e.g. "/1/5/9/" for user 9 managed by 5 managed by 1.
+"X is under Y" is then `"/Y/" in X.manager_path`, and a subtree is every row
+whose path starts with the subtree root's path (prefix index).
+"""
+from collections import defaultdict
+
+
+def root_path(pk):
+    return f"/{pk}/"
+
+
+def child_path(parent_path, pk):
+    return f"{parent_path}{pk}/" if parent_path else root_path(pk)
+
+
+def path_contains(path, pk):
+    return f"/{pk}/" in (path or "")
+
+
+def compute_manager_paths(rows):
+    """
+    rows: iterable of (id, manager_id).
+    Returns (paths, unreachable): paths maps id -> expected manager_path and
+    unreachable holds ids caught in a manager cycle (never reached from a root).
+    """
+    children = defaultdict(list)
+    ids = set()
+    for pk, manager_id in rows:
+        ids.add(pk)
+        children[manager_id].append(pk)
+
+    # Roots: no manager, or a manager id that no longer exists
+    stack = [(pk, "") for manager_id, kids in children.items() if manager_id is None or manager_id not in ids for pk in kids]
+    paths = {}
+    while stack:
+        pk, parent_path = stack.pop()
+        path = child_path(parent_path, pk)
+        paths[pk] = path
+        stack.extend((kid, path) for kid in children.get(pk, ()))
+
+    unreachable = ids - paths.keys()
+    return paths, unreachable
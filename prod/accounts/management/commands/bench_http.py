@@ -0,0 +1,133 @@
+# bench_http.py
+import asyncio
+import json
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test a running server over N concurrent keep-alive connections "
+        "(e.g. gunicorn sync vs uvicorn profiles) and report throughput and latency percentiles"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="e.g. http://127.0.0.1:8000/api/login/")
+        parser.add_argument("--method", default="POST")
+        parser.add_argument("--data", default=None, help="JSON request body")
+        parser.add_argument("--header", action="append", default=[], help="'Name: value', repeatable")
+        parser.add_argument("--connections", type=int, default=1000)
+        parser.add_argument("--duration", type=float, default=30, help="Seconds of load after warm-up")
+        parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout (seconds)")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme != "http" or not url.hostname:
+            raise CommandError("Only plain http:// URLs are supported")
+        if options["data"] is not None:
+            try:
+                json.loads(options["data"])
+            except ValueError:
+                raise CommandError("--data must be JSON")
+
+        bench = _Bench(url, options)
+        results = asyncio.run(bench.run())
+
+        latencies = sorted(results["latencies"])
+        elapsed = results["elapsed"]
+        self.stdout.write(f"{options['method']} {options['url']}  connections={options['connections']}  duration={elapsed:.1f}s")
+        self.stdout.write(f"requests   {len(latencies)}  ({len(latencies) / elapsed:.0f} req/s)")
+        self.stdout.write(f"statuses   {dict(sorted(results['statuses'].items()))}")
+        if results["errors"]:
+            self.stdout.write(self.style.WARNING(f"errors     {dict(results['errors'])}"))
+        if latencies:
+            self.stdout.write(
+                "latency    " + "  ".join(f"p{p}={_percentile(latencies, p) * 1000:.1f}ms" for p in (50, 95, 99))
+                + f"  max={latencies[-1] * 1000:.1f}ms"
+            )
+
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+class _Bench:
+    """Stdlib-only HTTP/1.1 client: one request at a time per keep-alive connection."""
+
+    def __init__(self, url, options):
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.connections = options["connections"]
+        self.duration = options["duration"]
+        self.timeout = options["timeout"]
+        body = (options["data"] or "").encode()
+        path = url.path or "/"
+        if url.query:
+            path = f"{path}?{url.query}"
+        lines = [f"{options['method'].upper()} {path} HTTP/1.1", f"Host: {url.netloc}", "Connection: keep-alive"]
+        lines += options["header"]
+        if body:
+            lines += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+        self.request = ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = Counter()
+
+    async def run(self):
+        self.deadline = time.monotonic() + self.duration
+        start = time.monotonic()
+        await asyncio.gather(*(self.worker() for _ in range(self.connections)))
+        return {
+            "latencies": self.latencies,
+            "statuses": self.statuses,
+            "errors": self.errors,
+            "elapsed": time.monotonic() - start,
+        }
+
+    async def worker(self):
+        reader = writer = None
+        while time.monotonic() < self.deadline:
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(
+                        asyncio.open_connection(self.host, self.port), self.timeout
+                    )
+                began = time.monotonic()
+                writer.write(self.request)
+                status, keep_alive = await asyncio.wait_for(self.read_response(reader), self.timeout)
+                self.latencies.append(time.monotonic() - began)
+                self.statuses[status] += 1
+                if not keep_alive:
+                    writer.close()
+                    writer = None
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                self.errors[type(e).__name__] += 1
+                if writer is not None:
+                    writer.close()
+                writer = None
+                await asyncio.sleep(0.05)
+        if writer is not None:
+            writer.close()
+
+    @staticmethod
+    async def read_response(reader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                await reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await reader.readexactly(int(headers.get("content-length", 0)))
+        keep_alive = headers.get("connection", "").lower() != "close" and lines[0].startswith("HTTP/1.1")
+        return status, keep_alive
@@ -0,0 +1,49 @@
+# bench_jwe.py
+import time
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+from authentication import jwe
+
+
+class Command(BaseCommand):
+    help = "Benchmark refresh-token JWE backends: encrypt/decrypt ops/sec and token size"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=5000)
+        parser.add_argument("--backend", action="append", choices=sorted(jwe.BACKENDS), help="Repeatable; default all")
+
+    def handle(self, *args, **options):
+        token = RefreshToken()
+        token["user_id"] = 123456
+        plaintext = str(token)
+        iterations = options["iterations"]
+        self.stdout.write(f"Plaintext refresh token: {len(plaintext)} bytes, {iterations} iterations\n")
+        self.stdout.write(f"{'backend':<24} {'encrypt/s':>12} {'decrypt/s':>12} {'size':>8}")
+
+        results = {}
+        for name in options["backend"] or sorted(jwe.BACKENDS):
+            backend = jwe.get_backend(name)
+            sample = backend.encrypt(plaintext)
+            if jwe.decrypt(sample) != plaintext:
+                raise CommandError(f"{name}: round trip failed")
+
+            start = time.perf_counter()
+            for _ in range(iterations):
+                backend.encrypt(plaintext)
+            encrypt_rate = iterations / (time.perf_counter() - start)
+
+            encoded = sample.encode()
+            start = time.perf_counter()
+            for _ in range(iterations):
+                jwe.decrypt(encoded)
+            decrypt_rate = iterations / (time.perf_counter() - start)
+
+            results[name] = (encrypt_rate, decrypt_rate)
+            self.stdout.write(f"{name:<24} {encrypt_rate:12.0f} {decrypt_rate:12.0f} {len(sample):8d}")
+
+        if len(results) > 1:
+            fast, slow = results.get(jwe.DEFAULT_BACKEND), results.get(jwe.JoseA256KWBackend.name())
+            if fast and slow:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{jwe.DEFAULT_BACKEND}: {fast[0] / slow[0]:.1f}x encrypt, {fast[1] / slow[1]:.1f}x decrypt"
+                ))
@@ -0,0 +1,86 @@
+# bench_middleware.py
+import time
+from types import ModuleType
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import path
+from django.utils.module_loading import import_string
+from middleware import APIOriginCheckMiddleware
+from middleware.api_bypass import APIBypassMixin
+
+
+def ping(request):
+    return HttpResponse("pong")
+
+
+# Trivial views, so the timings are the middleware chain (plus URL resolution, same for every stack)
+URLCONF = ModuleType("bench_middleware_urls")
+URLCONF.urlpatterns = [path("api/ping/", ping), path("admin/ping/", ping)]
+
+
+def full_stack(middleware):
+    """settings.MIDDLEWARE as it was before partitioning: the stock classes on every path."""
+    stack = []
+    for dotted in middleware:
+        cls = import_string(dotted)
+        if issubclass(cls, APIOriginCheckMiddleware):
+            continue
+        if issubclass(cls, APIBypassMixin):
+            cls = next(base for base in cls.__mro__[1:] if not issubclass(base, APIBypassMixin))
+            dotted = f"{cls.__module__}.{cls.__qualname__}"
+        stack.append(dotted)
+    return stack
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-request middleware overhead: full stack vs the path-partitioned stack, on /api/ and /admin/"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000)
+        parser.add_argument("--skip", action="append", default=[], help="Leave out middleware whose path contains this, e.g. silk")
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        middleware = [dotted for dotted in settings.MIDDLEWARE if not any(skip.lower() in dotted.lower() for skip in options["skip"])]
+        stacks = {
+            "none": [],
+            "full": full_stack(middleware),
+            "partitioned": middleware,
+        }
+        results = {}
+        for name, stack in stacks.items():
+            with override_settings(MIDDLEWARE=stack):
+                handler = BaseHandler()
+                handler.load_middleware()
+                for url in ("/api/ping/", "/admin/ping/"):
+                    results[name, url] = self.time(handler, url, iterations)
+
+        for url in ("/api/ping/", "/admin/ping/"):
+            bare = results["none", url]
+            self.stdout.write(f"{url}")
+            for name in ("full", "partitioned"):
+                self.stdout.write(f"  {name:<12} {results[name, url]:8.1f} us/request  (middleware {results[name, url] - bare:8.1f} us)")
+
+        before = results["full", "/api/ping/"] - results["none", "/api/ping/"]
+        after = results["partitioned", "/api/ping/"] - results["none", "/api/ping/"]
+        self.stdout.write(self.style.SUCCESS(
+            f"API middleware overhead: {before:.1f} -> {after:.1f} us per request ({before / max(after, 0.01):.1f}x)"
+        ))
+
+    @staticmethod
+    def time(handler, url, iterations):
+        factory = RequestFactory()
+        requests = []
+        for _ in range(iterations + 50):
+            request = factory.get(url, HTTP_X_ACTIVE_USER="1", HTTP_COOKIE="access_token_1=x; sessionid=y")
+            request.urlconf = URLCONF
+            requests.append(request)
+        for request in requests[:50]:
+            handler.get_response(request)
+        start = time.perf_counter()
+        for request in requests[50:]:
+            handler.get_response(request)
+        return (time.perf_counter() - start) / iterations * 1e6
@@ -0,0 +1,37 @@
+# bench_token_cache.py
+import time
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.tokens import AccessToken
+from authentication import token_cache
+
+
+class Command(BaseCommand):
+    help = "Benchmark access-token verification with and without the verified-token cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20000)
+        parser.add_argument("--tokens", type=int, default=50, help="Distinct tokens cycled through")
+
+    def handle(self, *args, **options):
+        iterations, count = options["iterations"], options["tokens"]
+        tokens = []
+        for i in range(count):
+            token = AccessToken()
+            token["user_id"] = i + 1
+            tokens.append(str(token))
+
+        token_cache.clear()
+        results = {}
+        for name, verify in (("AccessToken()", AccessToken), ("token_cache", token_cache.get_verified)):
+            for raw in tokens:
+                verify(raw)
+            start = time.perf_counter()
+            for i in range(iterations):
+                verify(tokens[i % count])
+            results[name] = (time.perf_counter() - start) / iterations * 1e6
+            self.stdout.write(f"{name:<15} {results[name]:8.2f} us/request")
+
+        saved = results["AccessToken()"] - results["token_cache"]
+        self.stdout.write(self.style.SUCCESS(
+            f"Saved {saved:.2f} us per request ({results['AccessToken()'] / results['token_cache']:.1f}x)"
+        ))
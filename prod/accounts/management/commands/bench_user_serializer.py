@@ -0,0 +1,72 @@
+# bench_user_serializer.py
+import time
+from types import SimpleNamespace
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from accounts.models import CustomUserModel, Role
+from accounts.api.serializers import UserSerializer, UserListSerializer
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark UserSerializer vs UserListSerializer on a page of users (data is rolled back)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--roles", type=int, default=3, help="Roles per user")
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument("--superuser", action="store_true", help="Serialize as a superuser")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(**options)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def run(self, page_size, roles, iterations, superuser, **kwargs):
+        role_objs = [Role.objects.create(permissions=f"bench-role-{i}", level=10 + i) for i in range(roles)]
+        users = CustomUserModel.objects.bulk_create(
+            CustomUserModel(username=f"bench{i:05d}", email=f"bench{i}@test.com", password="!") for i in range(page_size)
+        )
+        through = CustomUserModel.role.through
+        through.objects.bulk_create(
+            through(customusermodel_id=user.pk, role_id=role.pk) for user in users for role in role_objs
+        )
+        requester = CustomUserModel(pk=-1, username="requester", is_superuser=superuser)
+        context = {"request": SimpleNamespace(user=requester)}
+        base = CustomUserModel.objects.filter(username__startswith="bench").order_by("username")
+
+        def current():
+            qs = base.select_related("manager").prefetch_related(Prefetch("role", queryset=Role.objects.all()))
+            if not superuser:
+                qs = qs.defer("password", "email")
+            return UserSerializer(qs, many=True, context=context).data
+
+        def fast():
+            rows = base.values(*UserListSerializer.values_for(requester))
+            return UserListSerializer(rows, context=context).data
+
+        if [dict(row) for row in current()] != fast():
+            self.stderr.write(self.style.ERROR("Outputs differ; benchmark aborted"))
+            return
+
+        results = {}
+        for name, fn in (("UserSerializer", current), ("UserListSerializer", fast)):
+            fn()
+            start = time.perf_counter()
+            for _ in range(iterations):
+                fn()
+            elapsed = time.perf_counter() - start
+            results[name] = iterations / elapsed
+            self.stdout.write(
+                f"{name:<20} {results[name]:10.1f} pages/s  {results[name] * page_size:12.0f} rows/s"
+            )
+
+        speedup = results["UserListSerializer"] / results["UserSerializer"]
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {speedup:.2f}x (page_size={page_size}, roles={roles})"))
@@ -0,0 +1,40 @@
+# migrate_token_state.py
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from authentication.token_state import RedisTokenStore
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy unexpired blacklisted (and optionally outstanding) refresh-token jtis from the "
+        "simplejwt tables into the Redis token-state store. Idempotent: run it before and after "
+        "switching TOKEN_STATE_BACKEND to 'redis'"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--outstanding", action="store_true", help="Also copy outstanding tokens")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        store = RedisTokenStore()
+        now = timezone.now()
+        batch_size = options["batch_size"]
+
+        blacklisted = 0
+        rows = BlacklistedToken.objects.filter(token__expires_at__gt=now).values_list("token__jti", "token__expires_at")
+        for jti, expires_at in rows.iterator(chunk_size=batch_size):
+            blacklisted += store.mark_blacklisted(jti, expires_at.timestamp())
+        self.stdout.write(f"Blacklisted jtis copied: {blacklisted}")
+
+        if options["outstanding"]:
+            outstanding = 0
+            rows = OutstandingToken.objects.filter(expires_at__gt=now).values_list("jti", "user_id", "expires_at")
+            for jti, user_id, expires_at in rows.iterator(chunk_size=batch_size):
+                ttl = int(expires_at.timestamp() - now.timestamp())
+                if ttl > 0:
+                    store.cache.set(store.OUTSTANDING_KEY.format(jti=jti), user_id, timeout=ttl)
+                    outstanding += 1
+            self.stdout.write(f"Outstanding jtis copied: {outstanding}")
+
+        self.stdout.write(self.style.SUCCESS("Token state migrated; the DB tables are left untouched"))
@@ -0,0 +1,20 @@
+# purge_tokens.py
+from django.core.management.base import BaseCommand
+from accounts.token_purge import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired blacklisted/outstanding refresh tokens in batches (safe to interrupt and re-run)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--pause", type=float, default=None, help="Seconds to sleep between batches")
+        parser.add_argument("--max-seconds", type=float, default=0, help="Stop after this long (0 = run to the end)")
+
+    def handle(self, *args, **options):
+        results = purge_expired_tokens(
+            batch_size=options["batch_size"], pause=options["pause"], max_seconds=options["max_seconds"]
+        )
+        for table, r in results.items():
+            state = "done" if r["finished"] else "stopped early"
+            self.stdout.write(f"{table:<12} {r['deleted']:>10} rows  {r['seconds']:>8}s  {r['rows_per_sec'] or 0:>10} rows/s  {state}")
@@ -0,0 +1,36 @@
+# rebuild_manager_paths.py
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import CustomUserModel
+from accounts.hierarchy import compute_manager_paths
+
+
+class Command(BaseCommand):
+    help = "Backfill CustomUserModel.manager_path from the manager FK, or check it for consistency"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Only report mismatches, write nothing")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        rows = {}
+        for pk, manager_id, path in CustomUserModel.objects.values_list("id", "manager_id", "manager_path").iterator():
+            rows[pk] = (manager_id, path)
+
+        expected, cycles = compute_manager_paths((pk, manager_id) for pk, (manager_id, _) in rows.items())
+        stale = [pk for pk, path in expected.items() if rows[pk][1] != path]
+
+        self.stdout.write(f"Users: {len(rows)} | stale paths: {len(stale)} | in manager cycles: {len(cycles)}")
+        for pk in sorted(cycles)[:20]:
+            self.stdout.write(self.style.WARNING(f"User {pk} is part of a manager cycle (manager={rows[pk][0]})"))
+
+        if options["check"]:
+            if stale or cycles:
+                raise CommandError("Manager hierarchy is inconsistent; run without --check to repair paths")
+            self.stdout.write(self.style.SUCCESS("Manager hierarchy is consistent"))
+            return
+
+        users = [CustomUserModel(pk=pk, manager_path=expected[pk]) for pk in stale]
+        CustomUserModel.objects.bulk_update(users, ["manager_path"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rewrote {len(users)} manager paths"))
+        if cycles:
+            self.stdout.write(self.style.WARNING("Cycles were left untouched; fix their manager FK first"))
@@ -0,0 +1,97 @@
+# rotate_jwe_key.py
+import json
+import os
+import secrets
+import tempfile
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.settings import api_settings
+from authentication import jwe
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage the JWE key ring (settings.JWE_KEYRING). Rotation is two steps: "
+        "'stage' adds a key every worker can decrypt with, then, once workers have "
+        "reloaded the file, 'promote' makes it the encryption key and retires the old one. "
+        "'prune' drops retired keys whose refresh tokens have all expired."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("action", choices=["show", "stage", "promote", "prune"])
+        parser.add_argument("kid", nargs="?", help="Key to promote (default: newest staged key)")
+        parser.add_argument("--file", default=None, help="Key ring path (default: settings.JWE_KEYRING)")
+
+    def handle(self, *args, **options):
+        path = options["file"] or getattr(settings, "JWE_KEYRING", "")
+        if not path:
+            raise CommandError("No key ring configured: set JWE_KEYRING or pass --file")
+        data = jwe.load_keyring_file(path) if os.path.exists(path) else {"active": None, "keys": {}}
+        try:
+            jwe.KeyRing.from_dict(data)
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        action = options["action"]
+
+        if action == "stage":
+            kid = f"{datetime.now(timezone.utc):%Y%m%d}-{secrets.token_hex(3)}"
+            data["keys"][kid] = {
+                "key": secrets.token_bytes(32).hex(),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "retired_at": None,
+            }
+            self.save(path, data)
+            self.stdout.write(self.style.SUCCESS(f"Staged {kid}; promote it once every worker has reloaded the key ring"))
+        elif action == "promote":
+            self.promote(path, data, options["kid"])
+        elif action == "prune":
+            self.prune(path, data)
+        self.show(data)
+
+    def promote(self, path, data, kid):
+        staged = [k for k, entry in data["keys"].items() if not entry.get("retired_at") and k != data.get("active")]
+        kid = kid or max(staged, key=lambda k: data["keys"][k].get("created_at", ""), default=None)
+        if not kid or kid not in data["keys"]:
+            raise CommandError("Nothing to promote: stage a key first")
+        if data["keys"][kid].get("retired_at"):
+            raise CommandError(f"{kid} is retired and can't be promoted")
+        previous = data.get("active")
+        if previous and previous != kid:
+            data["keys"][previous]["retired_at"] = datetime.now(timezone.utc).isoformat()
+        data["active"] = kid
+        self.save(path, data)
+        self.stdout.write(self.style.SUCCESS(f"Active key is now {kid}" + (f"; {previous} is decrypt-only" if previous else "")))
+
+    def prune(self, path, data):
+        cutoff = datetime.now(timezone.utc) - api_settings.REFRESH_TOKEN_LIFETIME
+        expired = [
+            kid for kid, entry in data["keys"].items()
+            if entry.get("retired_at") and datetime.fromisoformat(entry["retired_at"]) < cutoff
+        ]
+        for kid in expired:
+            del data["keys"][kid]
+        self.save(path, data)
+        self.stdout.write(self.style.SUCCESS(f"Pruned {len(expired)} key(s): {', '.join(expired) or '-'}"))
+
+    def save(self, path, data):
+        # Validate before writing, then replace atomically so workers never read a partial file
+        jwe.KeyRing.from_dict(data)
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".jwe-keyring-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as handle:
+                json.dump(data, handle, indent=2)
+            os.chmod(tmp, 0o600)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        jwe.reset_keyring()
+
+    def show(self, data):
+        for kid, entry in sorted(data["keys"].items(), key=lambda item: item[1].get("created_at", "")):
+            state = "active" if kid == data.get("active") else ("retired " + entry["retired_at"] if entry.get("retired_at") else "staged")
+            self.stdout.write(f"{kid:<20} {state}")
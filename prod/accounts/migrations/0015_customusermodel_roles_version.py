@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0014_alter_customusermodel_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customusermodel',
+            name='roles_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Bumped whenever the user's roles change; access tokens carry it"),
+        ),
+    ]
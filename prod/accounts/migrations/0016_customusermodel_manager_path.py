@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:09
+
+from django.db import migrations, models
+
+
+def backfill_manager_paths(apps, schema_editor):
+    from accounts.hierarchy import compute_manager_paths
+
+    User = apps.get_model('accounts', 'CustomUserModel')
+    paths, _ = compute_manager_paths(User.objects.values_list('id', 'manager_id').iterator())
+    users = [User(pk=pk, manager_path=path) for pk, path in paths.items()]
+    User.objects.bulk_update(users, ['manager_path'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_customusermodel_roles_version'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customusermodel',
+            name='manager_path',
+            field=models.CharField(blank=True, default='', editable=False, help_text="Materialized manager chain '/root/.../self/', kept in sync by signals", max_length=1024),
+        ),
+        migrations.AddIndex(
+            model_name='customusermodel',
+            index=models.Index(fields=['manager_path'], name='accounts_user_mgr_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(backfill_manager_paths, migrations.RunPython.noop),
+    ]
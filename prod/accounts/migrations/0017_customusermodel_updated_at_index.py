@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_customusermodel_manager_path'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customusermodel',
+            index=models.Index(fields=['updated_at'], name='accounts_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Index for the chunked token purge (accounts/token_purge.py).
+# token_blacklist is a third-party app, so the index is created with SQL here.
+
+from django.db import migrations
+
+INDEX_NAME = "token_blacklist_outstanding_expires_idx"
+TABLE = "token_blacklist_outstandingtoken"
+
+
+def create_index(apps, schema_editor):
+    concurrently = "CONCURRENTLY " if schema_editor.connection.vendor == "postgresql" else ""
+    schema_editor.execute(f"CREATE INDEX {concurrently}IF NOT EXISTS {INDEX_NAME} ON {TABLE} (expires_at)")
+
+
+def drop_index(apps, schema_editor):
+    concurrently = "CONCURRENTLY " if schema_editor.connection.vendor == "postgresql" else ""
+    schema_editor.execute(f"DROP INDEX {concurrently}IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0018_customusermodel_email_upper_index'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_outstandingtoken_expires_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customusermodel',
+            name='token_epoch',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Bumped to revoke every token issued before; tokens carry it'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:36
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_customusermodel_token_epoch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileSample',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sample_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=255)),
+                ('view_name', models.CharField(blank=True, max_length=200)),
+                ('status', models.PositiveSmallIntegerField()),
+                ('duration_ms', models.FloatField()),
+                ('cpu_ms', models.FloatField(blank=True, null=True)),
+                ('queries', models.PositiveIntegerField(blank=True, null=True)),
+                ('query_ms', models.FloatField(blank=True, null=True)),
+                ('forced', models.BooleanField(default=False, help_text='Requested with the profiling header by a staff user')),
+                ('stats', models.TextField(blank=True, help_text='cProfile output (forced samples only)')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -1,4 +1,4 @@
 # accounts/models/__init__.py
 from .user import CustomUserModel
 from .role import Role
-
+from .profile_sample import ProfileSample
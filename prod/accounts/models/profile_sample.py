@@ -0,0 +1,24 @@
+import uuid
+from django.db import models
+
+
+class ProfileSample(models.Model):
+    """One profiled request (common.profiling), written in batches off the request path."""
+    sample_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    created_at = models.DateTimeField(db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=255)
+    view_name = models.CharField(max_length=200, blank=True)
+    status = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    cpu_ms = models.FloatField(null=True, blank=True)
+    queries = models.PositiveIntegerField(null=True, blank=True)
+    query_ms = models.FloatField(null=True, blank=True)
+    forced = models.BooleanField(default=False, help_text="Requested with the profiling header by a staff user")
+    stats = models.TextField(blank=True, help_text="cProfile output (forced samples only)")
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.method} {self.path} {self.status} {self.duration_ms:.1f}ms"
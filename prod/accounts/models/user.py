@@ -1,11 +1,17 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.core.exceptions import ValidationError
+from django.db.models.functions import Upper
 from django.conf import settings
 
 from managers.user_manager import CustomUserManager
+from accounts.hierarchy import root_path, path_contains
 
 from django.utils import timezone
 
 from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.hashers import check_password
+from common.hashing import averify_password
 
 from phonenumber_field.modelfields import PhoneNumberField
 
@@ -26,6 +32,7 @@ class CustomUserModel(AbstractUser):
     role = models.ManyToManyField("accounts.Role" , blank=True)
     
     manager = models.ForeignKey('self' , on_delete=models.SET_NULL , null=True , blank=True , related_name="team_members" , help_text="Direct manager for this employee")
+    manager_path = models.CharField(max_length=1024 , default="" , blank=True , editable=False , help_text="Materialized manager chain '/root/.../self/', kept in sync by signals")
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = ['email']
     objects = CustomUserManager()
@@ -33,13 +40,92 @@ class CustomUserModel(AbstractUser):
     password_time_edited = models.DateTimeField(null=True , blank=True)
     created_at = models.DateTimeField(auto_now_add=True , null=True , blank=True)
     updated_at = models.DateTimeField(auto_now=True , null=True , blank=True)
+    roles_version = models.PositiveIntegerField(default=0 , editable=False , help_text="Bumped whenever the user's roles change; access tokens carry it")
+    token_epoch = models.PositiveIntegerField(default=0 , editable=False , help_text="Bumped to revoke every token issued before; tokens carry it")
     
 
 
 
+    # Moved only by queryset.update() (F() bumps, hierarchy signals); a plain
+    # save() of a stale instance must not write old values back
+    UPDATE_ONLY_FIELDS = frozenset({"token_epoch", "roles_version", "manager_path"})
+
     def set_password(self, raw_password):
         super().set_password(raw_password)
         self.password_time_edited = timezone.now()
+        # Bumped by the next save(): tokens issued before stop working
+        self._bump_token_epoch = True
+
+    def save(self, **kwargs):
+        if self._state.adding:
+            self._bump_token_epoch = False
+            return super().save(**kwargs)
+        if kwargs.get("update_fields") is None:
+            deferred = self.get_deferred_fields()
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.UPDATE_ONLY_FIELDS and field.attname not in deferred
+            ]
+        if not getattr(self, "_bump_token_epoch", False):
+            return super().save(**kwargs)
+        using = kwargs.get("using") or self._state.db
+        with transaction.atomic(using=using):
+            type(self)._default_manager.using(using).filter(pk=self.pk).update(token_epoch=F("token_epoch") + 1)
+            super().save(**kwargs)
+        self._bump_token_epoch = False
+        self.refresh_from_db(fields=["token_epoch"])
+
+    def _rehash(self, raw_password):
+        # Hash upgrades on login re-set the same password: keep sessions alive
+        AbstractUser.set_password(self, raw_password)
+        self._password = None
+
+    def check_password(self, raw_password):
+        def setter(raw_password):
+            self._rehash(raw_password)
+            self.save(update_fields=["password"])
+        return check_password(raw_password, self.password, setter)
+
+    async def acheck_password(self, raw_password):
+        # The hash is verified on a worker thread, not on the event loop
+        is_correct, must_update = await averify_password(raw_password, self.password)
+        if is_correct and must_update:
+            self._rehash(raw_password)
+            await self.asave(update_fields=["password"])
+        return is_correct
+
+    def revoke_all_sessions(self):
+        """Log the user out everywhere: one epoch bump, no per-token rows."""
+        from authentication.token_epoch import revoke_all_sessions
+        revoke_all_sessions([self.pk])
+        self.refresh_from_db(fields=["token_epoch"])
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Lets the hierarchy signal skip saves that didn't move the user
+        instance._loaded_manager_id = instance.__dict__.get("manager_id")
+        return instance
+
+    def clean(self):
+        super().clean()
+        if self.pk is None or self.manager_id is None:
+            return
+        # Checked here so forms and serializers get a field error; the pre_save signal only backstops raw save()s
+        manager_path = (
+            type(self).objects.filter(pk=self.manager_id).values_list("manager_path", flat=True).first()
+            or root_path(self.manager_id)
+        )
+        if self.manager_id == self.pk or path_contains(manager_path, self.pk):
+            raise ValidationError({"manager": "A user cannot be managed by one of their own reports"})
+
+    @property
+    def hierarchy_path(self):
+        return self.manager_path or root_path(self.pk)
+
+    def is_under(self, manager):
+        """True when `manager` is somewhere above this user in the hierarchy."""
+        return self.pk != manager.pk and path_contains(self.hierarchy_path, manager.pk)
         
     
 
@@ -50,6 +136,12 @@ class CustomUserModel(AbstractUser):
         indexes = [
             models.Index(fields=['username']),
             models.Index(fields=['email']),
+            # varchar_pattern_ops keeps LIKE 'prefix%' subtree scans indexed on Postgres
+            models.Index(fields=['manager_path'] , name='accounts_user_mgr_path_idx' , opclasses=['varchar_pattern_ops']),
+            # max(updated_at) for list ETags is an index-only lookup
+            models.Index(fields=['updated_at'] , name='accounts_user_updated_idx'),
+            # email__iexact (login by email) compares UPPER(email)
+            models.Index(Upper('email') , name='accounts_user_email_upper_idx'),
             #models.Index(fields=['is_active']),
             #models.Index(fields=['manager']),
             #models.Index(fields=['is_active', 'manager']),  # لو كتير بتفلتر على الاثنين مع بعض
@@ -0,0 +1,139 @@
+"""
+Bulk user provisioning.
+
+Instead of create_user() per row (role get_or_create, two saves, role.set(),
+default-role signal ...), each chunk of rows costs a handful of queries:
+one username lookup, one bulk INSERT of users, one bulk INSERT of role
+through-rows, plus one batched activation-email task.
+"""
+import logging
+from django.db import IntegrityError, transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat
+
+from accounts.api.serializers import BulkUserRowSerializer
+from accounts.models import CustomUserModel, Role
+from accounts.tasks import send_activation_emails_batch_task
+from authentication.tokens_activate import activation_token_generator
+from common.hashing import hash_passwords
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROLE = "Employee"
+
+
+class ProvisioningResult:
+    def __init__(self):
+        self.created = []
+        self.errors = []
+
+    def error(self, index, errors):
+        self.errors.append({"row": index, "errors": errors})
+
+    def as_dict(self):
+        return {"created": len(self.created), "user_ids": self.created, "errors": self.errors}
+
+
+def _resolve_roles(valid, result):
+    names = {name for _, data in valid for name in data["roles"]}
+    roles = {role.permissions: role for role in Role.objects.filter(permissions__in=names)}
+    if any(not data["roles"] for _, data in valid):
+        roles.setdefault(DEFAULT_ROLE, Role.objects.get_or_create(permissions=DEFAULT_ROLE, defaults={"level": 999})[0])
+
+    kept = []
+    for index, data in valid:
+        missing = [name for name in data["roles"] if name not in roles]
+        if missing:
+            result.error(index, {"roles": [f"Unknown role: {name}" for name in missing]})
+            continue
+        kept.append((index, data))
+    return kept, roles
+
+
+def _insert(chunk, roles):
+    """Insert one chunk in a transaction; returns the created users in order."""
+    users = [
+        CustomUserModel(
+            username=data["username"],
+            email=CustomUserModel.objects.normalize_email(data["email"]),
+            first_name=data["first_name"],
+            last_name=data["last_name"],
+            password=data["encoded"],
+            is_active=data["is_active"],
+        )
+        for _, data in chunk
+    ]
+    through = CustomUserModel.role.through
+    with transaction.atomic():
+        users = CustomUserModel.objects.bulk_create(users)
+        through.objects.bulk_create(
+            through(customusermodel_id=user.pk, role_id=roles[name].pk)
+            for user, (_, data) in zip(users, chunk)
+            for name in (data["roles"] or [DEFAULT_ROLE])
+        )
+        # bulk_create skips the manager_path signals; new users are roots
+        CustomUserModel.objects.filter(pk__in=[user.pk for user in users]).update(
+            manager_path=Concat(Value("/"), Cast("id", CharField()), Value("/"))
+        )
+    return users
+
+
+def provision_users(rows, batch_size=1000, send_emails=True, start_index=0):
+    """
+    Create users from dict rows. Bad rows are reported, never abort the batch.
+    Row numbers in errors are `start_index + position`.
+    """
+    result = ProvisioningResult()
+    rows = list(rows)
+    for offset in range(0, len(rows), batch_size):
+        _provision_chunk(rows[offset:offset + batch_size], start_index + offset, send_emails, result)
+    return result
+
+
+def _provision_chunk(rows, start_index, send_emails, result):
+    valid, seen = [], set()
+    for position, row in enumerate(rows):
+        index = start_index + position
+        serializer = BulkUserRowSerializer(data=row)
+        if not serializer.is_valid():
+            result.error(index, serializer.errors)
+            continue
+        data = serializer.validated_data
+        if data["username"] in seen:
+            result.error(index, {"username": ["Duplicate username in this batch"]})
+            continue
+        seen.add(data["username"])
+        valid.append((index, data))
+
+    existing = set(CustomUserModel.objects.filter(username__in=seen).values_list("username", flat=True))
+    for index, data in valid:
+        if data["username"] in existing:
+            result.error(index, {"username": ["A user with that username already exists"]})
+    valid = [(index, data) for index, data in valid if data["username"] not in existing]
+    if not valid:
+        return
+
+    valid, roles = _resolve_roles(valid, result)
+    for (_, data), encoded in zip(valid, hash_passwords(data["password"] for _, data in valid)):
+        data["encoded"] = encoded
+
+    try:
+        users = _insert(valid, roles)
+        chunk_result = list(zip(valid, users))
+    except IntegrityError:
+        # A concurrent insert won a username race; isolate the offending rows
+        chunk_result = []
+        for item in valid:
+            try:
+                chunk_result.append((item, _insert([item], roles)[0]))
+            except IntegrityError as e:
+                result.error(item[0], {"non_field_errors": [str(e)]})
+
+    emails = []
+    for (_, data), user in chunk_result:
+        result.created.append(user.pk)
+        if send_emails and not user.is_active:
+            emails.append((user.pk, user.username, user.email, activation_token_generator.make_token(user)))
+    if emails:
+        send_activation_emails_batch_task.delay(emails)
+    logger.debug(f"Provisioned {len(chunk_result)} users starting at row {start_index}")
@@ -1,2 +1,5 @@
 from .signals_default_role import assign_default_role
 from .signals_cache_role import clear_role_cache
+from .signals_cache_user import clear_user_cache , clear_user_cache_on_role_change
+from .signals_roles_version import bump_roles_version_on_assignment , bump_roles_version_on_role_change
+from .signals_manager_path import resolve_manager_path , sync_manager_path , detach_manager_subtree
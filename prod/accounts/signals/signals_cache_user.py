@@ -0,0 +1,30 @@
+from django.db.models.signals import post_save , post_delete , m2m_changed
+from django.dispatch import receiver
+from accounts.models import CustomUserModel
+from authentication import user_cache
+from common.conditional import bump_list_generation
+
+@receiver(post_save , sender=CustomUserModel)
+@receiver(post_delete , sender=CustomUserModel)
+def clear_user_cache(sender , instance , **kwargs):
+    user_cache.invalidate_on_commit(instance.pk)
+
+
+@receiver(post_delete , sender=CustomUserModel)
+def bump_list_generation_on_delete(sender , instance , **kwargs):
+    # Deletes leave max(updated_at) untouched, so list ETags need this
+    bump_list_generation()
+
+
+@receiver(m2m_changed , sender=CustomUserModel.role.through)
+def clear_user_cache_on_role_change(sender , instance , action , reverse , pk_set , **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            user_cache.invalidate_on_commit(instance.pk)
+        return
+
+    # role.customusermodel_set.* -> instance is a Role, pk_set holds user ids
+    if action in ("post_add", "post_remove"):
+        user_cache.invalidate_on_commit(*pk_set)
+    elif action == "pre_clear":
+        user_cache.invalidate_on_commit(*instance.customusermodel_set.values_list("id", flat=True))
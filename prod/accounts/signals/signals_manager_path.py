@@ -0,0 +1,80 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import CharField, Value
+from django.db.models.functions import Concat, Substr
+from django.db.models.signals import pre_save , post_save , post_delete
+from django.dispatch import receiver
+from accounts.models import CustomUserModel
+from accounts.hierarchy import child_path, path_contains, root_path
+from authentication import user_cache
+
+_UNSET = object()
+
+
+def _rebase_subtree(old_prefix, new_prefix, exclude_pk=None):
+    """Rewrite every path starting with old_prefix in one UPDATE."""
+    qs = CustomUserModel.objects.filter(manager_path__startswith=old_prefix)
+    if exclude_pk is not None:
+        qs = qs.exclude(pk=exclude_pk)
+    # update() sends no post_save, so the moved users' cached snapshots are dropped here
+    moved = list(qs.values_list("pk", flat=True))
+    updated = qs.update(
+        manager_path=Concat(
+            Value(new_prefix),
+            Substr("manager_path", len(old_prefix) + 1),
+            output_field=CharField(),
+        )
+    )
+    if moved:
+        user_cache.invalidate_on_commit(*moved)
+    return updated
+
+
+@receiver(pre_save , sender=CustomUserModel)
+def resolve_manager_path(sender , instance , update_fields=None , **kwargs):
+    instance._parent_path = _UNSET
+    if update_fields is not None and not {"manager", "manager_id"} & set(update_fields):
+        return
+    if (
+        not instance._state.adding
+        and instance.manager_path
+        and getattr(instance, "_loaded_manager_id", _UNSET) == instance.manager_id
+    ):
+        return
+
+    if instance.manager_id is None:
+        instance._parent_path = ""
+        return
+
+    parent_path = (
+        CustomUserModel.objects.filter(pk=instance.manager_id).values_list("manager_path", flat=True).first()
+        or root_path(instance.manager_id)
+    )
+    # Last-resort guard for saves that skipped CustomUserModel.clean(); callers should validate first
+    if instance.pk is not None and (instance.manager_id == instance.pk or path_contains(parent_path, instance.pk)):
+        raise ValidationError("A user cannot be managed by one of their own reports")
+    instance._parent_path = parent_path
+
+
+@receiver(post_save , sender=CustomUserModel)
+def sync_manager_path(sender , instance , created , **kwargs):
+    parent_path = getattr(instance, "_parent_path", _UNSET)
+    if parent_path is _UNSET:
+        return
+
+    new_path = child_path(parent_path, instance.pk)
+    # Before a backfill an empty path means "root", so descendants use /pk/ as prefix
+    old_path = "" if created else instance.hierarchy_path
+    if new_path != instance.manager_path:
+        with transaction.atomic():
+            CustomUserModel.objects.filter(pk=instance.pk).update(manager_path=new_path)
+            if old_path and old_path != new_path:
+                _rebase_subtree(old_path, new_path, exclude_pk=instance.pk)
+    instance.manager_path = new_path
+    instance._loaded_manager_id = instance.manager_id
+
+
+@receiver(post_delete , sender=CustomUserModel)
+def detach_manager_subtree(sender , instance , **kwargs):
+    # Direct reports were SET_NULL and become roots; their subtrees move up with them
+    _rebase_subtree(instance.hierarchy_path, "/")
@@ -0,0 +1,41 @@
+from django.db.models import F
+from django.db.models.signals import post_save , pre_delete , m2m_changed
+from django.dispatch import receiver
+from accounts.models import CustomUserModel , Role
+from authentication import user_cache
+from common.conditional import bump_list_generation
+
+
+def bump_roles_version(user_ids):
+    """
+    Invalidate the role snapshot embedded in access tokens of these users.
+    queryset.update() skips post_save, so the user cache is cleared here too.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    CustomUserModel.objects.filter(pk__in=user_ids).update(roles_version=F("roles_version") + 1)
+    user_cache.invalidate_on_commit(*user_ids)
+    bump_list_generation()
+
+
+@receiver(m2m_changed , sender=CustomUserModel.role.through)
+def bump_roles_version_on_assignment(sender , instance , action , reverse , pk_set , **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            bump_roles_version([instance.pk])
+            instance.refresh_from_db(fields=["roles_version"])
+        return
+
+    if action in ("post_add", "post_remove"):
+        bump_roles_version(pk_set)
+    elif action == "pre_clear":
+        bump_roles_version(instance.customusermodel_set.values_list("id", flat=True))
+
+
+@receiver(post_save , sender=Role)
+@receiver(pre_delete , sender=Role)
+def bump_roles_version_on_role_change(sender , instance , **kwargs):
+    if kwargs.get("created"):
+        return
+    bump_roles_version(instance.customusermodel_set.values_list("id", flat=True))
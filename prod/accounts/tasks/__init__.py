@@ -1,3 +1,3 @@
-from .send_activation_email import send_activation_email_task
+from .send_activation_email import send_activation_email_task , send_activation_emails_batch_task
 from.send_reset_password import send_password_reset_email_task
 from .blacklist_jwt_clean import cleanup_blacklisted_tokens
@@ -1,16 +1,14 @@
 from celery import shared_task
-from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
-from datetime import datetime
+from accounts.token_purge import purge_expired_tokens
 
 @shared_task
 def cleanup_blacklisted_tokens():
     """
-    Deleted the blacklist tokens
+    Delete expired blacklisted and outstanding tokens in small batches.
+    Time-boxed by TOKEN_PURGE_MAX_SECONDS; the next run picks up the rest.
     """
-    now = datetime.now()
-    expired_tokens = BlacklistedToken.objects.filter(
-        token__expires_at__lt=now
-    )
-    count = expired_tokens.count()
-    expired_tokens.delete()
-    return f"Deleted {count} expired blacklisted tokens"
+    results = purge_expired_tokens()
+    return {
+        table: f"Deleted {r['deleted']} expired {table} tokens ({r['rows_per_sec']} rows/s)"
+        for table, r in results.items()
+    }
@@ -1,5 +1,5 @@
 from celery import shared_task
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils.http import urlsafe_base64_encode
@@ -42,6 +42,61 @@ def send_activation_email_task(self, user_id, username, user_email, token):
 
 
 
+def build_activation_email(user_id, username, user_email, token):
+    uid = urlsafe_base64_encode(force_bytes(user_id))
+    activate_url = f"{settings.FRONTEND_URL}/activate/{uid}/{token}"
+
+    subject = "Activate your account"
+    text_content = f"Hi {username},\nActivate your account:\n{activate_url}"
+    html_content = render_to_string(
+        "emails/activation_email.html",
+        {"username": username, "activate_url": activate_url}
+    )
+
+    email = EmailMultiAlternatives(
+        subject, text_content, settings.DEFAULT_FROM_EMAIL, [user_email]
+    )
+    email.attach_alternative(html_content, "text/html")
+    return email
+
+
+# --------------------------
+# Activation Emails (batch)
+# --------------------------
+@shared_task(bind=True, max_retries=5)
+def send_activation_emails_batch_task(self, items):
+    """
+    Send many activation emails over a single SMTP connection.
+    items: list of (user_id, username, user_email, token).
+    A retry resends only the emails that failed, never the whole batch.
+    """
+    try:
+        connection = get_connection()
+        connection.open()
+    except Exception as exc:
+        logger.error(f"Failed to open a connection for the activation email batch ({len(items)} emails): {exc}")
+        raise self.retry(exc=exc, countdown=10)
+
+    unsent, error = [], None
+    try:
+        for item in items:
+            try:
+                connection.send_messages([build_activation_email(*item)])
+            except Exception as exc:
+                unsent.append(item)
+                error = exc
+    finally:
+        connection.close()
+
+    sent = len(items) - len(unsent)
+    logger.debug(f"Sent {sent} activation emails in one batch")
+    if unsent:
+        logger.error(f"Failed to send {len(unsent)} of {len(items)} activation emails: {error}")
+        raise self.retry(args=(unsent,), exc=error, countdown=10)
+    return f"Sent {sent} activation emails"
+
+
+
 # --------------------------
 # Email Change Confirmation
 # --------------------------
@@ -0,0 +1,4 @@
+# Settings overrides shared by the test modules
+
+# Per-process cache instead of the Redis `default` (no server under test)
+LOCMEM = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
@@ -0,0 +1,85 @@
+from django.core.exceptions import DisallowedHost
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from middleware import APIOriginCheckMiddleware
+from middleware.api_bypass import SessionMiddleware, XFrameOptionsMiddleware
+
+
+@override_settings(CORS_ALLOWED_ORIGINS=["https://app.example.com"], CSRF_TRUSTED_ORIGINS=["https://*.example.org"])
+class TestAPIOriginCheck(SimpleTestCase):
+
+    def setUp(self):
+        self.middleware = APIOriginCheckMiddleware(lambda request: HttpResponse("ok"))
+        self.factory = RequestFactory()
+
+    def status(self, path="/api/refresh-token/", method="post", cookies=True, **headers):
+        request = getattr(self.factory, method)(path, headers=headers)
+        if cookies:
+            request.COOKIES["refresh_token_5"] = "x"
+        return self.middleware(request).status_code
+
+    def test_cross_site_requests_with_cookies_are_refused(self):
+        self.assertEqual(self.status(Origin="https://evil.example.net"), 403)
+        self.assertEqual(self.status(Origin="null"), 403)
+        self.assertEqual(self.status(Referer="https://evil.example.net/page"), 403)
+
+    def test_trusted_origins_pass(self):
+        self.assertEqual(self.status(Origin="http://testserver"), 200)
+        self.assertEqual(self.status(Origin="https://app.example.com"), 200)
+        self.assertEqual(self.status(Origin="https://admin.example.org"), 200)
+        self.assertEqual(self.status(Origin="https://evil.example.net", **{"Sec-Fetch-Site": "same-origin"}), 200)
+
+    def test_only_unsafe_api_requests_with_cookies_are_checked(self):
+        self.assertEqual(self.status(method="get", Origin="https://evil.example.net"), 200)
+        self.assertEqual(self.status(cookies=False, Origin="https://evil.example.net"), 200)
+        self.assertEqual(self.status(path="/admin/login/", Origin="https://evil.example.net"), 200)
+
+    def test_requests_without_origin_are_refused_unless_relaxed(self):
+        with self.settings(API_ORIGIN_CHECK_STRICT=True):
+            self.assertEqual(self.status(), 403)
+            self.assertEqual(self.status(cookies=False), 200)
+        with self.settings(API_ORIGIN_CHECK_STRICT=False):
+            self.assertEqual(self.status(), 200)
+
+    @override_settings(ALLOWED_HOSTS=["testserver"])
+    def test_api_requests_validate_the_host(self):
+        with self.assertRaises(DisallowedHost):
+            self.status(method="get", cookies=False, Host="evil.example.net")
+        self.assertEqual(self.client.get("/api/users/", headers={"Host": "evil.example.net"}).status_code, 400)
+
+    async def test_async_chain(self):
+        async def view(request):
+            return HttpResponse("ok")
+
+        middleware = APIOriginCheckMiddleware(view)
+        for origin, status in (("https://evil.example.net", 403), ("https://app.example.com", 200)):
+            request = self.factory.post("/api/logout/", headers={"Origin": origin})
+            request.COOKIES["refresh_token_5"] = "x"
+            self.assertEqual((await middleware(request)).status_code, status)
+
+
+class TestAPIBypass(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_api_requests_skip_the_browser_middleware(self):
+        seen = []
+        session = SessionMiddleware(lambda request: seen.append(request) or HttpResponse())
+        frame = XFrameOptionsMiddleware(lambda request: HttpResponse())
+
+        session(self.factory.get("/api/users/"))
+        session(self.factory.get("/admin/"))
+        self.assertFalse(hasattr(seen[0], "session"))
+        self.assertTrue(hasattr(seen[1], "session"))
+
+        self.assertNotIn("X-Frame-Options", frame(self.factory.get("/api/users/")))
+        self.assertIn("X-Frame-Options", frame(self.factory.get("/admin/")))
+
+    async def test_async_api_requests_skip_the_browser_middleware(self):
+        async def view(request):
+            return HttpResponse()
+
+        frame = XFrameOptionsMiddleware(view)
+        self.assertNotIn("X-Frame-Options", await frame(self.factory.get("/api/users/")))
+        self.assertIn("X-Frame-Options", await frame(self.factory.get("/admin/")))
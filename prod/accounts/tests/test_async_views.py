@@ -0,0 +1,170 @@
+import json
+from unittest import mock
+import redis.asyncio as aioredis
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import URLPattern, include, path, reverse
+from rest_framework_simplejwt.exceptions import TokenError
+from accounts.api.async_views import AsyncLogInView
+from accounts.api.views import LogInView
+from accounts.models import CustomUserModel
+from accounts.urls import build_urlpatterns
+from authentication import EncryptedRefreshToken, jwe, oauth_state
+from authentication.expiry_hints import EXPIRES_IN_HEADER
+from authentication import hashers
+from common.cpu_pool import PoolSaturated
+from common import aio_redis, throttling
+from accounts.tests.helpers import LOCMEM
+
+
+# The API as routed with ASYNC_AUTH_VIEWS=True
+urlpatterns = [path("api/", include((build_urlpatterns(async_auth_views=True), "accounts")))]
+
+
+@override_settings(CACHES=LOCMEM, ROOT_URLCONF=__name__)
+class TestAsyncAuthViews(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        throttling.engine.local.clear()
+        self.user = CustomUserModel.objects.create_user(username="async", email="async@test.com", password="12345678", is_active=True)
+
+    async def login(self, password="12345678"):
+        return await self.async_client.post(
+            reverse("accounts:login_view_api"),
+            json.dumps({"username_or_email": "ASYNC@test.com", "password": password}),
+            content_type="application/json",
+        )
+
+    async def post_with_refresh(self, name, encrypted):
+        self.async_client.cookies[f"refresh_token_{self.user.pk}"] = encrypted
+        return await self.async_client.post(reverse(name), headers={"X-Active-User": str(self.user.pk)})
+
+    async def test_login_sets_the_same_cookies_as_the_sync_view(self):
+        response = await self.login()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"detail": "Logged in successfully", "user_id": self.user.pk})
+        self.assertIn(EXPIRES_IN_HEADER, response)
+        refresh = jwe.decrypt(response.cookies[f"refresh_token_{self.user.pk}"].value)
+        self.assertEqual((await EncryptedRefreshToken.averified(refresh))["user_id"], str(self.user.pk))
+        self.assertTrue(response.cookies[f"access_token_{self.user.pk}"]["httponly"])
+
+    async def test_login_rejects_a_wrong_password(self):
+        response = await self.login(password="wrong")
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(f"access_token_{self.user.pk}", response.cookies)
+
+    async def test_refresh_rotates_and_blacklists_the_old_token(self):
+        login = await self.login()
+        encrypted = login.cookies[f"refresh_token_{self.user.pk}"].value
+        old = jwe.decrypt(encrypted)
+
+        response = await self.post_with_refresh("accounts:_refresh_token", encrypted)
+        self.assertEqual(response.status_code, 200)
+        rotated = jwe.decrypt(response.cookies[f"refresh_token_{self.user.pk}"].value)
+        self.assertNotEqual(rotated, old)
+
+        with self.assertRaises(TokenError):
+            await EncryptedRefreshToken.averified(old)
+        await EncryptedRefreshToken.averified(rotated)
+
+    async def test_logout_blacklists_the_refresh_token(self):
+        login = await self.login()
+        encrypted = login.cookies[f"refresh_token_{self.user.pk}"].value
+
+        response = await self.post_with_refresh("accounts:logout_refresh_token", encrypted)
+        self.assertEqual(response.status_code, 200)
+        with self.assertRaises(TokenError):
+            await EncryptedRefreshToken.averified(jwe.decrypt(encrypted))
+
+        cache.clear()  # no single-flight result to replay
+        refreshed = await self.post_with_refresh("accounts:_refresh_token", encrypted)
+        self.assertEqual(refreshed.status_code, 400)
+
+    async def test_revoked_sessions_are_refused(self):
+        login = await self.login()
+        encrypted = login.cookies[f"refresh_token_{self.user.pk}"].value
+        await self.user.arefresh_from_db()
+        self.user.token_epoch += 1
+        await self.user.asave(update_fields=["token_epoch"])
+        cache.clear()
+
+        response = await self.post_with_refresh("accounts:_refresh_token", encrypted)
+        self.assertEqual(response.status_code, 400)
+
+    @mock.patch("authentication.google.login_claims")
+    async def test_google_callback_logs_in_by_verified_email(self, login_claims):
+        login_claims.return_value = {"email": "async@test.com", "email_verified": True}
+        state = oauth_state.new_state()
+        signed = _Cookies()
+        oauth_state.set_cookie(signed, state)
+        self.async_client.cookies["google_oauth_state"] = signed.value
+
+        response = await self.async_client.get(reverse("accounts:google-callback"), {"code": "c", "state": state})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["user"]["email"], "async@test.com")
+        self.assertIn(f"access_token_{self.user.pk}", response.cookies)
+
+        replay = await self.async_client.get(reverse("accounts:google-callback"), {"code": "c", "state": state})
+        self.assertEqual(replay.status_code, 400)
+        login_claims.assert_called_once_with("c")
+
+    @override_settings(REST_FRAMEWORK={"DEFAULT_THROTTLE_RATES": {"login.account": "2/min"}})
+    async def test_login_is_throttled_per_account(self):
+        statuses = [(await self.login(password="wrong")).status_code for _ in range(3)]
+        self.assertEqual(statuses, [400, 400, 429])
+
+    async def test_hash_pool_saturation_is_a_503(self):
+        saturated = mock.Mock(**{"arun.side_effect": PoolSaturated("queue full")})
+        with mock.patch.object(hashers, "get_pool", return_value=saturated):
+            response = await self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "2")
+
+
+class _Cookies:
+    """Captures the value oauth_state.set_cookie() writes."""
+
+    def set_cookie(self, name, value, **kwargs):
+        self.value = value
+
+
+REDIS_CACHE = {"default": {
+    "BACKEND": "django_redis.cache.RedisCache",
+    "LOCATION": "rediss://cache.internal:6380/2",
+    "TIMEOUT": 120,
+    "OPTIONS": {"PASSWORD": "s3cret", "SOCKET_TIMEOUT": 5, "CONNECTION_POOL_KWARGS": {"max_connections": 7}},
+}}
+
+
+@override_settings(CACHES=REDIS_CACHE)
+class TestAsyncRedisClient(SimpleTestCase):
+
+    async def test_client_follows_the_cache_options(self):
+        client = aio_redis.get_client("default", socket_timeout=0.05)
+        pool = client.connection_pool
+        self.assertIs(pool.connection_class, aioredis.SSLConnection)
+        self.assertEqual(pool.max_connections, 7)
+        self.assertEqual(pool.connection_kwargs["password"], "s3cret")
+        self.assertEqual(pool.connection_kwargs["db"], 2)
+        self.assertEqual(pool.connection_kwargs["socket_timeout"], 0.05)
+
+    async def test_set_defaults_to_the_cache_timeout(self):
+        client = mock.AsyncMock()
+        with mock.patch.object(aio_redis, "get_client", return_value=client):
+            await aio_redis.cache.set("k", 1)
+            await aio_redis.cache.set("forever", 1, timeout=None)
+        self.assertEqual(client.set.await_args_list[0].kwargs["px"], 120000)
+        self.assertIsNone(client.set.await_args_list[1].kwargs["px"])
+
+
+class TestAsyncRouting(SimpleTestCase):
+
+    def test_async_views_are_routed_only_under_the_flag(self):
+        for async_auth_views, view_class in ((False, LogInView), (True, AsyncLogInView)):
+            patterns = [pattern for pattern in build_urlpatterns(async_auth_views) if isinstance(pattern, URLPattern)]
+            login = next(pattern for pattern in patterns if pattern.name == "login_view_api")
+            self.assertIs(login.callback.view_class, view_class)
+            routed = {getattr(pattern.callback, "view_class", None) for pattern in patterns}
+            self.assertFalse(routed & {AsyncLogInView, LogInView} - {view_class})
@@ -0,0 +1,45 @@
+from unittest import mock
+from django.test import TestCase, override_settings
+from accounts.authentication_email import UsernameOrEmailBackend
+from accounts.models import CustomUserModel
+from authentication.hashers import PooledPBKDF2PasswordHasher
+from accounts.tests.helpers import LOCMEM
+
+
+@override_settings(CACHES=LOCMEM, PASSWORD_HASH_POOL_WORKERS=0)
+class TestUsernameOrEmailBackend(TestCase):
+
+    def setUp(self):
+        self.backend = UsernameOrEmailBackend()
+        self.user = CustomUserModel.objects.create_user(
+            username="alice", email="Alice@Test.com", password="12345678", is_active=True
+        )
+        verify = PooledPBKDF2PasswordHasher.verify
+        patcher = mock.patch.object(PooledPBKDF2PasswordHasher, "verify", autospec=True, side_effect=verify)
+        self.verify = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_email_login_is_one_query_and_one_hash(self):
+        with self.assertNumQueries(1):
+            user = self.backend.authenticate(None, username="alice@test.COM", password="12345678")
+        self.assertEqual(user, self.user)
+        self.assertEqual(self.verify.call_count, 1)
+
+    def test_unknown_user_costs_one_dummy_hash(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(self.backend.authenticate(None, username="nobody", password="12345678"))
+        self.assertEqual(self.verify.call_count, 1)
+
+    def test_username_wins_over_someone_elses_email(self):
+        CustomUserModel.objects.create_user(username="bob", email="alice", password="other-pass", is_active=True)
+        self.assertEqual(self.backend.authenticate(None, username="alice", password="12345678"), self.user)
+
+    def test_shared_email_is_rejected(self):
+        CustomUserModel.objects.create_user(username="alice2", email="alice@test.com", password="12345678", is_active=True)
+        self.assertIsNone(self.backend.authenticate(None, username="alice@test.com", password="12345678"))
+        self.assertEqual(self.verify.call_count, 1)
+
+    def test_wrong_password_and_inactive_user(self):
+        self.assertIsNone(self.backend.authenticate(None, username="alice", password="wrong"))
+        CustomUserModel.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(self.backend.authenticate(None, username="alice", password="12345678"))
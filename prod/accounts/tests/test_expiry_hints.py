@@ -0,0 +1,55 @@
+import time
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.settings import api_settings
+from accounts.models import CustomUserModel
+from authentication import EncryptedRefreshToken
+from authentication.expiry_hints import EXPIRES_IN_HEADER, REFRESH_AFTER_HEADER, set_expiry_headers
+from accounts.tests.helpers import LOCMEM
+
+
+@override_settings(CACHES=LOCMEM)
+class TestJitteredLifetime(TestCase):
+
+    def setUp(self):
+        self.user = CustomUserModel.objects.create_user(username="jit", email="jit@test.com", password="12345678")
+        self.refresh = EncryptedRefreshToken.for_user(self.user)
+
+    def lifetimes(self, count=20):
+        return [access["exp"] - access["iat"] for access in (self.refresh.access_token for _ in range(count))]
+
+    @override_settings(ACCESS_TOKEN_LIFETIME_JITTER=0.2)
+    def test_lifetime_is_spread_within_the_bound(self):
+        full = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+        lifetimes = self.lifetimes()
+        self.assertTrue(all(full * 0.8 - 1 <= value <= full for value in lifetimes))
+        self.assertGreater(len(set(lifetimes)), 1)
+
+    @override_settings(ACCESS_TOKEN_LIFETIME_JITTER=0)
+    def test_no_jitter_keeps_the_configured_lifetime(self):
+        self.assertEqual(set(self.lifetimes(3)), {int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())})
+
+    @override_settings(TOKEN_REFRESH_AFTER_MIN=0.5, TOKEN_REFRESH_AFTER_MAX=0.6)
+    def test_headers_from_token_or_string(self):
+        access = self.refresh.access_token
+        for value in (access, str(access)):
+            response = set_expiry_headers(HttpResponse(), value)
+            expires_in = int(response[EXPIRES_IN_HEADER])
+            self.assertAlmostEqual(expires_in, access["exp"] - time.time(), delta=2)
+            self.assertTrue(expires_in * 0.5 - 1 <= int(response[REFRESH_AFTER_HEADER]) <= expires_in * 0.6)
+
+
+@override_settings(CACHES=LOCMEM)
+class TestRefreshHints(APITestCase):
+
+    def test_refresh_response_carries_hints(self):
+        cache.clear()
+        user = CustomUserModel.objects.create_user(username="hint", email="hint@test.com", password="12345678")
+        self.client.cookies[f"refresh_token_{user.pk}"] = EncryptedRefreshToken.for_user(user).encrypt()
+        response = self.client.post(reverse("accounts:_refresh_token"), HTTP_X_ACTIVE_USER=str(user.pk))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLess(int(response[REFRESH_AFTER_HEADER]), int(response[EXPIRES_IN_HEADER]))
@@ -0,0 +1,144 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from jose import jwk, jwt
+from rest_framework.test import APITestCase
+from accounts.models import CustomUserModel
+from authentication import google
+from common import http
+from accounts.tests.helpers import LOCMEM
+
+CLIENT_ID = "client-123"
+
+
+class StandInGoogle(BaseHTTPRequestHandler):
+    """Token endpoint and JWKS of a fake Google; `server.claims` go into the id_token."""
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, body, headers=()):
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def reply_html(self):
+        # What a captive portal or an erroring proxy hands back with a 200
+        payload = b"<html>Service Unavailable</html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self.server.hits["jwks"] += 1
+        if "jwks" in self.server.broken:
+            return self.reply_html()
+        self.reply({"keys": [self.server.public_jwk]}, [("Cache-Control", "public, max-age=3600")])
+
+    def do_POST(self):
+        self.server.hits["token"] += 1
+        form = parse_qs(self.rfile.read(int(self.headers["Content-Length"])).decode())
+        if "token" in self.server.broken:
+            return self.reply_html()
+        assert form["code"] == ["good-code"], form
+        now = int(time.time())
+        claims = {"iss": "https://accounts.google.com", "aud": CLIENT_ID, "iat": now, "exp": now + 300, **self.server.claims}
+        id_token = jwt.encode(claims, self.server.private_pem, algorithm="RS256", headers={"kid": "k1"})
+        self.reply({"access_token": "ya29.stand-in", "id_token": id_token, "token_type": "Bearer"})
+
+
+@override_settings(CACHES=LOCMEM, GOOGLE_CLIENT_ID=CLIENT_ID)
+class TestGoogleLogin(APITestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInGoogle)
+        cls.server.private_pem = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        public_pem = key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo)
+        cls.server.public_jwk = {**jwk.construct(public_pem, "RS256").to_dict(), "kid": "k1", "use": "sig"}
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        base = f"http://127.0.0.1:{cls.server.server_port}"
+        cls.endpoints = override_settings(GOOGLE_TOKEN_URL=f"{base}/token", GOOGLE_JWKS_URL=f"{base}/certs")
+        cls.endpoints.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.endpoints.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        google.jwks.clear()
+        http.reset_session()
+        self.server.hits = {"token": 0, "jwks": 0}
+        self.server.broken = set()
+        self.server.claims = {"sub": "1", "email": "Ada@Example.com", "email_verified": True, "given_name": "Ada"}
+
+    def login(self):
+        init = self.client.get(reverse("accounts:google-init"))
+        state = parse_qs(urlparse(init.json()["url"]).query)["state"][0]
+        return self.client.get(reverse("accounts:google-callback"), {"code": "good-code", "state": state})
+
+    def test_login_creates_then_reuses_the_user(self):
+        first = self.login()
+        self.assertEqual(first.status_code, 200)
+        user = CustomUserModel.objects.get(email="Ada@Example.com")
+        self.assertTrue(user.is_active)
+        self.assertFalse(user.has_usable_password())
+        self.assertIn(f"access_token_{user.pk}", first.cookies)
+
+        self.server.claims["email"] = "ada@example.com"
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(CustomUserModel.objects.count(), 1)
+        # Two code exchanges, one JWKS fetch (cached for its max-age)
+        self.assertEqual(self.server.hits, {"token": 2, "jwks": 1})
+
+    def test_id_token_for_another_client_is_refused(self):
+        self.server.claims["aud"] = "someone-else"
+        self.assertEqual(self.login().status_code, 400)
+        self.assertFalse(CustomUserModel.objects.exists())
+
+    def test_unverified_email_is_refused(self):
+        self.server.claims["email_verified"] = False
+        self.assertEqual(self.login().status_code, 400)
+
+    def test_non_json_token_response_is_refused(self):
+        self.server.broken = {"token"}
+        self.assertEqual(self.login().status_code, 400)
+
+    def test_failed_jwks_fetch_is_not_retried_per_login(self):
+        self.server.broken = {"jwks"}
+        self.assertEqual(self.login().status_code, 400)
+        self.assertEqual(self.login().status_code, 400)
+        self.assertEqual(self.server.hits["jwks"], 1)
+
+        google.jwks._fetched -= google.JWKS_MIN_REFETCH
+        self.server.broken = set()
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.server.hits["jwks"], 2)
+
+    def test_session_has_timeouts_and_pooling(self):
+        session = http.get_session()
+        self.assertIs(session, http.get_session())
+        self.assertEqual(session.timeout, (3.05, 10))
+        self.assertEqual(session.get_adapter("https://oauth2.googleapis.com")._pool_maxsize, 20)
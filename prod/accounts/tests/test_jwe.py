@@ -0,0 +1,133 @@
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+from jose import jwe as jose_jwe
+from rest_framework_simplejwt.settings import api_settings
+from authentication import jwe
+
+
+class TestJWEBackends(SimpleTestCase):
+
+    def test_round_trip_every_backend(self):
+        for name in jwe.BACKENDS:
+            with self.subTest(backend=name):
+                self.assertEqual(jwe.decrypt(jwe.encrypt("payload", backend=name)), "payload")
+
+    def test_direct_gcm_tokens_are_standard_jwe(self):
+        token = jwe.encrypt("payload", backend="dir+A256GCM")
+        self.assertEqual(jose_jwe.decrypt(token, jwe.get_key()), b"payload")
+        self.assertEqual(jwe.decrypt(jose_jwe.encrypt(b"payload", jwe.get_key(), algorithm="dir", encryption="A256GCM")), "payload")
+
+    @override_settings(JWE_BACKEND="A256KW+A256CBC-HS512")
+    def test_legacy_tokens_still_decrypt_after_switch(self):
+        legacy = jwe.encrypt("payload")
+        self.assertEqual(jose_jwe.get_unverified_header(legacy)["alg"], "A256KW")
+        with self.settings(JWE_BACKEND="dir+A256GCM"):
+            self.assertEqual(jose_jwe.get_unverified_header(jwe.encrypt("payload"))["alg"], "dir")
+            self.assertEqual(jwe.decrypt(legacy), "payload")
+
+    def test_tampered_or_unknown_tokens_give_none(self):
+        header, key, iv, ciphertext, tag = jwe.encrypt("payload").split(".")
+        flipped = ("A" if tag[0] != "A" else "B") + tag[1:]
+        self.assertIsNone(jwe.decrypt(".".join((header, key, iv, ciphertext, flipped))))
+        unknown = jwe.b64url_encode(b'{"alg":"none","enc":"A256GCM"}').decode()
+        self.assertIsNone(jwe.decrypt(".".join((unknown, key, iv, ciphertext, tag))))
+        self.assertIsNone(jwe.decrypt("garbage"))
+
+
+class TestKeyRing(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "keyring.json")
+        override = self.settings(JWE_KEYRING=self.path, JWE_KEYRING_RELOAD=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(jwe.reset_keyring)
+        jwe.reset_keyring()
+
+    def rotate(self, *args):
+        call_command("rotate_jwe_key", *args, stdout=io.StringIO())
+        with open(self.path) as handle:
+            return json.load(handle)
+
+    def test_rotation_keeps_old_tokens_valid_by_kid(self):
+        self.rotate("stage")
+        first = self.rotate("promote")["active"]
+        old = jwe.encrypt("old")
+        self.assertEqual(jose_jwe.get_unverified_header(old)["kid"], first)
+
+        self.rotate("stage")
+        ring = self.rotate("promote")
+        self.assertNotEqual(ring["active"], first)
+        self.assertIsNotNone(ring["keys"][first]["retired_at"])
+        new = jwe.encrypt("new")
+        self.assertEqual(jose_jwe.get_unverified_header(new)["kid"], ring["active"])
+        self.assertEqual(jwe.decrypt(old), "old")
+        self.assertEqual(jwe.decrypt(new), "new")
+
+    def test_no_trial_decryption_and_expired_keys_refused(self):
+        self.rotate("stage")
+        kid = self.rotate("promote")["active"]
+        token = jwe.encrypt("payload")
+        self.rotate("stage")
+        self.rotate("promote")
+
+        with mock.patch.object(jwe.DirectA256GCMBackend, "decrypt", autospec=True, side_effect=jwe.DirectA256GCMBackend.decrypt) as decrypt:
+            self.assertEqual(jwe.decrypt(token), "payload")
+        self.assertEqual(decrypt.call_count, 1)
+        self.assertEqual(decrypt.call_args.args[0].kid, kid)
+
+        later = datetime.now(timezone.utc) + api_settings.REFRESH_TOKEN_LIFETIME + timedelta(minutes=1)
+        with mock.patch("authentication.jwe.datetime") as clock:
+            clock.now.return_value = later
+            self.assertIsNone(jwe.decrypt(token))
+
+    def test_tokens_without_kid_use_jwe_key(self):
+        legacy = jwe.encrypt("legacy")
+        self.rotate("stage")
+        self.rotate("promote")
+        self.assertNotIn("kid", jose_jwe.get_unverified_header(legacy))
+        self.assertEqual(jwe.decrypt(legacy), "legacy")
+
+    def test_bad_entries_are_refused_at_load(self):
+        key = "ab" * 32
+        for entry in (
+            {"key": "ab" * 16},
+            {"key": key, "retired_at": "2024-01-01T00:00:00"},
+            {"key": key, "retired_at": "last tuesday"},
+        ):
+            with self.subTest(entry=entry), self.assertRaises(ImproperlyConfigured):
+                jwe.KeyRing.from_dict({"active": None, "keys": {"k1": entry}})
+        ring = jwe.KeyRing.from_dict({"active": None, "keys": {"k1": {"key": key, "retired_at": "2024-01-01T00:00:00+00:00"}}})
+        self.assertIsNone(ring.decryption_key("k1"))
+
+    def test_rotate_refuses_a_bad_key_ring_file(self):
+        with open(self.path, "w") as handle:
+            json.dump({"active": None, "keys": {"k1": {"key": "ab" * 32, "retired_at": "2024-01-01T00:00:00"}}}, handle)
+        with self.assertRaises(CommandError):
+            self.rotate("prune")
+
+    def test_broken_reload_keeps_the_previous_ring(self):
+        self.rotate("stage")
+        kid = self.rotate("promote")["active"]
+        token = jwe.encrypt("payload")
+        with open(self.path, "w") as handle:
+            handle.write('{"active": "half')
+        with self.assertLogs("authentication.jwe", "ERROR"):
+            self.assertEqual(jwe.get_keyring().active, kid)
+        self.assertEqual(jwe.decrypt(token), "payload")
+
+    def test_broken_first_load_fails(self):
+        with open(self.path, "w") as handle:
+            handle.write("not json")
+        with self.assertRaises(ValueError):
+            jwe.get_keyring()
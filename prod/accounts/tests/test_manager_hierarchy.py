@@ -0,0 +1,82 @@
+from io import StringIO
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from accounts.models import CustomUserModel
+from authentication import user_cache
+from common.permissions import RoleBasePermission
+from accounts.tests.helpers import LOCMEM
+
+
+@override_settings(CACHES=LOCMEM)
+class TestManagerHierarchy(TestCase):
+
+    def make(self, name, manager=None):
+        return CustomUserModel.objects.create_user(
+            username=name, email=f"{name}@test.com", password="12345678", manager=manager
+        )
+
+    def reload(self, user):
+        return CustomUserModel.objects.get(pk=user.pk)
+
+    def setUp(self):
+        self.ceo = self.make("ceo")
+        self.lead = self.make("lead", self.ceo)
+        self.dev = self.make("dev", self.lead)
+
+    def test_paths_are_materialized(self):
+        self.assertEqual(self.reload(self.dev).manager_path, f"/{self.ceo.pk}/{self.lead.pk}/{self.dev.pk}/")
+        self.assertTrue(self.reload(self.dev).is_under(self.ceo))
+        self.assertFalse(self.reload(self.ceo).is_under(self.dev))
+        self.assertTrue(CustomUserModel.objects.is_under(self.dev.pk, self.ceo.pk))
+
+    def test_permission_check_needs_no_queries(self):
+        dev = self.reload(self.dev)
+        with self.assertNumQueries(0):
+            self.assertTrue(RoleBasePermission.is_under_manager(self.ceo, dev))
+            self.assertFalse(RoleBasePermission.is_under_manager(self.dev, dev))
+
+    def test_moving_subtree_updates_descendants(self):
+        other = self.make("other")
+        lead = self.reload(self.lead)
+        lead.manager = other
+        lead.save()
+        dev = self.reload(self.dev)
+        self.assertEqual(dev.manager_path, f"/{other.pk}/{self.lead.pk}/{self.dev.pk}/")
+        self.assertFalse(dev.is_under(self.ceo))
+
+    def test_cycle_is_rejected(self):
+        ceo = self.reload(self.ceo)
+        ceo.manager = self.dev
+        with self.assertRaises(ValidationError):
+            ceo.save()
+
+    def test_clean_reports_cycle_as_field_error(self):
+        ceo = self.reload(self.ceo)
+        ceo.manager = self.dev
+        with self.assertRaises(ValidationError) as ctx:
+            ceo.full_clean()
+        self.assertIn("manager", ctx.exception.message_dict)
+        ceo.manager = self.make("board")
+        ceo.clean()
+
+    def test_moving_subtree_drops_cached_descendants(self):
+        self.assertEqual(user_cache.get_user(self.dev.pk).manager_path, self.reload(self.dev).manager_path)
+        other = self.make("other")
+        lead = self.reload(self.lead)
+        lead.manager = other
+        lead.save()
+        self.assertEqual(user_cache.get_user(self.dev.pk).manager_path, f"/{other.pk}/{self.lead.pk}/{self.dev.pk}/")
+
+    def test_deleting_manager_detaches_subtree(self):
+        self.lead.delete()
+        self.assertEqual(self.reload(self.dev).manager_path, f"/{self.dev.pk}/")
+
+    def test_command_backfills_and_checks(self):
+        CustomUserModel.objects.update(manager_path="")
+        with self.assertRaises(CommandError):
+            call_command("rebuild_manager_paths", "--check", stdout=StringIO())
+        call_command("rebuild_manager_paths", stdout=StringIO())
+        call_command("rebuild_manager_paths", "--check", stdout=StringIO())
+        self.assertTrue(self.reload(self.dev).is_under(self.ceo))
@@ -0,0 +1,56 @@
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from authentication.google import GoogleAuthError
+from accounts.tests.helpers import LOCMEM
+
+
+@override_settings(CACHES=LOCMEM)
+@mock.patch("authentication.google.exchange_code", side_effect=GoogleAuthError("stubbed"))
+class TestGoogleOAuthState(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def init(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("accounts:google-init"))
+        self.assertFalse([q for q in queries if "django_session" in q["sql"]])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.cookies["google_oauth_state"]["httponly"])
+        return parse_qs(urlparse(response.json()["url"]).query)["state"][0]
+
+    def callback(self, state):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("accounts:google-callback"), {"code": "c", "state": state})
+        self.assertFalse([q for q in queries if "django_session" in q["sql"]])
+        return response
+
+    def test_valid_state_is_accepted_once(self, post):
+        state = self.init()
+        signed = self.client.cookies["google_oauth_state"].value
+        self.assertNotEqual(self.callback(state).json(), {"error": "Invalid state"})
+        post.assert_called_once()
+
+        # Replaying the captured callback (cookie included) is refused
+        self.client.cookies["google_oauth_state"] = signed
+        self.assertEqual(self.callback(state).status_code, 400)
+        post.assert_called_once()
+
+    def test_state_must_match_the_signed_cookie(self, post):
+        self.init()
+        self.assertEqual(self.callback("forged").status_code, 400)
+        self.client.cookies["google_oauth_state"] = "forged:cookie"
+        self.assertEqual(self.callback("forged").status_code, 400)
+        post.assert_not_called()
+
+    def test_expired_state_is_refused(self, post):
+        state = self.init()
+        with self.settings(OAUTH_STATE_MAX_AGE=-1):
+            self.assertEqual(self.callback(state).status_code, 400)
+        post.assert_not_called()
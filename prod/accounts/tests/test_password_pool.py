@@ -0,0 +1,132 @@
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.test import APIClient, APITestCase
+from accounts.models import CustomUserModel
+from authentication import hashers
+from common import cpu_pool
+from common.cpu_pool import BoundedPool, PoolSaturated, pbkdf2_b64
+from common.hashing import averify_password
+from accounts.tests.helpers import LOCMEM
+
+
+class TestPooledHasher(SimpleTestCase):
+
+    def test_matches_stock_pbkdf2(self):
+        encoded = PBKDF2PasswordHasher().encode("s3cret-pass", "somesalt", iterations=1000)
+        hasher = hashers.PooledPBKDF2PasswordHasher()
+        self.assertTrue(hasher.verify("s3cret-pass", encoded))
+        self.assertFalse(hasher.verify("wrong-pass", encoded))
+        self.assertGreater(hashers.stats.snapshot()["verified"], 0)
+
+    async def test_async_verify_awaits_the_pool(self):
+        encoded = PBKDF2PasswordHasher().encode("s3cret-pass", "somesalt", iterations=1000)
+        hasher = hashers.PooledPBKDF2PasswordHasher()
+        self.assertTrue(await hasher.averify("s3cret-pass", encoded))
+        self.assertFalse(await hasher.averify("wrong-pass", encoded))
+        # Fewer iterations than the default: correct, and due for an upgrade
+        self.assertEqual(await averify_password("s3cret-pass", encoded), (True, True))
+
+    def test_saturation_is_a_plain_exception_outside_the_api(self):
+        encoded = PBKDF2PasswordHasher().encode("s3cret-pass", "somesalt", iterations=1000)
+        saturated = mock.Mock(**{"run.side_effect": PoolSaturated("queue full")})
+        with mock.patch.object(hashers, "get_pool", return_value=saturated), \
+                self.assertRaises(hashers.HashingOverloaded) as ctx:
+            hashers.PooledPBKDF2PasswordHasher().verify("s3cret-pass", encoded)
+        self.assertNotIsInstance(ctx.exception, APIException)
+        self.assertEqual(ctx.exception.wait, 2)
+
+    def test_rejects_when_queue_is_full(self):
+        pool = BoundedPool(workers=1, max_queue=0, directory=self.enterContext(tempfile.TemporaryDirectory()))
+        slot = pool._admitted.try_acquire()
+        with self.assertRaises(PoolSaturated):
+            pool.run(pbkdf2_b64, "sha256", b"pw", b"salt", 1)
+        pool._admitted.release(slot)
+        digest, busy, waited = pool.run(pbkdf2_b64, "sha256", b"pw", b"salt", 1)
+        self.assertEqual(digest, pbkdf2_b64("sha256", b"pw", b"salt", 1)[0])
+        self.assertGreaterEqual(waited, 0)
+
+    def test_waiter_times_out(self):
+        pool = BoundedPool(workers=1, max_queue=1, directory=self.enterContext(tempfile.TemporaryDirectory()))
+        slot = pool._running.try_acquire()
+        with self.assertRaisesMessage(PoolSaturated, "timed out"):
+            pool.run(pbkdf2_b64, "sha256", b"pw", b"salt", 1, timeout=0.05)
+        pool._running.release(slot)
+        # The admission slot was given back
+        pool.run(pbkdf2_b64, "sha256", b"pw", b"salt", 1, timeout=0.05)
+
+    def test_slots_are_shared_across_processes(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        holder = subprocess.Popen(
+            [sys.executable, "-c", (
+                "import sys; from common.cpu_pool import HostSemaphore;"
+                f"slot = HostSemaphore({directory!r}, 'admitted', 1).try_acquire();"
+                "print(slot is not None, flush=True); sys.stdin.read()"
+            )],
+            cwd=Path(cpu_pool.__file__).parent.parent, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        self.assertEqual(holder.stdout.readline().strip(), "True")
+        pool = BoundedPool(workers=1, max_queue=0, directory=directory)
+        with self.assertRaises(PoolSaturated):
+            pool.run(pbkdf2_b64, "sha256", b"pw", b"salt", 1)
+        holder.communicate("")
+        # The kernel drops the exited holder's lock
+        pool.run(pbkdf2_b64, "sha256", b"pw", b"salt", 1)
+
+
+@override_settings(CACHES=LOCMEM)
+class TestLoginOverload(APITestCase):
+
+    def setUp(self):
+        self.url = reverse("accounts:login_view_api")
+        CustomUserModel.objects.create_user(username="busy", email="busy@test.com", password="12345678", is_active=True)
+
+    def test_saturated_pool_returns_503_with_retry_after(self):
+        saturated = mock.Mock(**{"run.side_effect": PoolSaturated("queue full")})
+        with mock.patch.object(hashers, "get_pool", return_value=saturated):
+            res = self.client.post(self.url, {"username_or_email": "busy", "password": "12345678"})
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res["Retry-After"], "2")
+
+
+@override_settings(CACHES=LOCMEM, PASSWORD_HASH_POOL_WORKERS=1, PASSWORD_HASH_POOL_MAX_QUEUE=0)
+class TestConcurrentLogins(TransactionTestCase):
+
+    def setUp(self):
+        self.url = reverse("accounts:login_view_api")
+        CustomUserModel.objects.create_user(username="busy", email="busy@test.com", password="12345678", is_active=True)
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(PASSWORD_HASH_POOL_DIR=directory))
+        self.enterContext(mock.patch.object(hashers, "_pool", None))
+
+    def test_second_login_while_the_slot_is_busy_gets_503(self):
+        hashing, release = threading.Event(), threading.Event()
+
+        def slow_pbkdf2(*args):
+            hashing.set()
+            release.wait(10)
+            return pbkdf2_b64(*args)
+
+        first = {}
+        def log_in():
+            first["response"] = APIClient().post(self.url, {"username_or_email": "busy", "password": "12345678"})
+
+        with mock.patch.object(hashers, "pbkdf2_b64", slow_pbkdf2):
+            thread = threading.Thread(target=log_in)
+            thread.start()
+            self.assertTrue(hashing.wait(10))
+            second = APIClient().post(self.url, {"username_or_email": "busy", "password": "12345678"})
+            release.set()
+            thread.join(10)
+
+        self.assertEqual(second.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(second["Retry-After"], "2")
+        self.assertEqual(first["response"].status_code, status.HTTP_200_OK)
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase, override_settings
+from accounts.models import CustomUserModel, Role
+from authentication import EncryptedRefreshToken
+from authentication.role_claims import ROLES_CLAIM, ROLES_VERSION_CLAIM
+from common.permissions import RoleBasePermission
+from accounts.tests.helpers import LOCMEM
+
+
+@override_settings(CACHES=LOCMEM)
+class TestRoleClaim(TestCase):
+
+    def setUp(self):
+        ct = ContentType.objects.get_for_model(CustomUserModel)
+        self.role = Role.objects.create(permissions="Viewer", level=5, content=ct, can_view_all=True)
+        self.user = CustomUserModel.objects.create_user(
+            username="claim", email="claim@test.com", password="12345678", is_active=True
+        )
+        self.user.role.set([self.role])
+        self.view = SimpleNamespace(queryset=CustomUserModel.objects.none())
+
+    def _request(self, access, method="GET"):
+        user = CustomUserModel.objects.get(pk=self.user.pk)
+        return SimpleNamespace(user=user, auth=access, method=method, data={})
+
+    def test_access_token_carries_roles(self):
+        access = EncryptedRefreshToken.for_user(self.user).access_token
+        self.assertEqual(access[ROLES_VERSION_CLAIM], self.user.roles_version)
+        self.assertIn([self.role.id, 5, self.role.content_id, 4], access[ROLES_CLAIM])
+
+    def test_permission_decided_from_claim(self):
+        access = EncryptedRefreshToken.for_user(self.user).access_token
+        request = self._request(access)
+        ContentType.objects.get_for_model(CustomUserModel)
+        with self.assertNumQueries(0):
+            self.assertTrue(RoleBasePermission().has_permission(request, self.view))
+
+    def test_role_change_makes_claim_stale(self):
+        access = EncryptedRefreshToken.for_user(self.user).access_token
+        self.role.can_view_all = False
+        self.role.save()
+        request = self._request(access)
+        self.assertNotEqual(access[ROLES_VERSION_CLAIM], request.user.roles_version)
+        self.assertFalse(RoleBasePermission().has_permission(request, self.view))
+
+    def test_refresh_picks_up_new_roles(self):
+        refresh = EncryptedRefreshToken.for_user(self.user)
+        self.user.role.clear()
+        access = EncryptedRefreshToken(str(refresh)).access_token
+        self.assertEqual(access[ROLES_CLAIM], [])
+        self.assertEqual(access[ROLES_VERSION_CLAIM], CustomUserModel.objects.get(pk=self.user.pk).roles_version)
@@ -0,0 +1,116 @@
+from unittest import mock
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from accounts.models import CustomUserModel, ProfileSample
+from authentication import EncryptedRefreshToken
+from common import profiling
+from middleware import ProfilingMiddleware
+from accounts.tests.helpers import LOCMEM
+
+
+def view(request):
+    return HttpResponse(str(CustomUserModel.objects.count()))
+
+
+class TestSampling(TestCase):
+
+    def test_parse_rates(self):
+        self.assertEqual(profiling.parse_rates(" /api/login/=0.05, /api/=0.01,"), {"/api/login/": 0.05, "/api/": 0.01})
+        self.assertEqual(profiling.parse_rates(""), {})
+
+    @override_settings(PROFILING_SAMPLE_RATE=0.5, PROFILING_ENDPOINT_RATES="/api/=0,/api/login/=1")
+    def test_longest_prefix_wins(self):
+        self.assertEqual(profiling.sample_rate("/api/login/"), 1)
+        self.assertEqual(profiling.sample_rate("/api/users/"), 0)
+        self.assertEqual(profiling.sample_rate("/admin/"), 0.5)
+        self.assertTrue(profiling.sampled("/api/login/"))
+        self.assertFalse(profiling.sampled("/api/users/"))
+
+
+@override_settings(CACHES=LOCMEM, PROFILING_SAMPLE_RATE=0)
+class TestProfilingMiddleware(TestCase):
+
+    def setUp(self):
+        self.samples = []
+        self.sink = profiling.BufferedSink(self.samples.extend, flush_interval=0.01)
+        patcher = mock.patch.object(profiling, "get_sink", return_value=self.sink)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.middleware = ProfilingMiddleware(view)
+        self.factory = RequestFactory()
+
+    def call(self, request):
+        response = self.middleware(request)
+        self.sink.flush()
+        return response
+
+    def staff_request(self, is_staff=True):
+        user = CustomUserModel.objects.create_user(
+            username="prof", email="prof@test.com", password="12345678", is_active=True, is_staff=is_staff
+        )
+        access = EncryptedRefreshToken.for_user(user).access_token
+        request = self.factory.get("/api/users/", headers={"X-Profile": "1", "X-Active-User": str(user.pk)})
+        request.COOKIES[f"access_token_{user.pk}"] = str(access)
+        return request
+
+    def test_unsampled_requests_are_not_recorded(self):
+        response = self.call(self.factory.get("/api/users/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.samples, [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request_records_timing_and_queries(self):
+        response = self.call(self.factory.get("/api/users/"))
+        [sample] = self.samples
+        self.assertEqual((sample["path"], sample["status"], sample["queries"]), ("/api/users/", 200, 1))
+        self.assertGreater(sample["duration_ms"], 0)
+        self.assertFalse(sample["forced"])
+        self.assertEqual(sample["stats"], "")
+        self.assertNotIn(profiling.ID_HEADER, response)
+
+    def test_header_from_staff_forces_a_full_profile(self):
+        response = self.call(self.staff_request())
+        [sample] = self.samples
+        self.assertTrue(sample["forced"])
+        self.assertIn("function calls", sample["stats"])
+        self.assertEqual(response[profiling.ID_HEADER], str(sample["sample_id"]))
+
+    def test_header_from_non_staff_is_ignored(self):
+        response = self.call(self.staff_request(is_staff=False))
+        self.assertEqual(self.samples, [])
+        self.assertNotIn(profiling.ID_HEADER, response)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    async def test_async_chain_records_timing(self):
+        async def async_view(request):
+            return HttpResponse("ok")
+
+        await ProfilingMiddleware(async_view)(self.factory.get("/api/users/"))
+        self.sink.flush()
+        [sample] = self.samples
+        self.assertIsNone(sample["queries"])
+        self.assertEqual(sample["status"], 200)
+
+
+class TestBufferedSink(TestCase):
+
+    def test_full_buffer_drops(self):
+        sink = profiling.BufferedSink(lambda batch: None, max_size=1)
+        with mock.patch.object(sink, "_ensure_thread"):
+            self.assertTrue(sink.put({}))
+            self.assertFalse(sink.put({}))
+
+    def test_batches_are_written(self):
+        batches = []
+        sink = profiling.BufferedSink(batches.append, batch_size=2, flush_interval=0.5)
+        for number in range(5):
+            sink.put(number)
+        sink.flush()
+        self.assertEqual(sorted(sum(batches, [])), list(range(5)))
+        self.assertTrue(all(len(batch) <= 2 for batch in batches))
+
+    def test_write_samples(self):
+        request = RequestFactory().post("/api/login/")
+        profiling.write_samples([profiling.build_sample(request, HttpResponse(status=201), 0.0123)])
+        sample = ProfileSample.objects.get()
+        self.assertEqual((sample.method, sample.path, sample.status, sample.duration_ms), ("POST", "/api/login/", 201, 12.3))
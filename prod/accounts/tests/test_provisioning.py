@@ -0,0 +1,108 @@
+from unittest import mock
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.urls import reverse
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.test import APITestCase
+from accounts.models import CustomUserModel, Role
+from accounts.provisioning import provision_users
+from accounts.tasks import send_activation_emails_batch_task
+from accounts.tests.helpers import LOCMEM
+
+
+@override_settings(CACHES=LOCMEM, BULK_HASH_WORKERS=2)
+@mock.patch("accounts.provisioning.send_activation_emails_batch_task")
+class TestProvisionUsers(TestCase):
+
+    def setUp(self):
+        self.manager_role = Role.objects.create(permissions="Manager", level=3)
+        CustomUserModel.objects.create_user(username="taken", email="taken@test.com", password="12345678")
+
+    def test_creates_users_roles_and_batches_emails(self, task):
+        rows = [
+            {"username": "bulk1", "email": "bulk1@test.com", "password": "pass-1234"},
+            {"username": "bulk2", "email": "bulk2@test.com", "roles": ["Manager"]},
+        ]
+        result = provision_users(rows)
+
+        self.assertEqual(result.errors, [])
+        self.assertEqual(len(result.created), 2)
+        bulk1 = CustomUserModel.objects.get(username="bulk1")
+        bulk2 = CustomUserModel.objects.get(username="bulk2")
+        self.assertTrue(bulk1.check_password("pass-1234"))
+        self.assertFalse(bulk2.has_usable_password())
+        self.assertEqual(list(bulk1.role.values_list("permissions", flat=True)), ["Employee"])
+        self.assertEqual(list(bulk2.role.values_list("permissions", flat=True)), ["Manager"])
+        self.assertEqual(bulk1.manager_path, f"/{bulk1.pk}/")
+        task.delay.assert_called_once()
+        self.assertEqual([item[1] for item in task.delay.call_args.args[0]], ["bulk1", "bulk2"])
+
+    def test_bad_rows_are_reported_without_aborting(self, task):
+        rows = [
+            {"username": "good", "email": "good@test.com"},
+            {"username": "taken", "email": "again@test.com"},
+            {"username": "good", "email": "dup@test.com"},
+            {"username": "noemail"},
+            {"username": "norole", "email": "norole@test.com", "roles": ["Ghost"]},
+        ]
+        result = provision_users(rows)
+
+        self.assertEqual(len(result.created), 1)
+        self.assertEqual([error["row"] for error in result.errors], [2, 3, 1, 4])
+        self.assertTrue(CustomUserModel.objects.filter(username="good", email="good@test.com").exists())
+        self.assertFalse(CustomUserModel.objects.filter(username="norole").exists())
+
+    def test_queries_do_not_grow_with_rows(self, task):
+        Role.objects.get_or_create(permissions="Employee", defaults={"level": 999})
+        rows = [{"username": f"q{i}", "email": f"q{i}@test.com"} for i in range(40)]
+        # 40 rows stay inside one INSERT under SQLite's 999 bind-parameter limit
+        # usernames, default role, savepoint, users, through-rows, manager_path, release
+        with self.assertNumQueries(7):
+            result = provision_users(rows, send_emails=False)
+        self.assertEqual(len(result.created), 40)
+        task.delay.assert_not_called()
+
+
+@override_settings(CACHES=LOCMEM)
+@mock.patch("accounts.provisioning.send_activation_emails_batch_task")
+class TestBulkEndpoint(APITestCase):
+
+    def setUp(self):
+        self.url = reverse("accounts:user-bulk")
+        self.admin = CustomUserModel.objects.create_superuser(username="admin", email="admin@test.com", password="12345678")
+        self.client.force_authenticate(self.admin)
+
+    def test_multi_status_on_partial_failure(self, task):
+        res = self.client.post(self.url, {"users": [
+            {"username": "api1", "email": "api1@test.com"},
+            {"username": "api2", "email": "not-an-email"},
+        ]}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(res.data["created"], 1)
+        self.assertEqual(res.data["errors"][0]["row"], 1)
+
+    def test_requires_admin(self, task):
+        user = CustomUserModel.objects.create_user(username="plain", email="plain@test.com", password="12345678")
+        self.client.force_authenticate(user)
+        res = self.client.post(self.url, {"users": []}, format="json")
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class TestActivationEmailBatch(TestCase):
+
+    def test_retry_resends_only_the_failed_emails(self):
+        items = [(1, "ok1", "ok1@test.com", "t1"), (2, "bad", "bad@test.com", "t2"), (3, "ok2", "ok2@test.com", "t3")]
+        send = EmailBackend.send_messages
+
+        def flaky(backend, messages):
+            if messages[0].to == ["bad@test.com"]:
+                raise ConnectionError("lost")
+            return send(backend, messages)
+
+        with mock.patch.object(EmailBackend, "send_messages", flaky), \
+                mock.patch.object(send_activation_emails_batch_task, "retry", side_effect=RuntimeError) as retry:
+            with self.assertRaises(RuntimeError):
+                send_activation_emails_batch_task.run(items)
+        self.assertEqual([message.to for message in mail.outbox], [["ok1@test.com"], ["ok2@test.com"]])
+        self.assertEqual(retry.call_args.kwargs["args"], ([items[1]],))
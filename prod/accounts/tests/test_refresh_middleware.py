@@ -0,0 +1,54 @@
+from unittest import mock
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from authentication import jwe
+from middleware import DecryptRefreshMiddleware, get_refresh_token
+
+
+class TestDecryptRefreshMiddleware(SimpleTestCase):
+
+    def setUp(self):
+        self.seen = {}
+        self.middleware = DecryptRefreshMiddleware(self.view)
+        self.factory = RequestFactory()
+
+    def view(self, request):
+        self.seen["request"] = request
+        return HttpResponse()
+
+    def request(self, path, cookie=None):
+        request = self.factory.post(path, HTTP_X_ACTIVE_USER="5")
+        if cookie:
+            request.COOKIES["refresh_token_5"] = cookie
+        self.middleware(request)
+        return self.seen["request"]
+
+    def test_refresh_paths_are_precomputed(self):
+        paths, dynamic = self.middleware.get_routes()
+        self.assertIn("/api/refresh-token/", paths)
+        self.assertIn("/api/logout/", paths)
+        self.assertNotIn("/api/users/", paths)
+        self.assertFalse(dynamic)
+
+    def test_other_routes_skip_resolve_and_decryption(self):
+        self.middleware.get_routes()
+        with mock.patch("middleware.decryption_jwe.resolve") as resolve, \
+                mock.patch.object(jwe, "decrypt") as decrypt:
+            request = self.request("/api/users/", cookie=jwe.encrypt("plain"))
+        self.assertIsNone(get_refresh_token(request))
+        resolve.assert_not_called()
+        decrypt.assert_not_called()
+
+    def test_decrypts_lazily_once(self):
+        encrypted = jwe.encrypt("refresh-token-value")
+        with mock.patch.object(jwe, "decrypt", wraps=jwe.decrypt) as decrypt:
+            request = self.request("/api/refresh-token/", cookie=encrypted)
+            decrypt.assert_not_called()
+            self.assertEqual(get_refresh_token(request), "refresh-token-value")
+            self.assertEqual(get_refresh_token(request), "refresh-token-value")
+        decrypt.assert_called_once()
+        self.assertIs(type(request), type(self.factory.post("/")))
+
+    def test_bad_or_missing_cookie_gives_none(self):
+        self.assertIsNone(get_refresh_token(self.request("/api/refresh-token/", cookie="not-a-jwe")))
+        self.assertIsNone(get_refresh_token(self.request("/api/refresh-token/")))
@@ -1,5 +1,8 @@
-from django.test import TestCase
-from accounts.api.serializers import SignUpSer
+from types import SimpleNamespace
+from django.test import TestCase, override_settings
+from accounts.api.serializers import SignUpSer, UserSerializer, UserListSerializer
+from accounts.models import CustomUserModel, Role
+from accounts.tests.helpers import LOCMEM
 
 class TestRegisterSerializer(TestCase):
 
@@ -14,3 +17,29 @@ class TestRegisterSerializer(TestCase):
         self.assertFalse(serializer.is_valid())
 
 
+
+@override_settings(CACHES=LOCMEM)
+class TestUserListSerializer(TestCase):
+
+    def setUp(self):
+        self.viewer = CustomUserModel.objects.create_user(username="viewer", email="v@test.com", password="x")
+        role = Role.objects.create(permissions="Shared", level=3)
+        for name in ["one", "two"]:
+            user = CustomUserModel.objects.create_user(username=name, email=f"{name}@test.com", password="x")
+            user.role.add(role)
+        self.users = CustomUserModel.objects.order_by("username")
+
+    def serialize_both(self, requester):
+        context = {"request": SimpleNamespace(user=requester)}
+        expected = UserSerializer(self.users.prefetch_related("role"), many=True, context=context).data
+        rows = list(self.users.values(*UserListSerializer.values_for(requester)))
+        return expected, UserListSerializer(rows, context=context).data
+
+    def test_same_output_as_user_serializer(self):
+        expected, fast = self.serialize_both(self.viewer)
+        self.assertEqual([dict(row) for row in expected], fast)
+
+    def test_same_output_for_superuser(self):
+        self.viewer.is_superuser = True
+        expected, fast = self.serialize_both(self.viewer)
+        self.assertEqual([dict(row) for row in expected], fast)
@@ -0,0 +1,107 @@
+import threading
+import time
+from unittest import mock
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.exceptions import TokenError
+from accounts.api.views import RefreshTokenView
+from accounts.models import CustomUserModel
+from authentication import EncryptedRefreshToken, jwe
+from authentication.tokens import refresh_flight_key
+from common.single_flight import single_flight
+from accounts.tests.helpers import LOCMEM
+
+
+@override_settings(CACHES=LOCMEM)
+class TestSingleFlight(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_callers_share_one_execution(self):
+        calls = []
+
+        def work():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"value": len(calls)}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(single_flight("k", work))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"value": 1}] * 5)
+        self.assertEqual(single_flight("k", work), {"value": 1})
+
+    def test_followers_run_the_work_when_the_leader_fails(self):
+        cache.add("flight:k:lock", 1, timeout=3)
+        threading.Timer(0.05, cache.delete, args=["flight:k:lock"]).start()
+        self.assertEqual(single_flight("k", lambda: "mine"), "mine")
+
+
+@override_settings(CACHES=LOCMEM)
+class TestRefreshSingleFlight(APITestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUserModel.objects.create_user(username="tabs", email="tabs@test.com", password="12345678")
+        self.refresh = EncryptedRefreshToken.for_user(self.user)
+
+    def post(self):
+        """Status and cookie values of one tab's refresh (the client jar reuses Morsels)."""
+        self.client.cookies[f"refresh_token_{self.user.pk}"] = self.refresh.encrypt()
+        response = self.client.post(reverse("accounts:_refresh_token"), HTTP_X_ACTIVE_USER=str(self.user.pk))
+        return response.status_code, {name: morsel.value for name, morsel in response.cookies.items()}
+
+    def test_tabs_share_one_rotation(self):
+        with mock.patch.object(RefreshTokenView, "mint", wraps=RefreshTokenView.mint) as mint:
+            first, second = self.post(), self.post()
+        mint.assert_called_once()
+
+        self.assertEqual(first, second)
+        self.assertEqual(first[0], 200)
+
+        rotated = jwe.decrypt(first[1][f"refresh_token_{self.user.pk}"])
+        self.assertNotEqual(EncryptedRefreshToken(rotated)["jti"], self.refresh["jti"])
+        with self.assertRaises(TokenError):
+            EncryptedRefreshToken(str(self.refresh))
+
+    def test_malformed_token_is_rejected_without_minting(self):
+        self.client.cookies[f"refresh_token_{self.user.pk}"] = jwe.encrypt("not-a-jwt")
+        with mock.patch.object(RefreshTokenView, "mint") as mint:
+            response = self.client.post(reverse("accounts:_refresh_token"), HTTP_X_ACTIVE_USER=str(self.user.pk))
+        self.assertEqual(response.status_code, 400)
+        mint.assert_not_called()
+
+    @override_settings(REFRESH_SINGLE_FLIGHT_TTL=0.2)
+    def test_rotated_token_is_refused_once_the_result_expires(self):
+        self.assertEqual(self.post()[0], 200)
+        time.sleep(0.3)
+        self.assertEqual(self.post()[0], 400)
+
+    def test_logout_drops_the_shared_result(self):
+        self.assertEqual(self.post()[0], 200)
+        # A tab still holding the old cookie logs out (LogoutView sits behind RoleBasePermission)
+        self.user.is_superuser = True
+        self.client.force_authenticate(self.user)
+        self.client.cookies[f"refresh_token_{self.user.pk}"] = self.refresh.encrypt()
+        response = self.client.post(reverse("accounts:logout_refresh_token"), HTTP_X_ACTIVE_USER=str(self.user.pk))
+        self.assertEqual(response.status_code, 200)
+        self.client.force_authenticate(None)
+        # Replaying that token no longer gets the pair minted before the logout
+        self.assertEqual(self.post()[0], 400)
+
+    def test_revoking_all_sessions_makes_shared_results_unreachable(self):
+        key = refresh_flight_key(str(self.refresh))
+        self.assertEqual(self.post()[0], 200)
+        self.assertIsNotNone(cache.get(f"flight:{key}:result"))
+        self.user.revoke_all_sessions()
+        self.assertNotEqual(refresh_flight_key(str(self.refresh)), key)
+        # No shared pair for the revoked token: minting runs and refuses it
+        self.assertEqual(self.post()[0], 400)
@@ -0,0 +1,99 @@
+import time
+from unittest import mock
+import redis
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from common import throttling
+from accounts.tests.helpers import LOCMEM
+
+
+def rates(**overrides):
+    return {**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_RATES": overrides}
+
+
+class TestSlidingWindow(SimpleTestCase):
+
+    def test_parse_rate(self):
+        self.assertEqual(throttling.parse_rate("10/min"), (10, 60000))
+        self.assertEqual(throttling.parse_rate("5/15m"), (5, 900000))
+        with self.assertRaises(ValueError):
+            throttling.parse_rate("often")
+
+    def test_previous_window_is_weighted(self):
+        store = throttling.LocalWindowStore()
+        limits = [("k", 4, 1000)]
+        with mock.patch("common.throttling.time.time", return_value=10.9):
+            self.assertEqual([store.hit(limits) for _ in range(4)], [0, 0, 0, 0])
+            self.assertGreater(store.hit(limits), 0)
+        # 10% into the next window 90% of the previous 4 hits still count: 3.6 + 1 > 4,
+        # and the estimate drops enough 150ms later
+        with mock.patch("common.throttling.time.time", return_value=11.1):
+            self.assertEqual(store.hit(limits), 150)
+        with mock.patch("common.throttling.time.time", return_value=11.3):
+            self.assertEqual(store.hit(limits), 0)
+            self.assertGreater(store.hit(limits), 0)
+
+    def test_denied_hit_is_not_counted_anywhere(self):
+        store = throttling.LocalWindowStore()
+        store.hit([("full", 1, 60000)])
+        self.assertGreater(store.hit([("open", 5, 60000), ("full", 1, 60000)]), 0)
+        self.assertEqual(store._windows.get("open"), None)
+
+    def test_local_store_stays_bounded(self):
+        store = throttling.LocalWindowStore(maxsize=3)
+        for ip in range(10):
+            store.hit([(f"ip:{ip}", 5, 60000)])
+        self.assertEqual(len(store._windows), 3)
+        self.assertIsNone(store._windows.get("ip:0"))
+        self.assertEqual(sum(store._windows.get("ip:9").values()), 1)
+
+    def test_idle_local_keys_expire(self):
+        store = throttling.LocalWindowStore()
+        store.hit([("short", 5, 100)])
+        time.sleep(0.25)
+        self.assertIsNone(store._windows.get("short"))
+
+    @override_settings(CACHES={"default": {"BACKEND": "django_redis.cache.RedisCache", "LOCATION": "redis://x"}})
+    def test_redis_failure_falls_back_to_local_and_opens_breaker(self):
+        engine = throttling.ThrottleEngine()
+        with mock.patch.object(engine.redis, "hit", side_effect=ConnectionError("down")) as hit:
+            self.assertEqual(engine.hit([("k", 1, 60000)]), 0)
+            self.assertGreater(engine.hit([("k", 1, 60000)]), 0)
+        self.assertEqual(hit.call_count, 1)
+
+    @override_settings(THROTTLE_REDIS_TIMEOUT=0.05, CACHES={"default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "rediss://cache.internal:6380/2",
+        "OPTIONS": {"PASSWORD": "s3cret", "SOCKET_TIMEOUT": 5, "CONNECTION_POOL_KWARGS": {"ssl_cert_reqs": "none"}},
+    }})
+    def test_redis_client_follows_the_cache_options(self):
+        pool = throttling.RedisWindowStore._client().connection_pool
+        self.assertIs(pool.connection_class, redis.SSLConnection)
+        self.assertEqual(pool.connection_kwargs["password"], "s3cret")
+        self.assertEqual(pool.connection_kwargs["db"], 2)
+        self.assertEqual(pool.connection_kwargs["ssl_cert_reqs"], "none")
+        self.assertEqual(pool.connection_kwargs["socket_timeout"], 0.05)
+
+
+@override_settings(CACHES=LOCMEM, REST_FRAMEWORK=rates(**{"login.account": "2/min", "login.ip": "100/min"}))
+class TestLoginThrottle(APITestCase):
+
+    def setUp(self):
+        throttling.engine.local.clear()
+        self.url = reverse("accounts:login_view_api")
+
+    def tearDown(self):
+        throttling.engine.local.clear()
+
+    def test_account_limit_returns_429_with_retry_after(self):
+        data = {"username_or_email": "Victim@test.com", "password": "guess"}
+        for _ in range(2):
+            self.assertEqual(self.client.post(self.url, data).status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(self.url, {**data, "username_or_email": "victim@TEST.com"})
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertTrue(1 <= int(res["Retry-After"]) <= 60)
+        other = self.client.post(self.url, {"username_or_email": "someone-else", "password": "guess"})
+        self.assertEqual(other.status_code, status.HTTP_400_BAD_REQUEST)
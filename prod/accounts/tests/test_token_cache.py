@@ -0,0 +1,41 @@
+from datetime import timedelta
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+from authentication import token_cache
+
+
+@override_settings(ACCESS_TOKEN_CACHE_ENABLED=True)
+class TestVerifiedTokenCache(SimpleTestCase):
+
+    def setUp(self):
+        token_cache.clear()
+        token = AccessToken()
+        token["user_id"] = 7
+        self.raw = str(token)
+
+    def test_repeat_verification_is_skipped(self):
+        first = token_cache.get_verified(self.raw)
+        with mock.patch("authentication.token_cache.AccessToken", side_effect=AssertionError("re-verified")):
+            second = token_cache.get_verified(self.raw)
+        self.assertIs(first, second)
+        self.assertEqual(second["user_id"], 7)
+
+    def test_malformed_tokens_are_rejected_every_time(self):
+        tampered = self.raw[:-2] + ("AA" if not self.raw.endswith("AA") else "BB")
+        for _ in range(2):
+            with self.assertRaises(TokenError):
+                token_cache.get_verified(tampered)
+        self.assertEqual(token_cache.get_stats()["size"], 0)
+
+    def test_entry_expires_with_the_token(self):
+        token = AccessToken()
+        token.set_exp(lifetime=timedelta(seconds=30))
+        raw = str(token)
+        token_cache.get_verified(raw)
+        with mock.patch("common.lru.time.monotonic", return_value=10**9):
+            with self.assertRaises(TokenError):
+                with mock.patch("rest_framework_simplejwt.tokens.aware_utcnow") as now:
+                    now.return_value = token.current_time + timedelta(seconds=31)
+                    token_cache.get_verified(raw)
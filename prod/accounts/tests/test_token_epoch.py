@@ -0,0 +1,96 @@
+from django.contrib.auth.hashers import make_password
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.exceptions import TokenError
+from accounts.models import CustomUserModel
+from authentication import CookieJWTAuthentication, EncryptedRefreshToken, user_cache
+from authentication.token_epoch import EPOCH_CLAIM
+from accounts.tests.helpers import LOCMEM
+
+
+@override_settings(CACHES=LOCMEM)
+class TestTokenEpoch(TestCase):
+
+    def setUp(self):
+        user_cache.clear_local()
+        self.user = CustomUserModel.objects.create_user(username="ep", email="ep@test.com", password="12345678")
+        self.user.is_active = True
+        self.user.save()
+
+    def authenticate(self, access):
+        request = APIRequestFactory().get("/", HTTP_X_ACTIVE_USER=str(self.user.pk))
+        request.COOKIES[f"access_token_{self.user.pk}"] = str(access)
+        return CookieJWTAuthentication().authenticate(request)
+
+    def test_tokens_carry_the_epoch(self):
+        refresh = EncryptedRefreshToken.for_user(self.user)
+        self.assertEqual(refresh[EPOCH_CLAIM], self.user.token_epoch)
+        self.assertEqual(refresh.access_token[EPOCH_CLAIM], self.user.token_epoch)
+        self.assertEqual(self.authenticate(refresh.access_token)[0].pk, self.user.pk)
+
+    def test_revoke_all_sessions_invalidates_every_token(self):
+        first = EncryptedRefreshToken.for_user(self.user)
+        second = EncryptedRefreshToken.for_user(self.user)
+        access = first.access_token
+        self.authenticate(access)
+
+        with self.assertNumQueries(2):  # the UPDATE + refresh of the instance
+            self.user.revoke_all_sessions()
+
+        for token in (first, second):
+            with self.assertRaises(TokenError):
+                EncryptedRefreshToken(str(token))
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(access)
+        EncryptedRefreshToken(str(EncryptedRefreshToken.for_user(self.user)))
+
+    def test_password_change_revokes_but_rehash_does_not(self):
+        token = EncryptedRefreshToken.for_user(self.user)
+        hashers = ["django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher", "django.contrib.auth.hashers.MD5PasswordHasher"]
+        with self.settings(PASSWORD_HASHERS=hashers):
+            CustomUserModel.objects.filter(pk=self.user.pk).update(password=make_password("12345678", hasher="md5"))
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.check_password("12345678"))
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha1$"))
+        EncryptedRefreshToken(str(token))
+
+        self.user.set_password("new-password-1")
+        self.user.save()
+        with self.assertRaises(TokenError):
+            EncryptedRefreshToken(str(token))
+
+    def test_stale_instance_does_not_write_counters_back(self):
+        stale = CustomUserModel.objects.get(pk=self.user.pk)
+        self.user.revoke_all_sessions()
+        CustomUserModel.objects.filter(pk=self.user.pk).update(roles_version=7)
+        stale.first_name = "Edited"
+        stale.save()
+        fresh = CustomUserModel.objects.get(pk=self.user.pk)
+        self.assertEqual((fresh.first_name, fresh.token_epoch, fresh.roles_version), ("Edited", 1, 7))
+
+    def test_password_change_bumps_the_stored_epoch(self):
+        stale = CustomUserModel.objects.get(pk=self.user.pk)
+        self.user.revoke_all_sessions()
+        stale.set_password("new-password-1")
+        stale.save()
+        self.assertEqual(stale.token_epoch, 2)
+        self.assertEqual(CustomUserModel.objects.get(pk=self.user.pk).token_epoch, 2)
+
+
+@override_settings(CACHES=LOCMEM)
+class TestLogoutAllView(APITestCase):
+
+    def test_logout_all_revokes_and_clears_cookies(self):
+        user = CustomUserModel.objects.create_user(username="all", email="all@test.com", password="12345678")
+        refresh = EncryptedRefreshToken.for_user(user)
+        self.client.cookies[f"access_token_{user.pk}"] = str(refresh.access_token)
+
+        response = self.client.post(reverse("accounts:logout-all"), HTTP_X_ACTIVE_USER=str(user.pk))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.cookies[f"refresh_token_{user.pk}"].value, "")
+        with self.assertRaises(TokenError):
+            EncryptedRefreshToken(str(refresh))
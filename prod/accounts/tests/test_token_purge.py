@@ -0,0 +1,43 @@
+from datetime import timedelta
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from accounts.token_purge import purge_expired_tokens
+from accounts.tests.helpers import LOCMEM
+
+
+@override_settings(CACHES=LOCMEM)
+class TestTokenPurge(TestCase):
+
+    def make(self, jti, expires_in, blacklisted=False):
+        now = timezone.now()
+        token = OutstandingToken.objects.create(
+            jti=jti, token="x", created_at=now, expires_at=now + timedelta(seconds=expires_in)
+        )
+        if blacklisted:
+            BlacklistedToken.objects.create(token=token)
+        return token
+
+    def setUp(self):
+        for i in range(5):
+            self.make(f"old-{i}", -3600, blacklisted=i % 2 == 0)
+        self.make("live-blacklisted", 3600, blacklisted=True)
+        self.make("live", 3600)
+
+    def test_deletes_only_expired_rows_from_both_tables(self):
+        results = purge_expired_tokens(batch_size=2, pause=0, max_seconds=0)
+
+        self.assertEqual(results["blacklisted"]["deleted"], 3)
+        self.assertEqual(results["outstanding"]["deleted"], 5)
+        self.assertTrue(all(r["finished"] for r in results.values()))
+        self.assertEqual(set(OutstandingToken.objects.values_list("jti", flat=True)), {"live", "live-blacklisted"})
+        self.assertEqual(BlacklistedToken.objects.get().token.jti, "live-blacklisted")
+
+    def test_time_boxed_run_resumes_on_the_next_call(self):
+        first = purge_expired_tokens(batch_size=2, pause=0, max_seconds=1e-9)
+        self.assertFalse(first["blacklisted"]["finished"])
+        self.assertNotIn("outstanding", first)
+        self.assertEqual(first["blacklisted"]["deleted"], 2)
+
+        purge_expired_tokens(batch_size=2, pause=0, max_seconds=0)
+        self.assertEqual(OutstandingToken.objects.count(), 2)
@@ -0,0 +1,90 @@
+import io
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from accounts.models import CustomUserModel
+from authentication import EncryptedRefreshToken, user_cache
+from authentication.token_state import check_token_state_cache
+from accounts.tests.helpers import LOCMEM
+
+TOKEN_STATE_LOCMEM = {
+    **LOCMEM,
+    "token_state": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "token_state"},
+}
+
+
+@override_settings(CACHES=TOKEN_STATE_LOCMEM)
+class TestTokenStateStores(TestCase):
+
+    def setUp(self):
+        self.user = CustomUserModel.objects.create_user(username="tok", email="tok@test.com", password="12345678")
+
+    @override_settings(TOKEN_STATE_BACKEND="db")
+    def test_db_store_keeps_simplejwt_tables(self):
+        token = EncryptedRefreshToken.for_user(self.user)
+        self.assertTrue(OutstandingToken.objects.filter(jti=token["jti"], user=self.user).exists())
+        token.blacklist()
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=token["jti"]).exists())
+        with self.assertRaises(TokenError):
+            EncryptedRefreshToken(str(token))
+
+    @override_settings(TOKEN_STATE_BACKEND="redis")
+    def test_redis_store_writes_nothing_to_postgres(self):
+        user_cache.get_user(self.user.pk)  # the epoch check reads the cached user
+        with self.assertNumQueries(0):
+            token = EncryptedRefreshToken.for_user(self.user)
+            raw = str(token)
+            EncryptedRefreshToken(raw)
+            token.blacklist()
+        with self.assertRaises(TokenError):
+            EncryptedRefreshToken(raw)
+        self.assertFalse(OutstandingToken.objects.exists())
+
+    def test_migrate_token_state_copies_blacklist(self):
+        with self.settings(TOKEN_STATE_BACKEND="db"):
+            revoked = EncryptedRefreshToken.for_user(self.user)
+            revoked.blacklist()
+            live = EncryptedRefreshToken.for_user(self.user)
+        call_command("migrate_token_state", stdout=io.StringIO())
+        with self.settings(TOKEN_STATE_BACKEND="redis"):
+            with self.assertRaises(TokenError):
+                EncryptedRefreshToken(str(revoked))
+            EncryptedRefreshToken(str(live))
+
+
+def redis_cache(url):
+    return {"BACKEND": "django_redis.cache.RedisCache", "LOCATION": url}
+
+
+@override_settings(TOKEN_STATE_BACKEND="redis")
+class TestTokenStateCacheCheck(TestCase):
+
+    def error_ids(self):
+        return [error.id for error in check_token_state_cache()]
+
+    @override_settings(TOKEN_STATE_BACKEND="db", TOKEN_STATE_CACHE="default")
+    def test_db_backend_needs_no_cache(self):
+        self.assertEqual(self.error_ids(), [])
+
+    @override_settings(TOKEN_STATE_CACHE="default")
+    def test_default_cache_is_refused(self):
+        self.assertEqual(self.error_ids(), ["token_state.E001"])
+
+    @override_settings(TOKEN_STATE_CACHE="token_state", CACHES={"default": redis_cache("redis://cache:6379/1")})
+    def test_missing_alias_is_refused(self):
+        self.assertEqual(self.error_ids(), ["token_state.E002"])
+
+    @override_settings(TOKEN_STATE_CACHE="token_state", CACHES={
+        "default": redis_cache("redis://cache:6379/1"),
+        "token_state": redis_cache("redis://cache:6379/2"),
+    })
+    def test_same_server_is_refused(self):
+        self.assertEqual(self.error_ids(), ["token_state.E003"])
+
+    @override_settings(TOKEN_STATE_CACHE="token_state", CACHES={
+        "default": redis_cache("redis://cache:6379/1"),
+        "token_state": redis_cache("redis://tokens:6379/0"),
+    })
+    def test_dedicated_server_passes(self):
+        self.assertEqual(self.error_ids(), [])
@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from accounts.models import CustomUserModel, Role
+from authentication import user_cache
+from accounts.tests.helpers import LOCMEM
+
+
+@override_settings(CACHES=LOCMEM, USER_CACHE_ENABLED=True)
+class TestUserCache(TestCase):
+
+    def setUp(self):
+        user_cache.clear_local()
+        self.user = CustomUserModel.objects.create_user(
+            username="cached", email="cached@test.com", password="12345678", is_active=True
+        )
+        user_cache.invalidate_user(self.user.pk)
+
+    def test_second_lookup_skips_db(self):
+        user_cache.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            cached = user_cache.get_user(self.user.pk)
+        self.assertEqual(cached.pk, self.user.pk)
+        self.assertEqual(cached.email, "cached@test.com")
+
+    def test_shared_tier_used_after_local_eviction(self):
+        user_cache.get_user(self.user.pk)
+        user_cache.clear_local()
+        with self.assertNumQueries(0):
+            user_cache.get_user(self.user.pk)
+
+    def test_password_is_not_cached(self):
+        user_cache.get_user(self.user.pk)
+        cached = user_cache.get_user(self.user.pk)
+        self.assertIn("password", cached.get_deferred_fields())
+        self.assertTrue(cached.check_password("12345678"))
+
+    def test_save_invalidates(self):
+        user_cache.get_user(self.user.pk)
+        self.user.first_name = "changed"
+        self.user.save()
+        self.assertEqual(user_cache.get_user(self.user.pk).first_name, "changed")
+
+    def test_save_invalidates_again_on_commit(self):
+        user_cache.get_user(self.user.pk)
+        key = user_cache._cache_key(self.user.pk)
+        stale = cache.get(key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = "changed"
+            self.user.save()
+            # A concurrent request re-caches the row before this transaction commits
+            cache.set(key, stale)
+        user_cache.clear_local()
+        self.assertEqual(user_cache.get_user(self.user.pk).first_name, "changed")
+
+    def test_role_change_invalidates(self):
+        user_cache.get_user(self.user.pk)
+        role = Role.objects.create(permissions="Cache role")
+        self.user.role.add(role)
+        with self.assertNumQueries(1):
+            user_cache.get_user(self.user.pk)
+
+    def test_missing_user_raises(self):
+        with self.assertRaises(CustomUserModel.DoesNotExist):
+            user_cache.get_user(987654)
+
+    @override_settings(USER_CACHE_ENABLED=False)
+    def test_disabled_always_queries(self):
+        user_cache.get_user(self.user.pk)
+        with self.assertNumQueries(1):
+            user_cache.get_user(self.user.pk)
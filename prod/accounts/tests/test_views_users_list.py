@@ -0,0 +1,135 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.http import HttpResponse
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+from rest_framework import status
+from accounts.models import CustomUserModel, Role
+from authentication import EncryptedRefreshToken
+from common.conditional import bump_list_generation, list_generation, set_validators
+from accounts.tests.helpers import LOCMEM
+
+
+@override_settings(CACHES=LOCMEM)
+class TestUserList(APITestCase):
+
+    def setUp(self):
+        ct = ContentType.objects.get_for_model(CustomUserModel)
+        role = Role.objects.create(permissions="Lister", level=5, content=ct, can_view_all=True)
+        self.user = CustomUserModel.objects.create_user(
+            username="mmm", email="me@test.com", password="12345678", is_active=True
+        )
+        self.user.role.set([role])
+        for name in ["aaa", "bbb", "ccc", "zzz"]:
+            CustomUserModel.objects.create_user(username=name, email=f"{name}@test.com", password="x")
+        self.login(self.user)
+
+    def login(self, user):
+        access = EncryptedRefreshToken.for_user(user).access_token
+        self.client.cookies[f"access_token_{user.pk}"] = str(access)
+        self.client.credentials(HTTP_X_ACTIVE_USER=str(user.pk))
+
+    def test_current_user_first_then_keyset_pages(self):
+        res = self.client.get("/api/users/")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        names = [row["username"] for row in res.data["results"]]
+        self.assertEqual(names, ["mmm", "aaa", "bbb"])
+
+        res = self.client.get(res.data["next"])
+        names = [row["username"] for row in res.data["results"]]
+        self.assertEqual(names, ["ccc", "zzz"])
+        self.assertIsNone(res.data["next"])
+
+        res = self.client.get(res.data["previous"])
+        names = [row["username"] for row in res.data["results"]]
+        self.assertEqual(names, ["mmm", "aaa", "bbb"])
+        self.assertIsNone(res.data["previous"])
+
+    def test_no_count_or_offset(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get("/api/users/")
+        sql = " ".join(
+            q["sql"] for q in ctx.captured_queries if "accounts_customusermodel" in q["sql"]
+        ).upper()
+        self.assertNotIn("COUNT(", sql)
+        self.assertNotIn("OFFSET", sql)
+
+    def test_others_see_limited_fields(self):
+        res = self.client.get("/api/users/")
+        me, other = res.data["results"][0], res.data["results"][1]
+        self.assertIn("email", me)
+        self.assertNotIn("email", other)
+
+    @override_settings(USER_LIST_PAGINATION="page")
+    def test_legacy_page_mode(self):
+        res = self.client.get("/api/users/")
+        self.assertEqual(res.data["count"], 5)
+        self.assertEqual(res.data["results"][0]["username"], "mmm")
+
+    def test_sparse_fields_on_list(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get("/api/users/?fields=username,id")
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for row in res.data["results"]:
+            self.assertEqual(set(row), {"username", "id"})
+        self.assertFalse(any("accounts_role" in q["sql"] for q in ctx.captured_queries))
+
+    def test_sparse_fields_keep_visibility_rules(self):
+        res = self.client.get("/api/users/?fields=username,email")
+        me, other = res.data["results"][0], res.data["results"][1]
+        self.assertEqual(me, {"username": "mmm", "email": "me@test.com"})
+        self.assertEqual(other, {"username": "aaa"})
+
+    def test_sparse_fields_on_detail(self):
+        other = CustomUserModel.objects.get(username="aaa")
+        res = self.client.get(f"/api/users/{other.pk}/?fields=username,id,email")
+        self.assertEqual(res.data, {"id": other.pk, "username": "aaa"})
+
+    def test_unknown_field_rejected(self):
+        res = self.client.get("/api/users/?fields=username,password")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_conditional_get(self):
+        res = self.client.get("/api/users/")
+        etag = res.headers["ETag"]
+        res = self.client.get("/api/users/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        CustomUserModel.objects.filter(username="aaa").first().save()
+        res = self.client.get("/api/users/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_validators_keep_existing_vary(self):
+        response = HttpResponse()
+        response.headers["Vary"] = "Accept-Language"
+        set_validators(response, etag='"x"')
+        self.assertEqual(response.headers["Vary"], "Accept-Language, Cookie, X-Active-User")
+
+    def test_list_generation_bumped_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            bump_list_generation()
+            # A list GET racing the writer sees pre-commit rows under this value
+            seen = list_generation()
+        self.assertNotEqual(list_generation(), seen)
+
+    def test_role_change_invalidates_etag(self):
+        etag = self.client.get("/api/users/").headers["ETag"]
+        role = Role.objects.create(permissions="Extra", level=9)
+        CustomUserModel.objects.get(username="aaa").role.add(role)
+        res = self.client.get("/api/users/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_conditional_get(self):
+        other = CustomUserModel.objects.get(username="bbb")
+        res = self.client.get(f"/api/users/{other.pk}/")
+        self.assertNotIn("Last-Modified", res.headers)
+        res = self.client.get(f"/api/users/{other.pk}/", HTTP_IF_NONE_MATCH=res.headers["ETag"])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_role_change_ignores_if_modified_since(self):
+        other = CustomUserModel.objects.get(username="bbb")
+        since = "Fri, 01 Jan 2100 00:00:00 GMT"
+        other.role.add(Role.objects.create(permissions="Extra", level=9))
+        res = self.client.get(f"/api/users/{other.pk}/", HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -0,0 +1,89 @@
+"""
+Purge of expired refresh-token rows (simplejwt token_blacklist tables).
+
+Rows are deleted in bounded batches picked through the expires_at index
+(migration 0019), each batch its own short autocommit transaction, with a
+pause in between so replication and vacuum keep up. The delete condition is
+the cursor: an interrupted or time-boxed run simply continues where it
+stopped on the next run, and progress is kept in the cache for reporting.
+"""
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_KEY = "token_purge:progress"
+
+
+def _purge(queryset, order_by, batch_size, pause, deadline, report):
+    """Delete `queryset` rows batch by batch; returns (deleted, finished)."""
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by(order_by).values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted, True
+        # Delete by primary key only: the batch's rows, nothing more
+        queryset.model.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+        report(deleted)
+        if len(ids) < batch_size:
+            return deleted, True
+        if deadline is not None and time.monotonic() >= deadline:
+            return deleted, False
+        if pause:
+            time.sleep(pause)
+
+
+def purge_expired_tokens(batch_size=None, pause=None, max_seconds=None, now=None):
+    """
+    Delete expired BlacklistedToken rows, then expired OutstandingToken rows.
+    Returns a per-table report: deleted rows, seconds, rows/sec and whether the
+    table was finished before `max_seconds` ran out.
+    """
+    batch_size = batch_size or getattr(settings, "TOKEN_PURGE_BATCH_SIZE", 1000)
+    pause = getattr(settings, "TOKEN_PURGE_PAUSE", 0.05) if pause is None else pause
+    max_seconds = getattr(settings, "TOKEN_PURGE_MAX_SECONDS", 300) if max_seconds is None else max_seconds
+    now = now or timezone.now()
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+
+    tables = (
+        ("blacklisted", BlacklistedToken.objects.filter(token__expires_at__lt=now), "token__expires_at"),
+        ("outstanding", OutstandingToken.objects.filter(expires_at__lt=now), "expires_at"),
+    )
+    results = {}
+    for name, queryset, order_by in tables:
+        start = time.monotonic()
+
+        def report(deleted, name=name, start=start):
+            _save_progress(name, deleted, time.monotonic() - start)
+
+        deleted, finished = _purge(queryset, order_by, batch_size, pause, deadline, report)
+        elapsed = time.monotonic() - start
+        results[name] = {
+            "deleted": deleted,
+            "seconds": round(elapsed, 2),
+            "rows_per_sec": round(deleted / elapsed, 1) if elapsed else None,
+            "finished": finished,
+        }
+        logger.info(f"Token purge {name}: {results[name]}")
+        if not finished:
+            break
+    return results
+
+
+def _save_progress(table, deleted, seconds):
+    try:
+        cache.set(PROGRESS_KEY, {"table": table, "deleted": deleted, "seconds": round(seconds, 2)}, timeout=3600)
+    except Exception as e:
+        logger.debug(f"Token purge progress not saved: {e}")
+
+
+def get_progress():
+    try:
+        return cache.get(PROGRESS_KEY)
+    except Exception:
+        return None
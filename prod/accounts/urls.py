@@ -2,9 +2,11 @@
 
 
 
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from accounts.api.views import UserViewSet , LogInView , SignUpView , ActivateAccountView , GoogleAuthInitView,GoogleAuthCallbackView , RefreshTokenView,LogoutView , ResetPassword , PasswordResetConfirmView
+from accounts.api.views import UserViewSet , LogInView , SignUpView , ActivateAccountView , GoogleAuthInitView,GoogleAuthCallbackView , RefreshTokenView,LogoutView , LogoutAllView , ResetPassword , PasswordResetConfirmView , MetricsView
+from accounts.api.async_views import AsyncLogInView, AsyncGoogleAuthCallbackView, AsyncRefreshTokenView, AsyncLogoutView
 
 app_name = "accounts"
 
@@ -13,16 +15,30 @@ router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
 router1 = DefaultRouter()
 
-urlpatterns = [
-    path('', include(router.urls)),
-    path('login/' , LogInView.as_view() , name="login_view_api"),
-    path('signup/' , SignUpView.as_view() , name="signup_view_api"),
-    path("activate/<uidb64>/<token>/", ActivateAccountView.as_view(), name="activate"),
-    path("auth/google/init/", GoogleAuthInitView.as_view(), name="google-init"),
-    path('auth/google/callback/', GoogleAuthCallbackView.as_view(), name='google-callback'),
-    path('refresh-token/' , RefreshTokenView.as_view() , name="_refresh_token"),
-    path('logout/' , LogoutView.as_view() , name="logout_refresh_token"),
-    path('reset-password/' , ResetPassword.as_view() , name="reset-password"),
-    path('reset-password/<uidb64>/<token>/' , PasswordResetConfirmView.as_view() , name="reset-password-activation")
-
-]
+# ASGI deployments serve the auth endpoints from the async views (ASYNC_AUTH_VIEWS);
+# only one of the two implementations is ever routed
+AUTH_VIEWS = {
+    False: (LogInView, GoogleAuthCallbackView, RefreshTokenView, LogoutView),
+    True: (AsyncLogInView, AsyncGoogleAuthCallbackView, AsyncRefreshTokenView, AsyncLogoutView),
+}
+
+
+def build_urlpatterns(async_auth_views):
+    login_view, google_callback_view, refresh_view, logout_view = AUTH_VIEWS[async_auth_views]
+    return [
+        path('', include(router.urls)),
+        path('login/' , login_view.as_view() , name="login_view_api"),
+        path('signup/' , SignUpView.as_view() , name="signup_view_api"),
+        path("activate/<uidb64>/<token>/", ActivateAccountView.as_view(), name="activate"),
+        path("auth/google/init/", GoogleAuthInitView.as_view(), name="google-init"),
+        path('auth/google/callback/', google_callback_view.as_view(), name='google-callback'),
+        path('refresh-token/' , refresh_view.as_view() , name="_refresh_token"),
+        path('logout/' , logout_view.as_view() , name="logout_refresh_token"),
+        path('logout-all/' , LogoutAllView.as_view() , name="logout-all"),
+        path('reset-password/' , ResetPassword.as_view() , name="reset-password"),
+        path('reset-password/<uidb64>/<token>/' , PasswordResetConfirmView.as_view() , name="reset-password-activation"),
+        path('metrics/' , MetricsView.as_view() , name="worker-metrics"),
+    ]
+
+
+urlpatterns = build_urlpatterns(getattr(settings, "ASYNC_AUTH_VIEWS", False))
@@ -1,8 +1,9 @@
 from rest_framework.authentication import BaseAuthentication
-from rest_framework_simplejwt.tokens import AccessToken
 from rest_framework_simplejwt.exceptions import TokenError
 from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import get_user_model
+from authentication import user_cache, token_cache
+from authentication.token_epoch import epoch_matches
 
 User = get_user_model()
 
@@ -25,9 +26,13 @@ class CookieJWTAuthentication(BaseAuthentication):
             return None
 
         try:
-            validated = AccessToken(token)
-            user = User.objects.get(id=validated["user_id"])
+            validated = token_cache.get_verified(token)
+            user = user_cache.get_user(validated["user_id"])
         except Exception:
             raise AuthenticationFailed("Invalid or expired token")
 
+        # Logged out everywhere / password changed since the token was issued
+        if not epoch_matches(validated, user):
+            raise AuthenticationFailed("Invalid or expired token")
+
         return (user, validated)
@@ -0,0 +1,48 @@
+"""
+Spreading access-token refreshes over time.
+
+Access tokens get a lifetime randomly shortened by up to
+ACCESS_TOKEN_LIFETIME_JITTER (a fraction of ACCESS_TOKEN_LIFETIME), and auth
+responses tell the client when to refresh:
+
+- X-Token-Expires-In: seconds until the access token expires.
+- X-Token-Refresh-After: seconds after which to refresh pre-emptively, drawn
+  from [TOKEN_REFRESH_AFTER_MIN, TOKEN_REFRESH_AFTER_MAX] of the remaining
+  lifetime.
+
+Clients that logged in together (a deploy, the morning wave) then refresh
+apart instead of in synchronized spikes.
+"""
+import random
+import time
+from django.conf import settings
+from rest_framework_simplejwt.settings import api_settings
+
+EXPIRES_IN_HEADER = "X-Token-Expires-In"
+REFRESH_AFTER_HEADER = "X-Token-Refresh-After"
+
+
+def jittered_lifetime():
+    jitter = getattr(settings, "ACCESS_TOKEN_LIFETIME_JITTER", 0.1)
+    return api_settings.ACCESS_TOKEN_LIFETIME * (1 - random.uniform(0, jitter))
+
+
+def refresh_after(expires_in):
+    low = getattr(settings, "TOKEN_REFRESH_AFTER_MIN", 0.7)
+    high = getattr(settings, "TOKEN_REFRESH_AFTER_MAX", 0.9)
+    return int(expires_in * random.uniform(low, high))
+
+
+def set_expiry_headers(response, access):
+    """`access` is an AccessToken or its encoded string."""
+    if isinstance(access, str):
+        from authentication.tokens import peek_claims
+        exp = peek_claims(access).get("exp")
+    else:
+        exp = access["exp"]
+    if exp is None:
+        return response
+    expires_in = max(0, int(exp - time.time()))
+    response[EXPIRES_IN_HEADER] = str(expires_in)
+    response[REFRESH_AFTER_HEADER] = str(refresh_after(expires_in))
+    return response
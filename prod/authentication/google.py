@@ -0,0 +1,207 @@
+"""
+Google sign-in: authorization URL, code exchange and local id_token checks.
+
+The id_token returned by the token endpoint is verified here (RS256 signature
+against Google's JWKS, audience, issuer, expiry, at_hash), which replaces the
+userinfo round trip. JWKS are cached per process for the Cache-Control
+max-age of the response and refetched early only when an unknown kid shows
+up (Google rotated its keys). All endpoints are settings, so the flow runs
+unchanged against a local stand-in server.
+"""
+import logging
+import re
+import secrets
+import threading
+import time
+from urllib.parse import urlencode
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from jose import jwt
+from jose.exceptions import JOSEError
+from common.http import get_session
+
+logger = logging.getLogger(__name__)
+
+# Unknown kids trigger a refetch at most this often (seconds)
+JWKS_MIN_REFETCH = 60
+
+
+class GoogleAuthError(Exception):
+    """The code exchange or the id_token check failed."""
+
+
+def auth_url(state):
+    params = {
+        "client_id": settings.GOOGLE_CLIENT_ID,
+        "redirect_uri": settings.GOOGLE_REDIRECT_URI,
+        "response_type": "code",
+        "scope": "openid email profile",
+        "state": state,
+    }
+    return f"{getattr(settings, 'GOOGLE_AUTH_URL', 'https://accounts.google.com/o/oauth2/v2/auth')}?{urlencode(params)}"
+
+
+def exchange_code(code):
+    """Token endpoint response (dict with id_token and access_token)."""
+    try:
+        response = get_session().post(
+            getattr(settings, "GOOGLE_TOKEN_URL", "https://oauth2.googleapis.com/token"),
+            data={
+                "code": code,
+                "client_id": settings.GOOGLE_CLIENT_ID,
+                "client_secret": settings.GOOGLE_CLIENT_SECRET,
+                "redirect_uri": settings.GOOGLE_REDIRECT_URI,
+                "grant_type": "authorization_code",
+            },
+        )
+    except Exception as e:
+        raise GoogleAuthError(f"token endpoint unreachable: {e}")
+    if response.status_code != 200:
+        raise GoogleAuthError(f"token endpoint returned {response.status_code}")
+    try:
+        tokens = response.json()
+    except ValueError:
+        raise GoogleAuthError("token endpoint returned a non-JSON body")
+    if not isinstance(tokens, dict) or not tokens.get("id_token"):
+        raise GoogleAuthError("no id_token in token response")
+    return tokens
+
+
+# ===============================
+# JWKS
+# ===============================
+class JWKSCache:
+    def __init__(self):
+        self._url = None
+        self._keys = {}
+        self._expires = 0.0
+        self._fetched = 0.0
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def get(self, kid):
+        url = getattr(settings, "GOOGLE_JWKS_URL", "https://www.googleapis.com/oauth2/v3/certs")
+        if self._needs_refresh(url, kid):
+            with self._lock:
+                if self._needs_refresh(url, kid):
+                    self._refresh(url)
+        return self._keys.get(kid)
+
+    def _needs_refresh(self, url, kid):
+        now = time.monotonic()
+        if url != self._url:
+            return True
+        backed_off = now - self._fetched >= JWKS_MIN_REFETCH
+        if now >= self._expires:
+            # After a failed fetch, retry no more often than for an unknown kid
+            return backed_off or not self._failed
+        # An unknown kid usually means Google rotated its keys
+        return kid not in self._keys and backed_off
+
+    def _refresh(self, url):
+        now = time.monotonic()
+        try:
+            response = get_session().get(url)
+            response.raise_for_status()
+            keys = {key["kid"]: key for key in response.json().get("keys", [])}
+        except Exception as e:
+            # Keep serving the keys we have; a missing kid fails verification
+            logger.warning(f"JWKS fetch from {url} failed: {e}")
+            if url != self._url:
+                self._url, self._keys, self._expires = url, {}, 0.0
+            self._fetched = now
+            self._failed = True
+            return
+        self._url = url
+        self._keys = keys
+        self._fetched = now
+        self._failed = False
+        self._expires = now + _max_age(response.headers.get("Cache-Control", ""))
+        logger.debug(f"JWKS loaded from {url}: {sorted(keys)}")
+
+    def clear(self):
+        with self._lock:
+            self._url, self._keys, self._expires, self._fetched = None, {}, 0.0, 0.0
+            self._failed = False
+
+
+def _max_age(cache_control):
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return int(match.group(1)) if match else getattr(settings, "GOOGLE_JWKS_TTL", 3600)
+
+
+jwks = JWKSCache()
+
+
+def verify_id_token(id_token, access_token=None):
+    """Verified id_token claims; raises GoogleAuthError."""
+    try:
+        kid = jwt.get_unverified_header(id_token).get("kid")
+    except JOSEError as e:
+        raise GoogleAuthError(f"malformed id_token: {e}")
+    key = jwks.get(kid)
+    if key is None:
+        raise GoogleAuthError(f"unknown id_token signing key {kid!r}")
+    try:
+        claims = jwt.decode(
+            id_token, key, algorithms=["RS256"],
+            audience=settings.GOOGLE_CLIENT_ID,
+            issuer=getattr(settings, "GOOGLE_ISSUERS", ("https://accounts.google.com", "accounts.google.com")),
+            access_token=access_token,
+        )
+    except JOSEError as e:
+        raise GoogleAuthError(f"invalid id_token: {e}")
+    if not claims.get("email") or not claims.get("email_verified"):
+        raise GoogleAuthError("id_token has no verified email")
+    return claims
+
+
+def login_claims(code):
+    """Verified id_token claims for an authorization code."""
+    tokens = exchange_code(code)
+    return verify_id_token(tokens["id_token"], tokens.get("access_token"))
+
+
+async def alogin_claims(code):
+    # requests is blocking: run the exchange on a worker thread, off the event loop
+    return await sync_to_async(login_claims, thread_sensitive=False)(code)
+
+
+def _existing(claims):
+    return get_user_model().objects.filter(email__iexact=claims["email"]).order_by("pk")
+
+
+def upsert_user(claims):
+    """
+    (user, created) for the id_token's email. The lookup is email__iexact,
+    served by the UPPER(email) index; new users get an unusable password.
+    """
+    user = _existing(claims).first()
+    if user is not None:
+        return user, False
+    user = _new_user(claims)
+    user.save()
+    return user, True
+
+
+async def aupsert_user(claims):
+    user = await _existing(claims).afirst()
+    if user is not None:
+        return user, False
+    user = _new_user(claims)
+    await user.asave()
+    return user, True
+
+
+def _new_user(claims):
+    email = claims["email"]
+    user = get_user_model()(
+        username=f"{email.split('@')[0][:12]}_{secrets.token_hex(3)}",
+        email=email,
+        first_name=(claims.get("given_name") or "")[:30],
+        last_name=(claims.get("family_name") or "")[:40],
+        is_active=True,
+    )
+    user.set_unusable_password()
+    return user
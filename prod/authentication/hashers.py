@@ -0,0 +1,119 @@
+import logging
+import threading
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.utils.crypto import constant_time_compare
+from django.utils.encoding import force_bytes
+from common import metrics
+from common.cpu_pool import BoundedPool, PoolSaturated, pbkdf2_b64
+
+logger = logging.getLogger(__name__)
+stats = metrics.counters("password_hashing")
+
+
+class HashingOverloaded(Exception):
+    """
+    Verification refused because the host's hash pool is full. A plain
+    exception so any caller can handle it; the API answers it with a 503 and
+    Retry-After: `wait` (common.exceptions).
+    """
+
+    def __init__(self, message="", wait=None):
+        super().__init__(message)
+        self.wait = wait
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BoundedPool(
+                    workers=getattr(settings, "PASSWORD_HASH_POOL_WORKERS", 2),
+                    max_queue=getattr(settings, "PASSWORD_HASH_POOL_MAX_QUEUE", 4),
+                    directory=getattr(settings, "PASSWORD_HASH_POOL_DIR", "") or None,
+                    start_method=getattr(settings, "PASSWORD_HASH_POOL_START_METHOD", "spawn"),
+                )
+    return _pool
+
+
+class PooledPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    Same algorithm and stored format as Django's pbkdf2_sha256, but
+    verification is admitted host-wide (common.cpu_pool.BoundedPool): at
+    most PASSWORD_HASH_POOL_WORKERS hashes run on the host and
+    PASSWORD_HASH_POOL_MAX_QUEUE wait, across all server processes. Beyond
+    that, verification raises HashingOverloaded (a 503 + Retry-After from the
+    API) instead of queueing until the request times out.
+
+    verify() still holds its sync worker for the hash, but the limit caps how
+    many workers logins can take. averify() awaits a child process, so async
+    views free the worker entirely. Encoding (sign-up, password change)
+    stays inline.
+    """
+
+    def verify(self, password, encoded):
+        if getattr(settings, "PASSWORD_HASH_POOL_WORKERS", 2) <= 0:
+            return super().verify(password, encoded)
+
+        decoded = self.decode(encoded)
+        try:
+            digest, busy, waited = get_pool().run(
+                *self._job(password, decoded),
+                timeout=getattr(settings, "PASSWORD_HASH_POOL_TIMEOUT", 5),
+            )
+        except PoolSaturated as e:
+            raise self._overloaded(e)
+        return self._matches(decoded, digest, busy, waited)
+
+    async def averify(self, password, encoded):
+        """verify() for async views: awaits a pooled child process without holding a thread."""
+        if getattr(settings, "PASSWORD_HASH_POOL_WORKERS", 2) <= 0:
+            return await sync_to_async(super().verify, thread_sensitive=False)(password, encoded)
+
+        decoded = self.decode(encoded)
+        try:
+            digest, busy, waited = await get_pool().arun(
+                *self._job(password, decoded),
+                timeout=getattr(settings, "PASSWORD_HASH_POOL_TIMEOUT", 5),
+            )
+        except PoolSaturated as e:
+            raise self._overloaded(e)
+        return self._matches(decoded, digest, busy, waited)
+
+    def _job(self, password, decoded):
+        return (
+            pbkdf2_b64,
+            self.digest().name,
+            force_bytes(password),
+            force_bytes(decoded["salt"]),
+            decoded["iterations"],
+        )
+
+    def _overloaded(self, error):
+        stats.incr("rejected")
+        logger.warning(f"Password verification rejected: {error}")
+        return HashingOverloaded(str(error), wait=getattr(settings, "PASSWORD_HASH_POOL_RETRY_AFTER", 2))
+
+    def _matches(self, decoded, digest, busy, waited):
+        stats.incr("verified")
+        stats.incr("hash_seconds", busy)
+        stats.incr("wait_seconds", waited)
+        return constant_time_compare(decoded["hash"], digest)
+
+
+def get_stats():
+    """Per-worker split of verification time: PBKDF2 itself vs waiting for a pool slot."""
+    values = stats.snapshot()
+    verified = values.get("verified", 0)
+    average = lambda key: round(values.get(key, 0) / verified * 1000, 2) if verified else None
+    return {
+        **values,
+        "avg_hash_ms": average("hash_seconds"),
+        "avg_wait_ms": average("wait_seconds"),
+    }
@@ -0,0 +1,283 @@
+"""
+Refresh-token encryption (JWE compact serialization) with pluggable backends
+and a key ring.
+
+Backends are picked by the protected header's ("alg", "enc"), so tokens from
+every registered backend decrypt while JWE_BACKEND selects the one that
+encrypts new tokens:
+
+- "dir+A256GCM" (default): the key is the content key; one AES-GCM call
+  through a prepared `cryptography` AESGCM object.
+- "A256KW+A256CBC-HS512" (legacy): python-jose; wraps a fresh content key
+  per token and runs AES-CBC + HMAC.
+
+Keys: with JWE_KEYRING (path to a JSON file managed by `rotate_jwe_key`) new
+tokens carry the active key's `kid` header and decryption picks the key by
+kid with a dict lookup, never by trial. Retired keys keep decrypting until
+REFRESH_TOKEN_LIFETIME after retirement. Tokens without a kid use JWE_KEY.
+
+Key material and backend objects are prepared once per process; the key ring
+file is re-read when its mtime changes (checked every JWE_KEYRING_RELOAD seconds).
+"""
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from jose import jwe as jose_jwe
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework_simplejwt.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = "dir+A256GCM"
+
+
+def b64url_encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def b64url_decode(data):
+    if isinstance(data, str):
+        data = data.encode()
+    return base64.urlsafe_b64decode(data + b"=" * (-len(data) % 4))
+
+
+def parse_key(raw):
+    """A hex string as bytes, or the raw text when it isn't hex."""
+    try:
+        return bytes.fromhex(raw)
+    except ValueError:
+        return raw.encode()
+
+
+@lru_cache(maxsize=1)
+def get_key():
+    """settings.JWE_KEY as bytes: the key for tokens without a kid."""
+    return parse_key(settings.JWE_KEY)
+
+
+# ===============================
+# Key ring
+# ===============================
+class KeyRing:
+    """
+    kid -> key. `active` encrypts; retired keys decrypt until their grace
+    period (REFRESH_TOKEN_LIFETIME after retirement) is over.
+    """
+
+    def __init__(self, active=None, keys=None):
+        self.active = active
+        # kid -> (key bytes, retired_at datetime or None)
+        self.keys = keys or {}
+        if active is not None and (active not in self.keys or self.keys[active][1] is not None):
+            raise ImproperlyConfigured(f"JWE key ring: active kid {active!r} is missing or retired")
+
+    KEY_SIZE = 32
+
+    @classmethod
+    def from_dict(cls, data):
+        keys = {}
+        for kid, entry in data.get("keys", {}).items():
+            key = parse_key(entry.get("key") or "")
+            if len(key) != cls.KEY_SIZE:
+                raise ImproperlyConfigured(
+                    f"JWE key ring: key {kid!r} is {len(key)} bytes, expected {cls.KEY_SIZE} (64 hex characters)"
+                )
+            keys[kid] = (key, cls._parse_retired_at(kid, entry.get("retired_at")))
+        return cls(data.get("active"), keys)
+
+    @staticmethod
+    def _parse_retired_at(kid, value):
+        if not value:
+            return None
+        try:
+            retired_at = datetime.fromisoformat(value)
+        except ValueError:
+            raise ImproperlyConfigured(f"JWE key ring: retired_at of {kid!r} is not an ISO 8601 datetime: {value!r}")
+        # Compared with an aware now() on every decryption
+        if retired_at.utcoffset() is None:
+            raise ImproperlyConfigured(f"JWE key ring: retired_at of {kid!r} has no UTC offset: {value!r}")
+        return retired_at
+
+    def encryption_key(self):
+        """(kid, key) for new tokens; kid None means the legacy JWE_KEY."""
+        if self.active is None:
+            return None, get_key()
+        return self.active, self.keys[self.active][0]
+
+    def decryption_key(self, kid):
+        if kid is None:
+            return get_key()
+        entry = self.keys.get(kid)
+        if entry is None:
+            return None
+        key, retired_at = entry
+        if retired_at is not None and datetime.now(timezone.utc) > retired_at + api_settings.REFRESH_TOKEN_LIFETIME:
+            return None
+        return key
+
+
+_keyring = None
+_keyring_mtime = None
+_keyring_checked = 0.0
+_keyring_lock = threading.Lock()
+
+
+def load_keyring_file(path):
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def get_keyring():
+    global _keyring, _keyring_mtime, _keyring_checked
+    path = getattr(settings, "JWE_KEYRING", "")
+    if not path:
+        if _keyring is None:
+            _keyring = KeyRing()
+        return _keyring
+
+    now = time.monotonic()
+    if _keyring is not None and now - _keyring_checked < getattr(settings, "JWE_KEYRING_RELOAD", 30):
+        return _keyring
+    with _keyring_lock:
+        _keyring_checked = now
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            # Not created yet (`rotate_jwe_key stage`): behave like a single JWE_KEY
+            mtime = None
+        if _keyring is None or mtime != _keyring_mtime:
+            try:
+                keyring = KeyRing.from_dict(load_keyring_file(path)) if mtime is not None else KeyRing()
+            except Exception as e:
+                if _keyring is None:
+                    raise
+                # Half-written or hand-broken file: keep the ring we have, retry next check
+                logger.error(f"JWE key ring {path} not reloaded, keeping the previous one: {e}")
+                return _keyring
+            _keyring, _keyring_mtime = keyring, mtime
+            logger.info(f"JWE key ring loaded: active={_keyring.active} kids={sorted(_keyring.keys)}")
+    return _keyring
+
+
+def reset_keyring():
+    """Forget the loaded key ring (tests, after rotation in-process)."""
+    global _keyring, _keyring_mtime, _keyring_checked
+    with _keyring_lock:
+        _keyring, _keyring_mtime, _keyring_checked = None, None, 0.0
+
+
+# ===============================
+# Backends
+# ===============================
+class JWEBackend:
+    alg = None
+    enc = None
+
+    def __init__(self, key, kid=None):
+        if len(key) != 32:
+            raise ImproperlyConfigured(f"JWE backend {self.name()} needs a 256-bit key, got {len(key) * 8} bits")
+        self.key = key
+        self.kid = kid
+
+    @classmethod
+    def name(cls):
+        return f"{cls.alg}+{cls.enc}"
+
+    def encrypt(self, plaintext):
+        raise NotImplementedError
+
+    def decrypt(self, token):
+        """Plaintext str; raises on any failure."""
+        raise NotImplementedError
+
+
+class JoseA256KWBackend(JWEBackend):
+    alg = "A256KW"
+    enc = "A256CBC-HS512"
+
+    def encrypt(self, plaintext):
+        return jose_jwe.encrypt(
+            plaintext.encode(), self.key, algorithm=self.alg, encryption=self.enc, kid=self.kid
+        ).decode()
+
+    def decrypt(self, token):
+        return jose_jwe.decrypt(token, self.key).decode()
+
+
+class DirectA256GCMBackend(JWEBackend):
+    alg = "dir"
+    enc = "A256GCM"
+
+    def __init__(self, key, kid=None):
+        super().__init__(key, kid)
+        self.aead = AESGCM(key)
+        # The protected header never changes, so it is encoded once
+        header = {"alg": self.alg, "enc": self.enc}
+        if kid is not None:
+            header["kid"] = kid
+        self.header = b64url_encode(json.dumps(header, separators=(",", ":")).encode())
+
+    def encrypt(self, plaintext):
+        iv = os.urandom(12)
+        # AAD is the encoded protected header (RFC 7516 5.1); AESGCM appends the 16-byte tag
+        sealed = self.aead.encrypt(iv, plaintext.encode(), self.header)
+        return b".".join((
+            self.header, b"", b64url_encode(iv), b64url_encode(sealed[:-16]), b64url_encode(sealed[-16:])
+        )).decode()
+
+    def decrypt(self, token):
+        header, encrypted_key, iv, ciphertext, tag = token.split(b".")
+        if encrypted_key:
+            raise ValueError("dir tokens carry no encrypted key")
+        return self.aead.decrypt(b64url_decode(iv), b64url_decode(ciphertext) + b64url_decode(tag), header).decode()
+
+
+BACKENDS = {backend.name(): backend for backend in (DirectA256GCMBackend, JoseA256KWBackend)}
+
+
+@lru_cache(maxsize=64)
+def _prepared_backend(name, kid, key):
+    return BACKENDS[name](key, kid)
+
+
+def get_backend(name, kid=None, key=None):
+    """Backend `name` prepared for `key` (default: the legacy JWE_KEY)."""
+    if name not in BACKENDS:
+        raise ImproperlyConfigured(f"Unknown JWE backend {name!r}; choose from {sorted(BACKENDS)}")
+    return _prepared_backend(name, kid, get_key() if key is None else key)
+
+
+@lru_cache(maxsize=64)
+def _parse_header(header):
+    fields = json.loads(b64url_decode(header))
+    return f"{fields['alg']}+{fields['enc']}", fields.get("kid")
+
+
+def encrypt(plaintext, backend=None):
+    kid, key = get_keyring().encryption_key()
+    name = backend or getattr(settings, "JWE_BACKEND", DEFAULT_BACKEND)
+    return get_backend(name, kid, key).encrypt(plaintext)
+
+
+def decrypt(token):
+    """Plaintext of `token`, or None when it can't be decrypted (bad token, unknown or expired kid)."""
+    if isinstance(token, str):
+        token = token.encode()
+    try:
+        name, kid = _parse_header(token.split(b".", 1)[0])
+        if name not in BACKENDS:
+            raise ValueError(f"unsupported JWE header {name}")
+        key = get_keyring().decryption_key(kid)
+        if key is None:
+            raise ValueError(f"unknown or expired kid {kid!r}")
+        return get_backend(name, kid, key).decrypt(token)
+    except Exception as e:
+        logger.debug(f"JWE decryption error: {e}")
+        return None
@@ -0,0 +1,82 @@
+"""
+Stateless OAuth `state` for the Google login flow.
+
+The init view draws a random nonce, sends it to Google as `state` and sets a
+short-lived HttpOnly cookie holding the nonce signed (HMAC, SECRET_KEY) with
+a timestamp. The callback accepts `state` only when it equals the nonce in a
+valid, unexpired cookie, and burns the nonce in the cache (cache.add with a
+TTL of the cookie's lifetime) so a captured callback URL can't be replayed.
+No session row is read or written.
+"""
+import logging
+import secrets
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from common import aio_redis
+
+logger = logging.getLogger(__name__)
+
+SALT = "accounts.google-oauth-state"
+
+
+def _cookie_name():
+    return getattr(settings, "OAUTH_STATE_COOKIE", "google_oauth_state")
+
+
+def _max_age():
+    return getattr(settings, "OAUTH_STATE_MAX_AGE", 600)
+
+
+def new_state():
+    return secrets.token_urlsafe(24)
+
+
+def set_cookie(response, state):
+    response.set_cookie(
+        _cookie_name(), signing.dumps(state, salt=SALT),
+        max_age=_max_age(), httponly=True, secure=True, samesite="None",
+    )
+
+
+def clear_cookie(response):
+    response.delete_cookie(_cookie_name(), samesite="None")
+
+
+def _nonce(request, state):
+    """The nonce when `state` matches the request's state cookie, else None."""
+    signed = request.COOKIES.get(_cookie_name())
+    if not signed or not state:
+        return None
+    try:
+        nonce = signing.loads(signed, salt=SALT, max_age=_max_age())
+    except signing.BadSignature:
+        # SignatureExpired is a BadSignature too
+        logger.warning("Invalid or expired OAuth state cookie")
+        return None
+    return nonce if constant_time_compare(nonce, state) else None
+
+
+def consume(request, state):
+    """True when `state` matches the request's state cookie and was not used before."""
+    nonce = _nonce(request, state)
+    if nonce is None:
+        return False
+    try:
+        return cache.add(f"oauth:state:used:{nonce}", 1, timeout=_max_age())
+    except Exception as e:
+        # Can't rule out a replay without the cache: refuse
+        logger.error(f"OAuth state replay check unavailable: {e}")
+        return False
+
+
+async def aconsume(request, state):
+    nonce = _nonce(request, state)
+    if nonce is None:
+        return False
+    try:
+        return await aio_redis.cache.add(f"oauth:state:used:{nonce}", 1, timeout=_max_age())
+    except Exception as e:
+        logger.error(f"OAuth state replay check unavailable: {e}")
+        return False
@@ -0,0 +1,51 @@
+"""
+Compact role snapshot carried inside access tokens.
+
+Each role is encoded as [id, level, content_id, flags] where flags is a
+bitmask of the can_* booleans, so RoleBasePermission can decide without
+touching Postgres or Redis.
+"""
+
+ROLES_CLAIM = "rl"
+ROLES_VERSION_CLAIM = "rv"
+
+ROLE_FLAGS = (
+    ("can_add", 1),
+    ("can_edit", 2),
+    ("can_view_all", 4),
+    ("can_delete", 8),
+)
+
+
+def _role_rows(user):
+    return user.role.values_list("id", "level", "content_id", *[name for name, _ in ROLE_FLAGS])
+
+
+def build_role_claim(user):
+    return _encode(_role_rows(user))
+
+
+async def abuild_role_claim(user):
+    return _encode([row async for row in _role_rows(user)])
+
+
+def _encode(rows):
+    claim = []
+    for role_id, level, content_id, *flags in rows:
+        mask = 0
+        for (_, bit), enabled in zip(ROLE_FLAGS, flags):
+            if enabled:
+                mask |= bit
+        claim.append([role_id, level, content_id, mask])
+    return claim
+
+
+def decode_role_claim(claim):
+    """Return the same dict shape RoleBasePermission.get_role_cached produces."""
+    roles = []
+    for role_id, level, content_id, mask in claim:
+        role = {"id": role_id, "level": level, "content_id": content_id}
+        for name, bit in ROLE_FLAGS:
+            role[name] = bool(mask & bit)
+        roles.append(role)
+    return roles
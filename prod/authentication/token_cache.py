@@ -0,0 +1,61 @@
+import hashlib
+import time
+from django.conf import settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from common.lru import TTLLRUCache
+from common.metrics import counters, hit_rate
+
+# Verified access tokens, per process. Only tokens that passed signature and
+# claim checks are stored, and each entry expires with the token's `exp`,
+# so a cached token is never accepted after it would have been rejected.
+_verified = TTLLRUCache(
+    maxsize=getattr(settings, "ACCESS_TOKEN_CACHE_MAXSIZE", 4096),
+    ttl=getattr(settings, "ACCESS_TOKEN_CACHE_MAX_TTL", 300),
+)
+stats = counters("access_token_cache")
+
+
+def _enabled():
+    return getattr(settings, "ACCESS_TOKEN_CACHE_ENABLED", True)
+
+
+def _digest(raw):
+    if isinstance(raw, str):
+        raw = raw.encode()
+    return hashlib.sha256(raw).digest()
+
+
+def get_verified(raw):
+    """
+    Return AccessToken(raw), skipping decode + HMAC + claim checks when this
+    exact token string was verified before. Raises TokenError like AccessToken.
+    """
+    if not _enabled():
+        return AccessToken(raw)
+
+    key = _digest(raw)
+    token = _verified.get(key)
+    if token is not None:
+        stats.incr("hits")
+        return token
+
+    stats.incr("misses")
+    token = AccessToken(raw)
+    remaining = token["exp"] - time.time()
+    if remaining > 0:
+        _verified.set(key, token, ttl=min(remaining, _verified.ttl))
+    return token
+
+
+def clear():
+    _verified.clear()
+
+
+def get_stats():
+    values = stats.snapshot()
+    return {
+        **values,
+        "hit_rate": hit_rate(values.get("hits", 0), values.get("misses", 0)),
+        "size": len(_verified),
+    }
@@ -0,0 +1,34 @@
+"""
+Per-user token epoch.
+
+Refresh tokens carry the user's token_epoch in the "ep" claim (access tokens
+copy it). A token whose epoch differs from the user's current one is revoked,
+so "log out everywhere" and password changes are a single UPDATE instead of a
+blacklist row per token. The check reads the epoch from the user cache that
+authentication loads anyway: no extra query. Other workers notice a bump once
+their local user-cache tier expires (USER_CACHE_LOCAL_TTL).
+"""
+from django.db.models import F
+from django.contrib.auth import get_user_model
+from authentication import user_cache
+
+EPOCH_CLAIM = "ep"
+
+
+def epoch_matches(payload, user):
+    # Tokens minted before epochs existed have no claim: they belong to epoch 0
+    return payload.get(EPOCH_CLAIM, 0) == user.token_epoch
+
+
+def revoke_all_sessions(user_ids):
+    """
+    Bump token_epoch: every token these users hold stops working.
+    queryset.update() skips post_save, so the user cache is cleared here too.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    get_user_model().objects.filter(pk__in=user_ids).update(token_epoch=F("token_epoch") + 1)
+    user_cache.invalidate_on_commit(*user_ids)
+    # Shared refresh results are keyed by the epoch (refresh_flight_key), so
+    # the ones minted before this bump are no longer reachable
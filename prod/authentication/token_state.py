@@ -0,0 +1,196 @@
+"""
+Where refresh-token state (outstanding / blacklisted jti) lives.
+
+TOKEN_STATE_BACKEND:
+- "db" (default): simplejwt's OutstandingToken / BlacklistedToken tables,
+  same behaviour as the stock BlacklistMixin.
+- "redis": one key per jti in the TOKEN_STATE_CACHE cache with a TTL equal
+  to the token's remaining lifetime. O(1) lookups, no Postgres writes on
+  login/logout, and expired state disappears on its own (no cleanup job).
+  The Redis instance must not evict keys (maxmemory-policy noeviction), or a
+  revoked token could come back; check_token_state_cache() fails the system
+  checks unless the cache is a dedicated one.
+
+Switching db -> redis: run `manage.py migrate_token_state`, flip the setting,
+then run it again to copy rows written in between.
+"""
+import logging
+import time
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core import checks
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from common import aio_redis
+
+logger = logging.getLogger(__name__)
+
+
+def _cache_alias():
+    return getattr(settings, "TOKEN_STATE_CACHE", "token_state")
+
+
+def _cache_servers(alias):
+    """(host, port) pairs behind a cache alias; the db number doesn't matter for eviction."""
+    location = settings.CACHES.get(alias, {}).get("LOCATION") or []
+    if isinstance(location, str):
+        location = location.split(",")
+    servers = set()
+    for url in location:
+        parts = urlsplit(url.strip())
+        servers.add((parts.hostname, parts.port or 6379) if parts.hostname else (url.strip(), None))
+    return servers
+
+
+def check_token_state_cache(app_configs=None, **kwargs):
+    if getattr(settings, "TOKEN_STATE_BACKEND", "db") != "redis":
+        return []
+    alias = _cache_alias()
+    hint = "Point TOKEN_STATE_REDIS_URL at a Redis running with maxmemory-policy noeviction."
+    if alias == "default":
+        return [checks.Error(
+            "TOKEN_STATE_CACHE must name a dedicated cache, not 'default'.",
+            hint=hint, id="token_state.E001",
+        )]
+    if alias not in settings.CACHES:
+        return [checks.Error(
+            f"TOKEN_STATE_CACHE names '{alias}', which is not in CACHES.",
+            hint=hint, id="token_state.E002",
+        )]
+    if _cache_servers(alias) & _cache_servers("default"):
+        return [checks.Error(
+            f"The '{alias}' cache shares a Redis server with 'default'; eviction there can drop revoked tokens.",
+            hint=hint, id="token_state.E003",
+        )]
+    return []
+
+
+def _ttl(exp):
+    return int(exp - time.time())
+
+
+class DBTokenStore:
+    def _defaults(self, token, user):
+        return {
+            "user": user,
+            "token": str(token),
+            "created_at": token.current_time,
+            "expires_at": datetime_from_epoch(token["exp"]),
+        }
+
+    def issue(self, token, user):
+        """A freshly minted token (for_user): a plain INSERT, like simplejwt."""
+        OutstandingToken.objects.create(jti=token[api_settings.JTI_CLAIM], **self._defaults(token, user))
+
+    def outstand(self, token):
+        return OutstandingToken.objects.get_or_create(
+            jti=token[api_settings.JTI_CLAIM], defaults=self._defaults(token, self._token_user(token))
+        )[0]
+
+    def _token_user(self, token):
+        user_id = token.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return None
+        return get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+
+    def is_blacklisted(self, jti):
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def blacklist(self, token):
+        BlacklistedToken.objects.get_or_create(token=self.outstand(token))
+
+    # Async variants for the ASGI views (async ORM)
+    async def aissue(self, token, user):
+        await OutstandingToken.objects.acreate(jti=token[api_settings.JTI_CLAIM], **self._defaults(token, user))
+
+    async def aoutstand(self, token):
+        user_id = token.payload.get(api_settings.USER_ID_CLAIM)
+        user = None
+        if user_id is not None:
+            user = await get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).afirst()
+        return (await OutstandingToken.objects.aget_or_create(
+            jti=token[api_settings.JTI_CLAIM], defaults=self._defaults(token, user)
+        ))[0]
+
+    async def ais_blacklisted(self, jti):
+        return await BlacklistedToken.objects.filter(token__jti=jti).aexists()
+
+    async def ablacklist(self, token):
+        await BlacklistedToken.objects.aget_or_create(token=await self.aoutstand(token))
+
+
+class RedisTokenStore:
+    OUTSTANDING_KEY = "jwt:outstanding:{jti}"
+    BLACKLIST_KEY = "jwt:blacklisted:{jti}"
+
+    @property
+    def cache(self):
+        return caches[_cache_alias()]
+
+    def issue(self, token, user):
+        self.outstand(token, user)
+
+    def outstand(self, token, user=None):
+        ttl = _ttl(token["exp"])
+        if ttl > 0:
+            user_id = user.pk if user is not None else token.payload.get(api_settings.USER_ID_CLAIM)
+            self.cache.set(self.OUTSTANDING_KEY.format(jti=token[api_settings.JTI_CLAIM]), user_id, timeout=ttl)
+
+    def is_blacklisted(self, jti):
+        try:
+            return self.cache.get(self.BLACKLIST_KEY.format(jti=jti)) is not None
+        except Exception as e:
+            # Fail closed: without the store we can't tell a revoked token apart
+            logger.error(f"Token state store unavailable: {e}")
+            raise TokenError("Token state unavailable")
+
+    def blacklist(self, token):
+        self.mark_blacklisted(token[api_settings.JTI_CLAIM], token["exp"])
+
+    def mark_blacklisted(self, jti, exp):
+        ttl = _ttl(exp)
+        if ttl > 0:
+            self.cache.set(self.BLACKLIST_KEY.format(jti=jti), 1, timeout=ttl)
+        return ttl > 0
+
+    # Async variants for the ASGI views (same keys through redis.asyncio)
+    @property
+    def acache(self):
+        return aio_redis.AsyncCache(_cache_alias())
+
+    async def aissue(self, token, user):
+        await self.aoutstand(token, user)
+
+    async def aoutstand(self, token, user=None):
+        ttl = _ttl(token["exp"])
+        if ttl > 0:
+            user_id = user.pk if user is not None else token.payload.get(api_settings.USER_ID_CLAIM)
+            await self.acache.set(self.OUTSTANDING_KEY.format(jti=token[api_settings.JTI_CLAIM]), user_id, timeout=ttl)
+
+    async def ais_blacklisted(self, jti):
+        try:
+            return await self.acache.get(self.BLACKLIST_KEY.format(jti=jti)) is not None
+        except Exception as e:
+            logger.error(f"Token state store unavailable: {e}")
+            raise TokenError("Token state unavailable")
+
+    async def ablacklist(self, token):
+        ttl = _ttl(token["exp"])
+        if ttl > 0:
+            await self.acache.set(self.BLACKLIST_KEY.format(jti=token[api_settings.JTI_CLAIM]), 1, timeout=ttl)
+
+
+STORES = {"db": DBTokenStore, "redis": RedisTokenStore}
+_stores = {}
+
+
+def get_store():
+    name = getattr(settings, "TOKEN_STATE_BACKEND", "db")
+    store = _stores.get(name)
+    if store is None:
+        store = _stores.setdefault(name, STORES[name]())
+    return store
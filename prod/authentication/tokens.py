@@ -1,42 +1,211 @@
+import hashlib
+import json
 import logging
-from rest_framework_simplejwt.tokens import RefreshToken
-from jose import jwe
-from django.conf import settings
+from contextvars import ContextVar
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from django.contrib.auth import get_user_model
+from authentication.role_claims import ROLES_CLAIM, ROLES_VERSION_CLAIM, build_role_claim, abuild_role_claim
+from authentication import user_cache, jwe, token_state
+from authentication.expiry_hints import jittered_lifetime
+from authentication.token_epoch import EPOCH_CLAIM, epoch_matches
+from common import single_flight
 
 logger = logging.getLogger(__name__)
 
+# Set while an async caller builds a token: the blacklist / epoch lookups are
+# left to averify() instead of running synchronously inside __init__
+_defer_state_checks = ContextVar("defer_state_checks", default=False)
 
-priv_hex = settings.JWE_KEY
 
+def peek_claims(token):
+    """
+    Payload of a JWT without verifying it ({} when malformed). Only for hints
+    and for keying work that verifies the token afterwards; never trust it.
+    """
+    try:
+        claims = json.loads(jwe.b64url_decode(token.split(".")[1]))
+    except Exception:
+        return {}
+    return claims if isinstance(claims, dict) else {}
 
-try:
-    #hex string
-    priv_bytes = bytes.fromhex(priv_hex)
-except ValueError:
 
-    priv_bytes = priv_hex.encode()
+def peek_jti(token):
+    return peek_claims(token).get(api_settings.JTI_CLAIM)
 
-#logger.debug(f"Using JWE key bytes: {priv_bytes.hex()}")
 
-# Seetings JWE
-JWE_ALG = "A256KW"
-JWE_ENC = "A256CBC-HS512"
+def refresh_flight_key(token):
+    """
+    single_flight key shared by concurrent refreshes of this exact token
+    (None when malformed). The digest binds a shared result to the token that
+    produced it; the user's current token_epoch makes every result shared
+    before revoke_all_sessions() unreachable, with no keyspace scan.
+    """
+    claims = peek_claims(token)
+    if claims.get(api_settings.JTI_CLAIM) is None:
+        return None
+    try:
+        epoch = user_cache.get_user(claims.get(api_settings.USER_ID_CLAIM)).token_epoch
+    except _USER_LOOKUP_ERRORS:
+        epoch = None  # minting fails for this token anyway
+    return _flight_key(token, claims, epoch)
+
+
+async def arefresh_flight_key(token):
+    claims = peek_claims(token)
+    if claims.get(api_settings.JTI_CLAIM) is None:
+        return None
+    try:
+        epoch = (await user_cache.aget_user(claims.get(api_settings.USER_ID_CLAIM))).token_epoch
+    except _USER_LOOKUP_ERRORS:
+        epoch = None
+    return _flight_key(token, claims, epoch)
+
+
+_USER_LOOKUP_ERRORS = (user_cache.User.DoesNotExist, TypeError, ValueError)
+
+
+def _flight_key(token, claims, epoch):
+    digest = hashlib.sha256(token.encode()).hexdigest()[:32]
+    return f"refresh:{claims.get(api_settings.USER_ID_CLAIM)}:{epoch}:{claims[api_settings.JTI_CLAIM]}:{digest}"
+
+
+def forget_refresh_flights(token):
+    """
+    On logout: drop the refresh result shared for `token`. A result shared
+    for the token it was rotated from expires within REFRESH_SINGLE_FLIGHT_TTL.
+    """
+    key = refresh_flight_key(token)
+    if key is not None:
+        single_flight.forget(key)
+
+
+async def aforget_refresh_flights(token):
+    key = await arefresh_flight_key(token)
+    if key is not None:
+        await single_flight.aforget(key)
 
 
 class EncryptedRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        # Skip BlacklistMixin.for_user (always an OutstandingToken INSERT);
+        # the configured token-state store records the jti instead
+        token = cls._new_for(user)
+        token_state.get_store().issue(token, user)
+        return token
+
+    @classmethod
+    async def afor_user(cls, user):
+        token = cls._new_for(user)
+        await token_state.get_store().aissue(token, user)
+        return token
+
+    @classmethod
+    def _new_for(cls, user):
+        token = super(BlacklistMixin, cls).for_user(user)
+        token[EPOCH_CLAIM] = user.token_epoch
+        # Keep the user around so access_token doesn't load it again
+        token._user = user
+        return token
+
+    @classmethod
+    async def averified(cls, raw):
+        """
+        EncryptedRefreshToken(raw) for async views: signature and expiry are
+        checked in place (CPU only), blacklist and epoch through async I/O.
+        """
+        reset = _defer_state_checks.set(True)
+        try:
+            token = cls(raw)
+        finally:
+            _defer_state_checks.reset(reset)
+        if await token_state.get_store().ais_blacklisted(token[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+        if not epoch_matches(token.payload, await token._aget_user()):
+            raise TokenError(_("Token has been revoked"))
+        return token
+
+    def _get_user(self):
+        user = getattr(self, "_user", None)
+        if user is not None:
+            return user
+        try:
+            user = user_cache.get_user(self[api_settings.USER_ID_CLAIM])
+        except (KeyError, get_user_model().DoesNotExist):
+            raise TokenError("Token user not found")
+        self._user = user
+        return user
+
+    async def _aget_user(self):
+        user = getattr(self, "_user", None)
+        if user is not None:
+            return user
+        try:
+            user = await user_cache.aget_user(self[api_settings.USER_ID_CLAIM])
+        except (KeyError, get_user_model().DoesNotExist):
+            raise TokenError("Token user not found")
+        self._user = user
+        return user
+
+    def verify(self):
+        super().verify()
+        if _defer_state_checks.get():
+            return
+        if not epoch_matches(self.payload, self._get_user()):
+            raise TokenError(_("Token has been revoked"))
+
+    def check_blacklist(self):
+        if _defer_state_checks.get():
+            return
+        if token_state.get_store().is_blacklisted(self[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        token_state.get_store().blacklist(self)
+
+    def outstand(self):
+        token_state.get_store().outstand(self)
+
+    async def ablacklist(self):
+        await token_state.get_store().ablacklist(self)
+
+    async def aoutstand(self):
+        await token_state.get_store().aoutstand(self)
+
+    @property
+    def access_token(self):
+        """
+        Access token with a fresh role snapshot; only the access token carries it,
+        so a refresh always picks up the current roles.
+        """
+        access = self._new_access()
+        user = self._get_user()
+        access[ROLES_CLAIM] = build_role_claim(user)
+        access[ROLES_VERSION_CLAIM] = user.roles_version
+        return access
+
+    async def aaccess_token(self):
+        access = self._new_access()
+        user = await self._aget_user()
+        access[ROLES_CLAIM] = await abuild_role_claim(user)
+        access[ROLES_VERSION_CLAIM] = user.roles_version
+        return access
+
+    def _new_access(self):
+        access = super().access_token
+        # Tokens minted together shouldn't all expire together
+        access.set_exp(lifetime=jittered_lifetime())
+        return access
+
     def encrypt(self):
         """
         Return Refrsh token Encrypted
         """
-        signed_token = str(self)
         try:
-            encrypted = jwe.encrypt(
-                signed_token.encode(),
-                priv_bytes,
-                algorithm=JWE_ALG,
-                encryption=JWE_ENC
-            )
-            return encrypted.decode()
+            return jwe.encrypt(str(self))
         except Exception as e:
             logger.error(f"Error encrypting refresh token: {e}")
             raise
@@ -46,12 +215,7 @@ class EncryptedRefreshToken(RefreshToken):
         """
         decrypred token
         """
-        try:
-            decrypted = jwe.decrypt(
-                encrypted_token,
-                priv_bytes
-            ).decode()
-            return decrypted
-        except Exception as e:
-            logger.error(f"Error decrypting refresh token: {e}")
-            return None
+        decrypted = jwe.decrypt(encrypted_token)
+        if decrypted is None:
+            logger.error("Error decrypting refresh token")
+        return decrypted
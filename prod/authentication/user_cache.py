@@ -0,0 +1,160 @@
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+
+from common import aio_redis
+from common.lru import TTLLRUCache
+from common.metrics import counters, hit_rate
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Password hash never leaves Postgres; it stays a deferred field on cached users
+SNAPSHOT_EXCLUDE = {"password"}
+
+_local = TTLLRUCache(
+    maxsize=getattr(settings, "USER_CACHE_LOCAL_MAXSIZE", 1024),
+    ttl=getattr(settings, "USER_CACHE_LOCAL_TTL", 5),
+)
+stats = counters("user_cache")
+
+
+def _enabled():
+    return getattr(settings, "USER_CACHE_ENABLED", True)
+
+
+def _cache_key(user_id):
+    return f"user:snapshot:{user_id}"
+
+
+def _snapshot_fields():
+    return [f.attname for f in User._meta.concrete_fields if f.attname not in SNAPSHOT_EXCLUDE]
+
+
+def _from_snapshot(snapshot):
+    """Rebuild a user instance without touching the DB (password stays deferred)."""
+    names = list(snapshot.keys())
+    db = router.db_for_read(User)
+    return User.from_db(db, names, [snapshot[n] for n in names])
+
+
+def _load_snapshot(user_id):
+    return User.objects.filter(pk=user_id).values(*_snapshot_fields()).first()
+
+
+def get_user(user_id):
+    """
+    Return the user for `user_id` from the two-tier cache:
+    per-process LRU (short TTL) -> Redis `default` cache -> Postgres.
+    Raises User.DoesNotExist like `User.objects.get`.
+    """
+    if not _enabled():
+        return User.objects.get(pk=user_id)
+
+    key = _cache_key(user_id)
+    snapshot = _local.get(key)
+    if snapshot is not None:
+        stats.incr("local_hits")
+        return _from_snapshot(snapshot)
+
+    try:
+        snapshot = cache.get(key)
+    except Exception as e:
+        # Redis unavailable -> behave like a miss instead of failing the request
+        logger.warning(f"User cache read failed for {user_id}: {e}")
+        stats.incr("shared_errors")
+        snapshot = None
+
+    if snapshot is not None:
+        stats.incr("shared_hits")
+    else:
+        stats.incr("misses")
+        snapshot = _load_snapshot(user_id)
+        if snapshot is None:
+            raise User.DoesNotExist(f"User {user_id} does not exist")
+        try:
+            cache.set(key, snapshot, timeout=getattr(settings, "USER_CACHE_TIMEOUT", 300))
+        except Exception as e:
+            logger.warning(f"User cache write failed for {user_id}: {e}")
+            stats.incr("shared_errors")
+
+    _local.set(key, snapshot)
+    return _from_snapshot(snapshot)
+
+
+async def aget_user(user_id):
+    """get_user() for async views: async cache client and async ORM."""
+    if not _enabled():
+        return await User.objects.aget(pk=user_id)
+
+    key = _cache_key(user_id)
+    snapshot = _local.get(key)
+    if snapshot is not None:
+        stats.incr("local_hits")
+        return _from_snapshot(snapshot)
+
+    try:
+        snapshot = await aio_redis.cache.get(key)
+    except Exception as e:
+        logger.warning(f"User cache read failed for {user_id}: {e}")
+        stats.incr("shared_errors")
+        snapshot = None
+
+    if snapshot is not None:
+        stats.incr("shared_hits")
+    else:
+        stats.incr("misses")
+        snapshot = await User.objects.filter(pk=user_id).values(*_snapshot_fields()).afirst()
+        if snapshot is None:
+            raise User.DoesNotExist(f"User {user_id} does not exist")
+        try:
+            await aio_redis.cache.set(key, snapshot, timeout=getattr(settings, "USER_CACHE_TIMEOUT", 300))
+        except Exception as e:
+            logger.warning(f"User cache write failed for {user_id}: {e}")
+            stats.incr("shared_errors")
+
+    _local.set(key, snapshot)
+    return _from_snapshot(snapshot)
+
+
+def invalidate_user(*user_ids):
+    """
+    Drop cached snapshots. Other workers' local tier expires by USER_CACHE_LOCAL_TTL.
+    """
+    keys = [_cache_key(uid) for uid in user_ids]
+    for key in keys:
+        _local.delete(key)
+    if not keys:
+        return
+    try:
+        cache.delete_many(keys)
+    except Exception as e:
+        logger.warning(f"User cache invalidation failed for {user_ids}: {e}")
+        stats.incr("shared_errors")
+
+
+def invalidate_on_commit(*user_ids):
+    """
+    invalidate_user() now, and again once the surrounding transaction commits:
+    a request reading the user in between re-caches the row as it was before
+    the commit.
+    """
+    invalidate_user(*user_ids)
+    using = router.db_for_write(User)
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(lambda: invalidate_user(*user_ids), using=using)
+
+
+def get_stats():
+    values = stats.snapshot()
+    hits = values.get("local_hits", 0) + values.get("shared_hits", 0)
+    values["hit_rate"] = hit_rate(hits, values.get("misses", 0))
+    values["local_size"] = len(_local)
+    return values
+
+
+def clear_local():
+    _local.clear()
@@ -0,0 +1,124 @@
+"""
+Async access to the caches for the ASGI views.
+
+AsyncCache(alias) reads and writes exactly the keys and values the sync
+`caches[alias]` does: with django-redis it talks to the same Redis through a
+redis.asyncio client, reusing django-redis' key and value encoding, so sync
+and async workers share throttles, single-flight results and token state.
+Any other backend (locmem in dev/tests) goes through Django's async cache API.
+
+redis.asyncio connection pools belong to the event loop that created them,
+so clients are kept per loop.
+"""
+import asyncio
+import logging
+import weakref
+import redis.asyncio as aioredis
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def redis_location(alias="default"):
+    """URL of the Redis behind cache `alias`, or None when it isn't django-redis."""
+    config = settings.CACHES.get(alias, {})
+    if not config.get("BACKEND", "").startswith("django_redis."):
+        return None
+    location = config["LOCATION"]
+    if isinstance(location, (list, tuple)):
+        location = location[0]
+    return location.split(",")[0]
+
+
+def connection_params(alias="default", **overrides):
+    """
+    from_url() arguments for the Redis behind cache `alias`, built the way
+    django-redis' ConnectionFactory builds them: OPTIONS PASSWORD,
+    SOCKET_TIMEOUT and SOCKET_CONNECT_TIMEOUT, then CONNECTION_POOL_KWARGS
+    (ssl_*, max_connections ...), then `overrides`. Credentials in the URL
+    win over PASSWORD, as in redis-py.
+    """
+    options = settings.CACHES[alias].get("OPTIONS", {})
+    params = {"url": redis_location(alias)}
+    for option, kwarg in (
+        ("PASSWORD", "password"),
+        ("SOCKET_TIMEOUT", "socket_timeout"),
+        ("SOCKET_CONNECT_TIMEOUT", "socket_connect_timeout"),
+    ):
+        if options.get(option):
+            params[kwarg] = options[option]
+    params.update(options.get("CONNECTION_POOL_KWARGS", {}))
+    params.update(overrides)
+    return params
+
+
+def get_client(alias="default", **options):
+    """redis.asyncio client for cache `alias` on the running loop (None without Redis)."""
+    if redis_location(alias) is None:
+        return None
+    per_loop = _clients.setdefault(asyncio.get_running_loop(), {})
+    key = (alias, tuple(sorted(options.items())))
+    client = per_loop.get(key)
+    if client is None:
+        pool = aioredis.ConnectionPool.from_url(**connection_params(alias, **options))
+        client = per_loop[key] = aioredis.Redis(connection_pool=pool)
+    return client
+
+
+def _ms(timeout):
+    # Cache timeouts are (possibly fractional) seconds; None means no expiry
+    return None if timeout is None else max(1, int(timeout * 1000))
+
+
+class AsyncCache:
+    def __init__(self, alias="default"):
+        self.alias = alias
+
+    @property
+    def backend(self):
+        return caches[self.alias]
+
+    def _redis(self):
+        client = get_client(self.alias)
+        if client is None:
+            return None, None
+        return client, self.backend.client
+
+    async def get(self, key, default=None):
+        client, codec = self._redis()
+        if client is None:
+            return await self.backend.aget(key, default)
+        value = await client.get(codec.make_key(key))
+        return default if value is None else codec.decode(value)
+
+    def _timeout(self, timeout):
+        # Same default as the sync cache.set(): the backend's TIMEOUT, not "never"
+        return self.backend.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    async def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        client, codec = self._redis()
+        if client is None:
+            return await self.backend.aset(key, value, timeout=timeout)
+        timeout = self._timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            return await client.delete(codec.make_key(key))
+        await client.set(codec.make_key(key), codec.encode(value), px=_ms(timeout))
+
+    async def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        client, codec = self._redis()
+        if client is None:
+            return await self.backend.aadd(key, value, timeout=timeout)
+        return bool(await client.set(codec.make_key(key), codec.encode(value), px=_ms(self._timeout(timeout)), nx=True))
+
+    async def delete(self, key):
+        client, codec = self._redis()
+        if client is None:
+            return await self.backend.adelete(key)
+        return bool(await client.delete(codec.make_key(key)))
+
+
+cache = AsyncCache()
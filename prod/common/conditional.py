@@ -0,0 +1,71 @@
+import hashlib
+import logging
+import time
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers, quote_etag
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+LIST_GENERATION_KEY = "users:list_generation"
+
+
+def list_generation():
+    """
+    Counter bumped on changes that don't touch CustomUserModel.updated_at:
+    user deletes, role edits and role (re)assignments.
+    Returns None when Redis is unavailable so callers skip conditional responses.
+    """
+    try:
+        value = cache.get(LIST_GENERATION_KEY)
+        if value is None:
+            value = time.time_ns()
+            cache.add(LIST_GENERATION_KEY, value, timeout=None)
+        return value
+    except Exception as e:
+        logger.warning(f"List generation unavailable: {e}")
+        return None
+
+
+def bump_list_generation():
+    """
+    Bump now, and again once the surrounding transaction commits: a list read
+    in between is built from pre-commit rows and would keep a valid ETag.
+    """
+    _bump_list_generation()
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(_bump_list_generation)
+
+
+def _bump_list_generation():
+    try:
+        cache.set(LIST_GENERATION_KEY, time.time_ns(), timeout=None)
+    except Exception as e:
+        logger.warning(f"List generation bump failed: {e}")
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def not_modified(request, etag=None, last_modified=None):
+    """Return a 304 response when the client's validators still match, else None."""
+    if request.method not in ("GET", "HEAD"):
+        return None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag=None, last_modified=None):
+    if etag:
+        response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    # Validators depend on who is asking, so caches must revalidate per user
+    response.headers["Cache-Control"] = "private, no-cache"
+    patch_vary_headers(response, ("Cookie", "X-Active-User"))
+    return response
@@ -0,0 +1,195 @@
+"""
+Host-wide bounded execution for CPU-heavy work (password hashing). Stdlib
+only: spawned children import this module and nothing Django-related.
+
+Admission is shared by every worker process on the host through lock files
+(HostSemaphore), so the limits hold under gunicorn's pre-forked sync workers
+as well as uvicorn's. Sync callers run the job in their own thread; their
+worker is busy for the hash either way, and a child process would only add
+IPC and more processes competing for the same cores. Async callers hand the
+job to a process pool and await it, so the event loop keeps serving.
+"""
+import asyncio
+import base64
+import errno
+import fcntl
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolSaturated(Exception):
+    """Every slot is busy and the queue is full (or the wait timed out)."""
+
+
+def pbkdf2_b64(algorithm, password, salt, iterations):
+    """Same output as django.contrib.auth.hashers.PBKDF2PasswordHasher, plus its run time."""
+    start = time.perf_counter()
+    digest = hashlib.pbkdf2_hmac(algorithm, password, salt, iterations)
+    return base64.b64encode(digest).decode("ascii").strip(), time.perf_counter() - start
+
+
+class HostSemaphore:
+    """
+    Counting semaphore shared by every process on the host: `size` lock
+    files, each held with a non-blocking flock(). The kernel releases the
+    locks of a process that dies, so a crashed worker can't leak a slot.
+    """
+
+    def __init__(self, directory, name, size):
+        self.paths = [os.path.join(directory, f"{name}-{index}.lock") for index in range(size)]
+        os.makedirs(directory, exist_ok=True)
+
+    def try_acquire(self):
+        """A held slot (pass it to release()), or None when all are taken."""
+        for path in self.paths:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except OSError as e:
+                os.close(fd)
+                if e.errno not in (errno.EAGAIN, errno.EACCES):
+                    raise
+        return None
+
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for delay in self._delays():
+            slot = self.try_acquire()
+            if slot is not None or self._expired(deadline):
+                return slot
+            time.sleep(delay)
+
+    async def aacquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for delay in self._delays():
+            slot = self.try_acquire()
+            if slot is not None or self._expired(deadline):
+                return slot
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def release(slot):
+        fcntl.flock(slot, fcntl.LOCK_UN)
+        os.close(slot)
+
+    @staticmethod
+    def _delays():
+        # flock() can't wait for "any of N" files, so waiters poll: 2 ms, doubling to 50 ms
+        delay = 0.002
+        while True:
+            yield delay
+            delay = min(delay * 2, 0.05)
+
+    @staticmethod
+    def _expired(deadline):
+        return deadline is not None and time.monotonic() >= deadline
+
+
+class BoundedPool:
+    """
+    At most `workers` jobs run at once on the whole host and `max_queue` more
+    wait for a slot; anything beyond that is rejected immediately with
+    PoolSaturated instead of queueing behind the burst. A waiter that doesn't
+    get a slot within `timeout` is rejected too.
+
+    Under sync serving this bounds how many request workers logins can occupy
+    (running + waiting); keep workers + max_queue below the server's worker
+    count so other requests always find a free one.
+
+    The async path's ProcessPoolExecutor is created lazily per pid, so
+    pre-forked servers don't share it. Each process may keep `workers` idle
+    children, but the host-wide slots cap how many of them run.
+    """
+
+    def __init__(self, workers, max_queue, directory=None, start_method="spawn"):
+        directory = directory or os.path.join(tempfile.gettempdir(), "cpu-pool")
+        self.workers = workers
+        self.start_method = start_method
+        self._admitted = HostSemaphore(directory, "admitted", workers + max_queue)
+        self._running = HostSemaphore(directory, "running", workers)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    context = multiprocessing.get_context(self.start_method)
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _reset(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _admit(self):
+        admitted = self._admitted.try_acquire()
+        if admitted is None:
+            raise PoolSaturated("queue full")
+        return admitted
+
+    def _release(self, admitted, running=None):
+        if running is not None:
+            self._running.release(running)
+        self._admitted.release(admitted)
+
+    def run(self, fn, *args, timeout=None):
+        """
+        Run `fn(*args)` in this thread once a host-wide slot is free. `fn`
+        must return (result, busy_seconds).
+        Returns (result, busy_seconds, wait_seconds).
+        """
+        start = time.perf_counter()
+        admitted = self._admit()
+        running = self._running.acquire(timeout)
+        try:
+            if running is None:
+                raise PoolSaturated("timed out waiting for a worker")
+            result, busy = fn(*args)
+        finally:
+            self._release(admitted, running)
+        return result, busy, max(time.perf_counter() - start - busy, 0.0)
+
+    async def arun(self, fn, *args, timeout=None):
+        """run() for async callers: the job runs in a child process and is awaited."""
+        start = time.perf_counter()
+        admitted = self._admit()
+        try:
+            running = await self._running.aacquire(timeout)
+            if running is None:
+                raise PoolSaturated("timed out waiting for a worker")
+        except BaseException:
+            self._release(admitted)
+            raise
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release(admitted, running)
+            raise
+        # The slots are held until the child finishes, even if this caller is cancelled
+        future.add_done_callback(lambda _: self._release(admitted, running))
+        try:
+            result, busy = await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # A child died (OOM killer ...); start a fresh pool and run on a thread this once
+            logger.error("Process pool broken; recreating it")
+            self._reset()
+            result, busy = await asyncio.to_thread(fn, *args)
+        return result, busy, max(time.perf_counter() - start - busy, 0.0)
+
+    def shutdown(self):
+        self._reset()
@@ -0,0 +1,30 @@
+"""
+DRF answers for exceptions raised below the API layer, which stay plain
+exceptions so the admin, management commands and tasks can handle them too.
+"""
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.views import exception_handler as drf_exception_handler
+from authentication.hashers import HashingOverloaded
+
+
+class ServiceOverloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many sign-in attempts are being processed, try again shortly."
+    default_code = "overloaded"
+
+    def __init__(self, wait=None, detail=None, code=None):
+        super().__init__(detail, code)
+        # DRF's exception handler turns `wait` into a Retry-After header
+        self.wait = wait
+
+
+def as_api_exception(exc):
+    """The APIException a view should answer `exc` with (`exc` itself when it is one)."""
+    if isinstance(exc, HashingOverloaded):
+        return ServiceOverloaded(wait=exc.wait)
+    return exc
+
+
+def exception_handler(exc, context):
+    return drf_exception_handler(as_api_exception(exc), context)
@@ -0,0 +1,46 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher, identify_hasher, make_password, verify_password
+
+
+def _hash(password):
+    # None -> unusable password, like set_unusable_password()
+    return make_password(password)
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hash many passwords in parallel. hashlib.pbkdf2_hmac releases the GIL,
+    so threads give real parallelism without pickling settings into processes.
+    """
+    passwords = list(passwords)
+    workers = workers or getattr(settings, "BULK_HASH_WORKERS", None) or os.cpu_count() or 1
+    if workers <= 1 or len(passwords) <= 1:
+        return [_hash(p) for p in passwords]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_hash, passwords))
+
+
+async def averify_password(password, encoded):
+    """
+    (is_correct, must_update) without blocking the event loop. Django's
+    acheck_password verifies inline; here hashers with an `averify` (the
+    pooled PBKDF2 hasher) are awaited directly, others run on a worker thread.
+    """
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        hasher = None
+    if password is None or not hasattr(hasher, "averify"):
+        return await sync_to_async(verify_password, thread_sensitive=False)(password, encoded)
+
+    preferred = get_hasher("default")
+    hasher_changed = hasher.algorithm != preferred.algorithm
+    must_update = hasher_changed or preferred.must_update(encoded)
+    is_correct = await hasher.averify(password, encoded)
+    if not is_correct and not hasher_changed and must_update:
+        # Same timing for outdated and current hashes, as verify_password() does
+        await sync_to_async(hasher.harden_runtime, thread_sensitive=False)(password, encoded)
+    return is_correct, must_update
@@ -0,0 +1,74 @@
+"""
+Shared outbound HTTP client.
+
+One requests.Session per process: keep-alive connection pools per host
+(HTTP_POOL_MAXSIZE connections each), a default (connect, read) timeout on
+every call, and retries on connection errors for idempotent methods only.
+Created lazily per pid so pre-forked workers don't share sockets.
+"""
+import logging
+import os
+import threading
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class TimeoutSession(requests.Session):
+    """Session whose calls always carry a timeout (requests has none by default)."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def build_session():
+    session = TimeoutSession(
+        timeout=(getattr(settings, "HTTP_CONNECT_TIMEOUT", 3.05), getattr(settings, "HTTP_READ_TIMEOUT", 10))
+    )
+    retries = Retry(
+        total=getattr(settings, "HTTP_RETRIES", 2),
+        backoff_factor=0.2,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,  # never POST
+        status_forcelist=(502, 503, 504),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=getattr(settings, "HTTP_POOL_CONNECTIONS", 10),
+        pool_maxsize=getattr(settings, "HTTP_POOL_MAXSIZE", 20),
+        max_retries=retries,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session = None
+_pid = None
+_lock = threading.Lock()
+
+
+def get_session():
+    global _session, _pid
+    if _session is None or _pid != os.getpid():
+        with _lock:
+            if _session is None or _pid != os.getpid():
+                _session = build_session()
+                _pid = os.getpid()
+    return _session
+
+
+def reset_session():
+    """Drop the shared session (tests, after changing HTTP_* settings)."""
+    global _session
+    with _lock:
+        session, _session = _session, None
+    if session is not None:
+        session.close()
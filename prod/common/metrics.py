@@ -0,0 +1,52 @@
+import os
+import threading
+
+
+class CounterGroup:
+    """
+    Named per-process counters (hits, misses, seconds spent ...).
+    Each gunicorn/celery worker keeps its own values, so the numbers are per worker.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def incr(self, key, amount=1):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+def counters(name):
+    """Return (and register on first use) the counter group called `name`."""
+    group = _groups.get(name)
+    if group is None:
+        with _groups_lock:
+            group = _groups.setdefault(name, CounterGroup(name))
+    return group
+
+
+def hit_rate(hits, misses):
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+def snapshot_all():
+    """All counter groups of the current worker, keyed by group name."""
+    return {
+        "pid": os.getpid(),
+        "counters": {name: group.snapshot() for name, group in list(_groups.items())},
+    }
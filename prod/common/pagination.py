@@ -1,8 +1,24 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from rest_framework.generics import ListAPIView
 
 
 class UserPagination(PageNumberPagination):
     page_size = 2
     page_size_query_param = 'page_size'  # يسمح للمستخدم يحدد page_size
-    max_page_size = 50
\ No newline at end of file
+    max_page_size = 50
+
+
+class UserCursorPagination(CursorPagination):
+    """
+    Keyset pagination on (username, id): every page is an index range scan,
+    no COUNT(*) and no OFFSET, so page N costs the same as page 1.
+    Cursors are DRF's opaque base64 tokens.
+    """
+    page_size = 2
+    page_size_query_param = 'page_size'
+    max_page_size = 50
+    ordering = ('username', 'id')
+
+    def is_first_page(self):
+        # Paging back also lands on page 1, with a cursor; the window tells
+        return not self.has_previous
@@ -1,6 +1,7 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 from django.contrib.contenttypes.models import ContentType
 from accounts.models.role import Role
+from authentication.role_claims import ROLES_CLAIM, ROLES_VERSION_CLAIM, decode_role_claim
 import logging    
 
 from django.contrib.auth.models import Group
@@ -37,6 +38,21 @@ class RoleBasePermission(BasePermission):
             logger.debug("Role cached: %s", role.id)
         return role_data
 
+    def get_user_roles(self, request):
+        """
+        Roles of the requesting user. Taken from the access token's role claim
+        when its version matches the user's roles_version, otherwise from DB/cache.
+        """
+        user = request.user
+        token = request.auth
+        if token is not None and ROLES_CLAIM in token:
+            if token.get(ROLES_VERSION_CLAIM) == user.roles_version:
+                return decode_role_claim(token[ROLES_CLAIM])
+            logger.debug("Stale role claim for %s, falling back to DB", user.pk)
+
+        role_ids = list(user.role.values_list("id", flat=True))
+        return [self.get_role_cached(rid) for rid in role_ids]
+
     def has_permission(self, request, view):
         user = request.user
         logger.debug("Checking permission for: %s", getattr(user, "username", "Anonymous"))
@@ -49,20 +65,21 @@ class RoleBasePermission(BasePermission):
         if user.is_superuser:
             return True
 
-        if not user.is_authenticated or not user.role.exists():
+        if not user.is_authenticated:
             return False
 
         queryset = getattr(view, "queryset", None)
         if queryset is None:
             return False
 
+        # roles from the access token claim (or cache as a fallback)
+        roles = self.get_user_roles(request)
+        if not roles:
+            return False
+
         model_class = queryset.model
         ct_id = ContentType.objects.get_for_model(model_class).id
 
-        # جلب roles من cache
-        role_ids = list(user.role.values_list("id", flat=True))
-        roles = [self.get_role_cached(rid) for rid in role_ids]
-
         for role in roles:
             if role["content_id"] != ct_id:
                 continue
@@ -95,15 +112,13 @@ class RoleBasePermission(BasePermission):
         if user.is_superuser:
             return True
 
-        under_manager = self.is_under_manager(user, obj)
-
         # GET -> السماح لأي user يشوف التفاصيل
         if request.method in ["GET", "HEAD", "OPTIONS"]:
             return True
 
         # PUT/PATCH/DELETE -> لازم يكون تحت المدير
         if request.method in ["PUT", "PATCH", "DELETE"]:
-            return under_manager
+            return self.is_under_manager(user, obj)
 
         return False
 
@@ -112,9 +127,13 @@ class RoleBasePermission(BasePermission):
 
     @staticmethod
     def is_under_manager(user, obj):
+        # Materialized path (see accounts.hierarchy): no queries when it's loaded
+        if hasattr(obj, "is_under") and "manager_path" not in obj.get_deferred_fields():
+            if obj.manager_path or obj.manager_id is None:
+                return obj.is_under(user)
         manager = getattr(obj, "manager", None)
         while manager is not None:
             if manager == user:
                 return True
             manager = getattr(manager, "manager", None)
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,241 @@
+"""
+Sampled request profiling (ProfilingMiddleware), in place of always-on silk.
+
+A request is profiled when it is sampled, or when a staff user asks for it:
+
+- Sampling: PROFILING_SAMPLE_RATE (0..1) for every path, overridden per path
+  prefix by PROFILING_ENDPOINT_RATES (longest prefix wins).
+- On demand: the PROFILING_HEADER header ("X-Profile: 1") from a staff user,
+  authenticated like the API (access-token cookie). These samples also carry
+  cProfile output, and the response gets X-Profile-Id.
+
+A sample is the request's timing, CPU time and SQL query count/time. Samples
+go into a bounded in-memory queue. A background thread writes them to
+ProfileSample in batches, so a profiled request never waits on the database.
+When the queue is full, samples are dropped and counted. A request that is
+not sampled costs one dict lookup and one random() call.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import queue
+import random
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from common.metrics import counters
+
+logger = logging.getLogger(__name__)
+
+stats = counters("profiling")
+
+ID_HEADER = "X-Profile-Id"
+
+
+# ===============================
+# Sampling decisions
+# ===============================
+def parse_rates(value):
+    """'/api/login/=0.05,/api/users/=0.01' -> {'/api/login/': 0.05, '/api/users/': 0.01}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        prefix, _, rate = item.rpartition("=")
+        rates[prefix.strip()] = float(rate)
+    return rates
+
+
+_prefixes = (None, ())
+
+
+def _sorted_prefixes(setting):
+    # PROFILING_ENDPOINT_RATES is a dict, or the env string form parse_rates() reads.
+    # Re-sorted only when the setting object changes (override_settings in tests)
+    global _prefixes
+    if _prefixes[0] is not setting:
+        rates = parse_rates(setting) if isinstance(setting, str) else setting
+        _prefixes = (setting, tuple(sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)))
+    return _prefixes[1]
+
+
+def sample_rate(path):
+    for prefix, rate in _sorted_prefixes(getattr(settings, "PROFILING_ENDPOINT_RATES", {})):
+        if path.startswith(prefix):
+            return rate
+    return getattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+
+
+def sampled(path):
+    rate = sample_rate(path)
+    return rate > 0 and (rate >= 1 or random.random() < rate)
+
+
+def header_key():
+    return "HTTP_" + getattr(settings, "PROFILING_HEADER", "X-Profile").upper().replace("-", "_")
+
+
+def wants_profile(request):
+    return request.META.get(header_key(), "") not in ("", "0")
+
+
+def is_authorized(request):
+    """Staff check for on-demand profiling, authenticated like the API (cookie JWT)."""
+    from authentication import CookieJWTAuthentication
+    try:
+        result = CookieJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    user = result[0] if result else None
+    allowed = bool(user is not None and user.is_active and user.is_staff)
+    if not allowed:
+        stats.incr("unauthorized")
+    return allowed
+
+
+# ===============================
+# Measuring one request
+# ===============================
+class QueryRecorder:
+    """connection.execute_wrapper() hook: counts queries and their time."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def new_profiler():
+    return cProfile.Profile()
+
+
+def profile_text(profiler):
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(getattr(settings, "PROFILING_CPROFILE_LINES", 40))
+    return out.getvalue()
+
+
+def build_sample(request, response, seconds, cpu_seconds=None, recorder=None, profiler=None, forced=False):
+    match = getattr(request, "resolver_match", None)
+    return {
+        "sample_id": uuid.uuid4(),
+        "created_at": timezone.now(),
+        "method": request.method[:10],
+        "path": request.path[:255],
+        "view_name": (match.view_name if match else "")[:200],
+        "status": response.status_code,
+        "duration_ms": round(seconds * 1000, 3),
+        "cpu_ms": None if cpu_seconds is None else round(cpu_seconds * 1000, 3),
+        "queries": recorder.count if recorder else None,
+        "query_ms": round(recorder.seconds * 1000, 3) if recorder else None,
+        "forced": forced,
+        "stats": profile_text(profiler) if profiler else "",
+    }
+
+
+# ===============================
+# Buffered sink
+# ===============================
+def write_samples(samples):
+    from accounts.models import ProfileSample
+    ProfileSample.objects.bulk_create([ProfileSample(**sample) for sample in samples])
+
+
+class BufferedSink:
+    """
+    Bounded queue drained by a daemon thread in batches of `batch_size`, or
+    whatever arrived within `flush_interval` seconds. The thread is started
+    lazily per pid, so pre-forked workers each get their own.
+    """
+
+    def __init__(self, writer, max_size=1000, batch_size=100, flush_interval=2.0):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(max_size)
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def put(self, sample):
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(sample)
+        except queue.Full:
+            stats.incr("dropped")
+            return False
+        stats.incr("queued")
+        return True
+
+    def flush(self):
+        """Block until everything queued so far is written (tests, shutdown)."""
+        self.queue.join()
+
+    def _ensure_thread(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    if self._pid is not None:
+                        # Forked: the parent's queued samples and thread aren't ours
+                        self.queue = queue.Queue(self.queue.maxsize)
+                    threading.Thread(target=self._run, name="profiling-sink", daemon=True).start()
+                    self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        try:
+            self.writer(batch)
+            stats.incr("written", len(batch))
+        except Exception as e:
+            stats.incr("write_errors")
+            logger.warning(f"Dropped {len(batch)} profile samples: {e}")
+        finally:
+            close_old_connections()
+            for _ in batch:
+                self.queue.task_done()
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def get_sink():
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = BufferedSink(
+                    write_samples,
+                    max_size=getattr(settings, "PROFILING_BUFFER_SIZE", 1000),
+                    batch_size=getattr(settings, "PROFILING_BATCH_SIZE", 100),
+                    flush_interval=getattr(settings, "PROFILING_FLUSH_INTERVAL", 2.0),
+                )
+    return _sink
+
+
+def record(sample):
+    stats.incr("forced" if sample["forced"] else "sampled")
+    get_sink().put(sample)
@@ -0,0 +1,144 @@
+"""
+Single-flight execution across workers through the shared cache.
+
+The first caller for a key takes a short lock (cache.add) and runs the work;
+callers arriving meanwhile poll for its result instead of repeating it, and
+callers arriving within `ttl` afterwards get the stored result directly.
+Keep `ttl` short when the result is a credential: anyone presenting the key
+in that window gets it. forget() drops a stored result early.
+When Redis is unavailable every caller simply does the work itself.
+asingle_flight() is the same protocol for async views, on the same keys.
+"""
+import asyncio
+import logging
+import time
+from django.core.cache import cache
+from common import aio_redis
+from common.metrics import counters
+
+logger = logging.getLogger(__name__)
+
+stats = counters("single_flight")
+
+POLL_INTERVAL = 0.02
+
+
+def single_flight(key, fn, ttl=2, wait=3):
+    """
+    Result of `fn()` computed once per `key` within `ttl` seconds.
+    Followers wait up to `wait` seconds for the leader, then compute it themselves.
+    The result must be picklable and not None.
+    """
+    result_key = f"flight:{key}:result"
+    lock_key = f"flight:{key}:lock"
+    try:
+        result = cache.get(result_key)
+        if result is not None:
+            stats.incr("shared")
+            return result
+        leader = cache.add(lock_key, 1, timeout=wait)
+    except Exception as e:
+        logger.warning(f"Single-flight unavailable for {key}: {e}")
+        stats.incr("fallback")
+        return fn()
+
+    if leader:
+        stats.incr("leader")
+        try:
+            result = fn()
+            _store(result_key, result, ttl)
+            return result
+        finally:
+            _release(lock_key)
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        try:
+            result = cache.get(result_key)
+            if result is not None:
+                stats.incr("shared")
+                return result
+            if cache.get(lock_key) is None:
+                # Leader gave up without a result (it raised)
+                break
+        except Exception:
+            break
+    stats.incr("fallback")
+    return fn()
+
+
+def forget(key):
+    """Drop the stored result for `key`."""
+    try:
+        cache.delete(f"flight:{key}:result")
+    except Exception as e:
+        logger.warning(f"Single-flight result not dropped for {key}: {e}")
+
+
+async def aforget(key):
+    try:
+        await aio_redis.cache.delete(f"flight:{key}:result")
+    except Exception as e:
+        logger.warning(f"Single-flight result not dropped for {key}: {e}")
+
+
+def _store(result_key, result, ttl):
+    try:
+        cache.set(result_key, result, timeout=ttl)
+    except Exception as e:
+        logger.warning(f"Single-flight result not stored: {e}")
+
+
+def _release(lock_key):
+    try:
+        cache.delete(lock_key)
+    except Exception as e:
+        logger.warning(f"Single-flight lock not released: {e}")
+
+
+async def asingle_flight(key, fn, ttl=2, wait=3):
+    """single_flight() for async views; `fn` is a coroutine function."""
+    result_key = f"flight:{key}:result"
+    lock_key = f"flight:{key}:lock"
+    acache = aio_redis.cache
+    try:
+        result = await acache.get(result_key)
+        if result is not None:
+            stats.incr("shared")
+            return result
+        leader = await acache.add(lock_key, 1, timeout=wait)
+    except Exception as e:
+        logger.warning(f"Single-flight unavailable for {key}: {e}")
+        stats.incr("fallback")
+        return await fn()
+
+    if leader:
+        stats.incr("leader")
+        try:
+            result = await fn()
+            try:
+                await acache.set(result_key, result, timeout=ttl)
+            except Exception as e:
+                logger.warning(f"Single-flight result not stored: {e}")
+            return result
+        finally:
+            try:
+                await acache.delete(lock_key)
+            except Exception as e:
+                logger.warning(f"Single-flight lock not released: {e}")
+
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        try:
+            result = await acache.get(result_key)
+            if result is not None:
+                stats.incr("shared")
+                return result
+            if await acache.get(lock_key) is None:
+                break
+        except Exception:
+            break
+    stats.incr("fallback")
+    return await fn()
@@ -0,0 +1,283 @@
+"""
+Sliding-window rate limiting for the auth endpoints.
+
+Each limited identity (client IP, hashed account identifier, whole endpoint)
+is one Redis hash holding a counter per fixed window. The request is allowed
+when, for every identity, `previous * (unelapsed share of window) + current`
+stays under the limit. A single Lua script checks every identity and, only if
+all pass, counts the hit: one round trip and no read-modify-write race.
+
+When Redis errors or exceeds THROTTLE_REDIS_TIMEOUT, a circuit breaker
+switches to per-process counters for THROTTLE_BREAKER_SECONDS instead of
+failing the request or waiting on Redis.
+"""
+import hashlib
+import logging
+import math
+import re
+import threading
+import time
+import weakref
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+from common import metrics, aio_redis
+from common.lru import TTLLRUCache
+
+logger = logging.getLogger(__name__)
+stats = metrics.counters("throttling")
+
+SLIDING_WINDOW_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local wait, current = 0, {}
+for i = 1, #KEYS do
+    local window = tonumber(ARGV[2 * i - 1])
+    local limit = tonumber(ARGV[2 * i])
+    local index = math.floor(now / window)
+    local elapsed = now - index * window
+    local counts = redis.call('HMGET', KEYS[i], index, index - 1)
+    local curr = tonumber(counts[1]) or 0
+    local prev = tonumber(counts[2]) or 0
+    if prev * (window - elapsed) / window + curr + 1 > limit then
+        local need
+        if curr + 1 > limit or prev == 0 then
+            need = window - elapsed
+        else
+            need = math.ceil(window * (1 - (limit - 1 - curr) / prev)) - elapsed
+        end
+        wait = math.max(wait, need, 1)
+    end
+    current[i] = index
+end
+if wait > 0 then
+    return wait
+end
+for i = 1, #KEYS do
+    local window = tonumber(ARGV[2 * i - 1])
+    redis.call('HINCRBY', KEYS[i], current[i], 1)
+    redis.call('HDEL', KEYS[i], current[i] - 2)
+    redis.call('PEXPIRE', KEYS[i], window * 2)
+end
+return 0
+"""
+
+_RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([smhd])")
+_PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60000); '5/15m' -> (5, 900000). Returns (limit, window_ms)."""
+    match = _RATE_RE.match(rate or "")
+    if not match:
+        raise ValueError(f"Invalid throttle rate: {rate!r}")
+    limit, multiplier, unit = match.groups()
+    return int(limit), int(multiplier or 1) * _PERIODS[unit] * 1000
+
+
+class LocalWindowStore:
+    """
+    Same algorithm in process memory: dev/test without Redis and breaker fallback.
+    Keys expire two windows after their last hit and the least recently hit
+    go first beyond THROTTLE_LOCAL_MAXSIZE, so a flood of new IPs or usernames
+    during a Redis outage can't grow it without bound.
+    """
+
+    def __init__(self, maxsize=None):
+        # key -> {window index: count}
+        self._windows = TTLLRUCache(maxsize=maxsize or getattr(settings, "THROTTLE_LOCAL_MAXSIZE", 10000))
+        self._lock = threading.Lock()
+
+    def hit(self, limits):
+        now = int(time.time() * 1000)
+        with self._lock:
+            wait, current = 0, []
+            for key, limit, window in limits:
+                index, elapsed = divmod(now, window)
+                counts = self._windows.get(key) or {}
+                curr, prev = counts.get(index, 0), counts.get(index - 1, 0)
+                if prev * (window - elapsed) / window + curr + 1 > limit:
+                    if curr + 1 > limit or prev == 0:
+                        need = window - elapsed
+                    else:
+                        need = math.ceil(window * (1 - (limit - 1 - curr) / prev)) - elapsed
+                    wait = max(wait, need, 1)
+                current.append((key, index, window, counts))
+            if wait:
+                return wait
+            for key, index, window, counts in current:
+                counts = {i: n for i, n in counts.items() if i >= index - 1}
+                counts[index] = counts.get(index, 0) + 1
+                self._windows.set(key, counts, ttl=2 * window / 1000)
+            return 0
+
+    def clear(self):
+        with self._lock:
+            self._windows.clear()
+
+
+class RedisWindowStore:
+    """Runs the script on the `default` cache's Redis with a short dedicated timeout."""
+
+    def __init__(self):
+        self._script = None
+        self._lock = threading.Lock()
+        # redis.asyncio client (one per event loop) -> registered script
+        self._async_scripts = weakref.WeakKeyDictionary()
+
+    def _get_script(self):
+        if self._script is None:
+            with self._lock:
+                if self._script is None:
+                    self._script = self._client().register_script(SLIDING_WINDOW_SCRIPT)
+        return self._script
+
+    @staticmethod
+    def _client():
+        """
+        The cache's django-redis connection settings (URL, OPTIONS password,
+        SSL and pool kwargs ...) on a pool of its own with the throttle timeout.
+        """
+        import redis
+        from django_redis import get_redis_connection
+        pool = get_redis_connection("default").connection_pool
+        timeout = getattr(settings, "THROTTLE_REDIS_TIMEOUT", 0.05)
+        try:
+            pool = pool.__class__(
+                connection_class=pool.connection_class,
+                max_connections=pool.max_connections,
+                **{**pool.connection_kwargs, "socket_timeout": timeout, "socket_connect_timeout": timeout},
+            )
+        except TypeError:
+            # Pools that take other arguments (sentinel): share the cache's pool and its timeouts
+            logger.warning("Throttle store shares the cache connection pool and timeouts")
+        return redis.Redis(connection_pool=pool)
+
+    def hit(self, limits):
+        keys, args = [], []
+        for key, limit, window in limits:
+            keys.append(key)
+            args.extend((window, limit))
+        return int(self._get_script()(keys=keys, args=args))
+
+    async def ahit(self, limits):
+        timeout = getattr(settings, "THROTTLE_REDIS_TIMEOUT", 0.05)
+        client = aio_redis.get_client("default", socket_timeout=timeout, socket_connect_timeout=timeout)
+        script = self._async_scripts.get(client)
+        if script is None:
+            script = self._async_scripts[client] = client.register_script(SLIDING_WINDOW_SCRIPT)
+        keys, args = [], []
+        for key, limit, window in limits:
+            keys.append(key)
+            args.extend((window, limit))
+        return int(await script(keys=keys, args=args))
+
+
+class ThrottleEngine:
+    def __init__(self):
+        self.local = LocalWindowStore()
+        self.redis = RedisWindowStore()
+        self._open_until = 0.0
+
+    def uses_redis(self):
+        return settings.CACHES["default"]["BACKEND"].startswith("django_redis.")
+
+    def hit(self, limits):
+        """limits: [(key, limit, window_ms)]. Returns 0 when allowed, else ms to wait."""
+        if not self.uses_redis() or time.monotonic() < self._open_until:
+            return self.local.hit(limits)
+        try:
+            return self.redis.hit(limits)
+        except Exception as e:
+            # Fail over to per-process limits rather than blocking or failing logins
+            stats.incr("redis_errors")
+            self._open_until = time.monotonic() + getattr(settings, "THROTTLE_BREAKER_SECONDS", 30)
+            logger.warning(f"Throttle store unavailable, using local limits: {e}")
+            return self.local.hit(limits)
+
+    async def ahit(self, limits):
+        """hit() for async views: the Redis round trip doesn't block the event loop."""
+        if not self.uses_redis() or time.monotonic() < self._open_until:
+            return self.local.hit(limits)
+        try:
+            return await self.redis.ahit(limits)
+        except Exception as e:
+            stats.incr("redis_errors")
+            self._open_until = time.monotonic() + getattr(settings, "THROTTLE_BREAKER_SECONDS", 30)
+            logger.warning(f"Throttle store unavailable, using local limits: {e}")
+            return self.local.hit(limits)
+
+
+engine = ThrottleEngine()
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Throttle for views that set `throttle_scope`. Rates come from
+    DEFAULT_THROTTLE_RATES as '<scope>.ip', '<scope>.account' and
+    '<scope>.endpoint'; a missing rate disables that dimension.
+    The account identifier is read from request data (`throttle_account_field`)
+    or a header (`throttle_account_header`) and hashed before use as a key.
+    """
+
+    def get_rates(self):
+        return getattr(settings, "REST_FRAMEWORK", {}).get("DEFAULT_THROTTLE_RATES", {})
+
+    def get_account(self, request, view):
+        field = getattr(view, "throttle_account_field", None)
+        header = getattr(view, "throttle_account_header", None)
+        value = None
+        if field:
+            data = request.data
+            value = data.get(field) if hasattr(data, "get") else None
+        elif header:
+            value = request.headers.get(header)
+        if not value or not isinstance(value, str):
+            return None
+        return hashlib.sha256(value.strip().lower().encode()).hexdigest()[:32]
+
+    def get_limits(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        if not scope:
+            return []
+        rates = self.get_rates()
+        identities = {
+            "ip": self.get_ident(request),
+            "account": self.get_account(request, view),
+            "endpoint": "all",
+        }
+        limits = []
+        for kind, ident in identities.items():
+            rate = rates.get(f"{scope}.{kind}")
+            if rate and ident:
+                limit, window = parse_rate(rate)
+                limits.append((cache.make_key(f"throttle:{scope}:{kind}:{ident}"), limit, window))
+        return limits
+
+    def allow_request(self, request, view):
+        limits = self.get_limits(request, view)
+        if not limits:
+            return True
+        self._wait_ms = engine.hit(limits)
+        if self._wait_ms:
+            stats.incr("throttled")
+            logger.info(f"Throttled {view.__class__.__name__} for {self.get_ident(request)}")
+            return False
+        stats.incr("allowed")
+        return True
+
+    async def aallow_request(self, request, view):
+        """allow_request() for async views (plain Django views with `request.data`)."""
+        limits = self.get_limits(request, view)
+        if not limits:
+            return True
+        self._wait_ms = await engine.ahit(limits)
+        if self._wait_ms:
+            stats.incr("throttled")
+            logger.info(f"Throttled {view.__class__.__name__} for {self.get_ident(request)}")
+            return False
+        stats.incr("allowed")
+        return True
+
+    def wait(self):
+        return math.ceil(self._wait_ms / 1000)
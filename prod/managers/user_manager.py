@@ -32,6 +32,13 @@ class CustomUserManager(BaseUserManager):
         return user
 
 
+    def is_under(self, user_id, manager_id):
+        """Single pk lookup: is `user_id` somewhere below `manager_id`?"""
+        if user_id == manager_id:
+            return False
+        return self.filter(pk=user_id, manager_path__contains=f"/{manager_id}/").exists()
+
+
     def create_superuser(self, email, password=None, **extra_fields):
         from accounts.models import Role, CustomUserModel
 
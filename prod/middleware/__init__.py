@@ -1 +1,3 @@
-from .decryption_jwe import DecryptRefreshMiddleware
\ No newline at end of file
+from .decryption_jwe import DecryptRefreshMiddleware, get_refresh_token
+from .origin_check import APIOriginCheckMiddleware
+from .profiling import ProfilingMiddleware
\ No newline at end of file
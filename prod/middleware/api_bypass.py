@@ -0,0 +1,59 @@
+"""
+Path-partitioned middleware: the browser/session middleware below run for
+/admin/ and the rest of the site, and pass API requests straight through.
+
+API auth is cookie JWT (CookieJWTAuthentication), so sessions, messages,
+request.user, CSRF tokens, APPEND_SLASH redirects and X-Frame-Options are all
+dead weight on API_PATH_PREFIXES. Each class is its Django parent plus a
+prefix check; the admin system checks still see the parents through
+subclassing. API requests get APIOriginCheckMiddleware as their CSRF defence
+instead.
+"""
+from django.conf import settings
+from django.contrib.auth import middleware as auth
+from django.contrib.messages import middleware as messages
+from django.contrib.sessions import middleware as sessions
+from django.middleware import clickjacking, common, csrf
+
+
+def is_api_request(request):
+    return request.path_info.startswith(tuple(getattr(settings, "API_PATH_PREFIXES", ("/api/",))))
+
+
+class APIBypassMixin:
+    """Skips the parent middleware for API requests."""
+
+    def __call__(self, request):
+        if is_api_request(request):
+            # A coroutine in async mode, which the caller awaits
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class SessionMiddleware(APIBypassMixin, sessions.SessionMiddleware):
+    pass
+
+
+class CommonMiddleware(APIBypassMixin, common.CommonMiddleware):
+    pass
+
+
+class CsrfViewMiddleware(APIBypassMixin, csrf.CsrfViewMiddleware):
+
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        # The handler calls process_view hooks itself, outside __call__
+        if is_api_request(request):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class AuthenticationMiddleware(APIBypassMixin, auth.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(APIBypassMixin, messages.MessageMiddleware):
+    pass
+
+
+class XFrameOptionsMiddleware(APIBypassMixin, clickjacking.XFrameOptionsMiddleware):
+    pass
@@ -1,61 +1,109 @@
-from jose import jwe
-from django.conf import settings
-from django.urls import resolve
 import logging
+import threading
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.urls import NoReverseMatch, URLPattern, URLResolver, get_resolver, resolve, reverse
+from authentication import jwe
+
 logger = logging.getLogger(__name__)
-priv = settings.JWE_KEY
-JWE_ALG = "A256KW"
-JWE_ENC = "A256CBC-HS512"
 
+REFRESH_ROUTE_SUFFIX = "_refresh_token"
+
+
+def _refresh_routes(patterns, namespace=""):
+    """Yield 'ns:name' for every route whose url_name ends with REFRESH_ROUTE_SUFFIX."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            ns = f"{namespace}{pattern.namespace}:" if pattern.namespace else namespace
+            yield from _refresh_routes(pattern.url_patterns, ns)
+        elif isinstance(pattern, URLPattern) and pattern.name and pattern.name.endswith(REFRESH_ROUTE_SUFFIX):
+            yield f"{namespace}{pattern.name}"
+
+
+def build_refresh_paths():
+    """
+    (paths, dynamic): the concrete paths of argument-less refresh routes, and
+    whether some refresh route takes arguments (those still need resolve()).
+    """
+    paths, dynamic = set(), False
+    for name in _refresh_routes(get_resolver().url_patterns):
+        try:
+            paths.add(reverse(name))
+        except NoReverseMatch:
+            dynamic = True
+    return frozenset(paths), dynamic
+
+
+def get_refresh_token(request):
+    """
+    Plaintext refresh token of a refresh route, decrypted on the first call
+    and remembered on the request; None elsewhere or when the cookie is bad.
+    """
+    request = getattr(request, "_request", request)  # DRF Request -> HttpRequest
+    if not hasattr(request, "_refresh_token_decrypted"):
+        encrypted = getattr(request, "_refresh_token_encrypted", None)
+        decrypted = jwe.decrypt(encrypted) if encrypted else None
+        if decrypted is not None:
+            logger.debug("Decrypted refresh token set")
+        request._refresh_token_decrypted = decrypted
+    return request._refresh_token_decrypted
 
 
 class DecryptRefreshMiddleware:
+    """
+    Keeps the `refresh_token_<X-Active-User>` cookie on refresh routes, i.e.
+    routes whose url_name ends with `_refresh_token`, for get_refresh_token();
+    everywhere else that returns None.
+
+    Refresh paths are computed once from the URLconf, so other requests cost a
+    set lookup instead of resolve(), and the JWE is only decrypted when a view
+    actually calls get_refresh_token().
+
+    Runs natively under ASGI as well (no thread hop): the per-request work is
+    CPU only.
+    """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self._routes = None
+        self._lock = threading.Lock()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
-    def __call__(self, request):
+    def get_routes(self):
+        if self._routes is None:
+            with self._lock:
+                if self._routes is None:
+                    self._routes = build_refresh_paths()
+                    logger.debug(f"Refresh routes: {sorted(self._routes[0])}")
+        return self._routes
 
+    def is_refresh_route(self, request):
+        paths, dynamic = self.get_routes()
+        if request.path in paths:
+            return True
+        if not dynamic and getattr(request, "urlconf", None) is None:
+            return False
         try:
-            resolve_match = resolve(request.path).url_name
+            url_name = resolve(request.path_info, getattr(request, "urlconf", None)).url_name
         except Exception:
-            
-            return self.get_response(request)
-        try:
-            priv_hex = bytes.fromhex(priv)
+            return False
+        return bool(url_name) and url_name.endswith(REFRESH_ROUTE_SUFFIX)
 
-        except Exception as e:
-            logger.debug(f"error is: {e}")
-            priv_hex = priv.encode()
+    def prepare(self, request):
+        uid = request.headers.get("X-Active-User")
+        if uid and self.is_refresh_route(request):
+            request._refresh_token_encrypted = request.COOKIES.get(f"refresh_token_{uid}")
+        else:
+            request._refresh_token_encrypted = None
 
-        
-        request.refresh_token_decrypted = None
-        
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.prepare(request)
+        return self.get_response(request)
 
-        try:
-            resolve_match = resolve(request.path).url_name
-            logger.debug(f"Url name: {resolve_match}")
-
-            if resolve_match.endswith("_refresh_token"):
-                logger.debug("Inside refresh token resolve")
-
-                uid = request.headers.get("X-Active-User")  # أو request.META.get("HTTP_X_ACTIVE_USER")
-                logger.debug(f"user id {uid}")
-                if uid:
-                    encrypted = request.COOKIES.get(f"refresh_token_{uid}")
-                    logger.debug(f"Encrypted refresh_token: {encrypted}")
-
-                    if encrypted:
-                        try:
-                            decrypted = jwe.decrypt(encrypted.encode(), priv_hex).decode()
-                            request.refresh_token_decrypted = decrypted
-                            logger.debug(f"Decrypted refresh token set ✅")
-                        except Exception as e:
-                            logger.debug("JWE decryption error: %s", e)
-            else:
-                logger.debug("NOt in used this middleware   ")
-
-        except Exception as e:
-            logger.debug("DecryptRefreshMiddleware error: %s", e)
-
-        response = self.get_response(request)
-        return response
+    async def __acall__(self, request):
+        self.prepare(request)
+        return await self.get_response(request)
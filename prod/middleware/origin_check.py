@@ -0,0 +1,89 @@
+import logging
+from urllib.parse import urlsplit
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.http import is_same_domain
+from .api_bypass import is_api_request
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "TRACE"})
+
+
+def _origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}" if parts.scheme and parts.netloc else None
+
+
+class APIOriginCheckMiddleware:
+    """
+    CSRF defence for the cookie-JWT API, in place of CSRF tokens.
+
+    The auth cookies are SameSite=None, so a cross-site form could carry them.
+    Unsafe requests to API_PATH_PREFIXES that send cookies must therefore come
+    from a trusted origin: the site itself, CORS_ALLOWED_ORIGINS or
+    CSRF_TRUSTED_ORIGINS (wildcards as in Django). The origin is taken from
+    Origin, else from Referer. Browsers always send Origin on cross-site unsafe
+    requests; requests with neither header (non-browser clients) are refused
+    unless API_ORIGIN_CHECK_STRICT is turned off.
+
+    It also validates the Host header of every API request against
+    ALLOWED_HOSTS, which CommonMiddleware does for the rest of the site but
+    is bypassed on API_PATH_PREFIXES.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.reject(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.reject(request) or await self.get_response(request)
+
+    def reject(self, request):
+        """403 response when the request fails the check, else None."""
+        if not is_api_request(request):
+            return None
+        # Raises DisallowedHost, which the handler answers with a 400
+        host = request.get_host()
+        if request.method in SAFE_METHODS or not request.COOKIES:
+            return None
+        if request.headers.get("Sec-Fetch-Site") == "same-origin":
+            return None
+
+        origin = request.headers.get("Origin")
+        if origin is None and request.headers.get("Referer"):
+            origin = _origin(request.headers["Referer"]) or "null"
+        if origin is None:
+            if getattr(settings, "API_ORIGIN_CHECK_STRICT", True):
+                return self.forbidden(request, "Origin checking failed - no Origin or Referer.")
+            return None
+        if self.is_trusted(request, host, origin):
+            return None
+        return self.forbidden(request, f"Origin checking failed - {origin} does not match any trusted origins.")
+
+    def is_trusted(self, request, host, origin):
+        if origin == f"{request.scheme}://{host}":
+            return True
+        trusted = [*getattr(settings, "CORS_ALLOWED_ORIGINS", ()), *getattr(settings, "CSRF_TRUSTED_ORIGINS", ())]
+        if origin in trusted:
+            return True
+        parts = urlsplit(origin)
+        for pattern in trusted:
+            if "*" in pattern:
+                allowed = urlsplit(pattern)
+                if allowed.scheme == parts.scheme and is_same_domain(parts.netloc, allowed.netloc.replace("*", "", 1)):
+                    return True
+        return False
+
+    def forbidden(self, request, reason):
+        logger.warning(f"Forbidden (API origin check): {request.path}: {reason}")
+        return JsonResponse({"detail": f"CSRF Failed: {reason}"}, status=403)
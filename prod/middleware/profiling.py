@@ -0,0 +1,63 @@
+import time
+from contextlib import ExitStack
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+from common import profiling
+
+
+class ProfilingMiddleware:
+    """
+    Profiles sampled requests and staff requests sent with the profiling
+    header (see common.profiling). Unsampled requests pass straight through.
+
+    Under ASGI only timing is recorded: the async ORM runs queries on other
+    threads, and cProfile can't follow interleaved coroutines.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        forced = profiling.wants_profile(request) and profiling.is_authorized(request)
+        if not forced and not profiling.sampled(request.path_info):
+            return self.get_response(request)
+
+        recorder = profiling.QueryRecorder()
+        profiler = profiling.new_profiler() if forced else None
+        start, cpu = time.perf_counter(), time.thread_time()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            if profiler:
+                profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                if profiler:
+                    profiler.disable()
+        sample = profiling.build_sample(
+            request, response, time.perf_counter() - start, time.thread_time() - cpu, recorder, profiler, forced
+        )
+        return self.finish(response, sample)
+
+    async def __acall__(self, request):
+        forced = profiling.wants_profile(request) and await sync_to_async(profiling.is_authorized)(request)
+        if not forced and not profiling.sampled(request.path_info):
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        return self.finish(response, profiling.build_sample(request, response, time.perf_counter() - start, forced=forced))
+
+    @staticmethod
+    def finish(response, sample):
+        profiling.record(sample)
+        if sample["forced"]:
+            response[profiling.ID_HEADER] = str(sample["sample_id"])
+        return response
@@ -12,6 +12,14 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # 🔐 SECURITY
 SECRET_KEY = config("SECRET_KEY")
 JWE_KEY = config("JWE_KEY")
+# Backend that encrypts new refresh tokens: "dir+A256GCM" or legacy "A256KW+A256CBC-HS512".
+# Both are always accepted on decrypt (authentication/jwe.py)
+JWE_BACKEND = config("JWE_BACKEND", default="dir+A256GCM")
+# Optional key ring (JSON file managed by `manage.py rotate_jwe_key`): new tokens use its
+# active kid, retired kids decrypt until REFRESH_TOKEN_LIFETIME has passed. Tokens without
+# a kid keep using JWE_KEY. The file is re-checked every JWE_KEYRING_RELOAD seconds
+JWE_KEYRING = config("JWE_KEYRING", default="")
+JWE_KEYRING_RELOAD = config("JWE_KEYRING_RELOAD", cast=int, default=30)
 
 
 
@@ -35,7 +43,6 @@ THIRD_PARTY_APPS = [
     'rest_framework_simplejwt',
     'rest_framework_simplejwt.token_blacklist',
     'phonenumber_field',
-    'silk',
 ]
 
 PROJECT_APPS = [
@@ -45,18 +52,41 @@ PROJECT_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + PROJECT_APPS
 
 # 🧵 MIDDLEWARE
+# Requests under API_PATH_PREFIXES only go through CORS, security headers, the
+# origin check (their CSRF defence) and refresh-cookie decryption; the
+# middleware.api_bypass classes run for /admin/ and everything else.
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'middleware.ProfilingMiddleware',
+    'middleware.APIOriginCheckMiddleware',
+    'middleware.api_bypass.SessionMiddleware',
     'middleware.DecryptRefreshMiddleware',
-    'silk.middleware.SilkyMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'middleware.api_bypass.CommonMiddleware',
+    'middleware.api_bypass.CsrfViewMiddleware',
+    'middleware.api_bypass.AuthenticationMiddleware',
+    'middleware.api_bypass.MessageMiddleware',
+    'middleware.api_bypass.XFrameOptionsMiddleware',
 ]
+API_PATH_PREFIXES = ("/api/",)
+# Refuse unsafe API requests that carry cookies but neither Origin nor Referer
+# (browsers always send one; only scripted clients don't)
+API_ORIGIN_CHECK_STRICT = config("API_ORIGIN_CHECK_STRICT", cast=bool, default=True)
+
+# 🔬 PROFILING (middleware.ProfilingMiddleware, common/profiling.py)
+# Fraction of requests profiled, overridden per path prefix:
+# PROFILING_ENDPOINT_RATES="/api/login/=0.05,/api/users/=0.01" (longest prefix wins)
+PROFILING_SAMPLE_RATE = config("PROFILING_SAMPLE_RATE", cast=float, default=0.0)
+PROFILING_ENDPOINT_RATES = config("PROFILING_ENDPOINT_RATES", default="")
+# Staff requests with this header set are always profiled, with cProfile output
+PROFILING_HEADER = config("PROFILING_HEADER", default="X-Profile")
+PROFILING_CPROFILE_LINES = 40
+# Samples are written to ProfileSample by a background thread; a full buffer drops them
+PROFILING_BUFFER_SIZE = config("PROFILING_BUFFER_SIZE", cast=int, default=1000)
+PROFILING_BATCH_SIZE = 100
+PROFILING_FLUSH_INTERVAL = 2.0
+# Silk records every request; settings_dev turns it on, never in production
+SILK_ENABLED = False
 
 # 🔗 URL / WSGI
 ROOT_URLCONF = 'prod.urls'
@@ -98,7 +128,8 @@ AUTH_PASSWORD_VALIDATORS = [
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 #USE_I18N = True
-#USE_TZ = True
+# Django 5.0 flipped the default to True; datetimes here are naive UTC (as on 4.2)
+USE_TZ = False
 
 # 📁 STATIC & MEDIA
 STATIC_URL = '/static/'
@@ -108,13 +139,25 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 # 🔐 AUTH
 AUTH_USER_MODEL = 'accounts.CustomUserModel'
+# pbkdf2_sha256 verification offloaded to a bounded process pool (authentication/hashers.py).
+# It replaces the stock PBKDF2PasswordHasher (same algorithm name and format): Django maps
+# algorithm -> hasher by name, so listing both would let the stock one win
+PASSWORD_HASHERS = [
+    'authentication.hashers.PooledPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+# One query (username OR iexact email) and one password hash per login attempt
 AUTHENTICATION_BACKENDS = [
-    'django.contrib.auth.backends.ModelBackend',
-    'accounts.authentication_email.EmailAuthBackend',
+    'accounts.authentication_email.UsernameOrEmailBackend',
 ]
 
 # 🔥 DRF + JWT
 REST_FRAMEWORK = {
+    # Maps HashingOverloaded (password hash pool full) to a 503 + Retry-After
+    'EXCEPTION_HANDLER': 'common.exceptions.exception_handler',
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'authentication.CookieJWTAuthentication',
     ),
@@ -125,6 +168,19 @@ REST_FRAMEWORK = {
         "DEFAULT_THROTTLE_RATES": {
         "user": "50/min",  
         "anon": "20/min",  
+        # common.throttling.SlidingWindowThrottle: <scope>.ip / .account / .endpoint
+        "login.ip": config("THROTTLE_LOGIN_IP", default="20/min"),
+        "login.account": config("THROTTLE_LOGIN_ACCOUNT", default="5/min"),
+        "login.endpoint": config("THROTTLE_LOGIN_ENDPOINT", default="3000/min"),
+        "signup.ip": config("THROTTLE_SIGNUP_IP", default="20/h"),
+        "signup.account": config("THROTTLE_SIGNUP_ACCOUNT", default="3/h"),
+        "signup.endpoint": config("THROTTLE_SIGNUP_ENDPOINT", default="300/min"),
+        "reset.ip": config("THROTTLE_RESET_IP", default="10/15m"),
+        "reset.account": config("THROTTLE_RESET_ACCOUNT", default="3/h"),
+        "reset.endpoint": config("THROTTLE_RESET_ENDPOINT", default="300/min"),
+        "refresh.ip": config("THROTTLE_REFRESH_IP", default="120/min"),
+        "refresh.account": config("THROTTLE_REFRESH_ACCOUNT", default="30/min"),
+        "refresh.endpoint": config("THROTTLE_REFRESH_ENDPOINT", default="20000/min"),
     }
 }
 
@@ -153,6 +209,13 @@ FRONTEND_URL = config('FRONTEND_URL', default="http://localhost:3000")
 GOOGLE_CLIENT_ID = config("GOOGLE_CLIENT_ID", default="")
 GOOGLE_CLIENT_SECRET = config("GOOGLE_CLIENT_SECRET", default="")
 GOOGLE_REDIRECT_URI = config("GOOGLE_REDIRECT_URI", default="")
+# Endpoints are overridable so the flow can run against a stand-in server
+GOOGLE_AUTH_URL = config("GOOGLE_AUTH_URL", default="https://accounts.google.com/o/oauth2/v2/auth")
+GOOGLE_TOKEN_URL = config("GOOGLE_TOKEN_URL", default="https://oauth2.googleapis.com/token")
+GOOGLE_JWKS_URL = config("GOOGLE_JWKS_URL", default="https://www.googleapis.com/oauth2/v3/certs")
+GOOGLE_ISSUERS = ("https://accounts.google.com", "accounts.google.com")
+# JWKS lifetime when the response carries no Cache-Control max-age
+GOOGLE_JWKS_TTL = config("GOOGLE_JWKS_TTL", cast=int, default=3600)
 
 
 
@@ -169,3 +232,102 @@ CACHES = {
         }
     }
 }
+
+# Refresh-token state gets its own Redis (maxmemory-policy noeviction) when
+# TOKEN_STATE_BACKEND=redis; the `default` cache may evict blacklist entries
+TOKEN_STATE_REDIS_URL = config("TOKEN_STATE_REDIS_URL", default="")
+if TOKEN_STATE_REDIS_URL:
+    CACHES["token_state"] = {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": TOKEN_STATE_REDIS_URL,
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        }
+    }
+
+# Two-tier user snapshot cache used by CookieJWTAuthentication
+# (per-process LRU in front of the redis `default` cache)
+USER_CACHE_ENABLED = config("USER_CACHE_ENABLED", cast=bool, default=True)
+USER_CACHE_LOCAL_TTL = config("USER_CACHE_LOCAL_TTL", cast=float, default=5)
+USER_CACHE_LOCAL_MAXSIZE = config("USER_CACHE_LOCAL_MAXSIZE", cast=int, default=1024)
+USER_CACHE_TIMEOUT = config("USER_CACHE_TIMEOUT", cast=int, default=300)
+
+# UserViewSet list pagination: "cursor" (keyset on username,id) or "page" (legacy)
+USER_LIST_PAGINATION = config("USER_LIST_PAGINATION", default="cursor")
+
+# Bulk provisioning (UserViewSet.bulk / provision_users command)
+BULK_PROVISION_MAX_ROWS = config("BULK_PROVISION_MAX_ROWS", cast=int, default=5000)
+BULK_HASH_WORKERS = config("BULK_HASH_WORKERS", cast=int, default=0)  # 0 = cpu count
+
+# Password verification admission, shared by every server process on the host (lock
+# files in POOL_DIR, default <tmp>/cpu-pool): WORKERS hashes run at once (at most the
+# core count), MAX_QUEUE more may wait; beyond that (or after TIMEOUT seconds of waiting)
+# login answers 503 with Retry-After. Under gunicorn keep WORKERS + MAX_QUEUE below
+# --workers so logins can't occupy every worker. 0 workers = inline, unbounded
+PASSWORD_HASH_POOL_WORKERS = config("PASSWORD_HASH_POOL_WORKERS", cast=int, default=2)
+PASSWORD_HASH_POOL_MAX_QUEUE = config("PASSWORD_HASH_POOL_MAX_QUEUE", cast=int, default=4)
+PASSWORD_HASH_POOL_DIR = config("PASSWORD_HASH_POOL_DIR", default="")
+PASSWORD_HASH_POOL_TIMEOUT = config("PASSWORD_HASH_POOL_TIMEOUT", cast=float, default=5)
+PASSWORD_HASH_POOL_RETRY_AFTER = config("PASSWORD_HASH_POOL_RETRY_AFTER", cast=int, default=2)
+PASSWORD_HASH_POOL_START_METHOD = config("PASSWORD_HASH_POOL_START_METHOD", default="spawn")
+
+# Throttle store: seconds to wait on Redis before falling back to per-process
+# counters, how long to stay on the fallback, and how many keys it may hold
+THROTTLE_REDIS_TIMEOUT = config("THROTTLE_REDIS_TIMEOUT", cast=float, default=0.05)
+THROTTLE_BREAKER_SECONDS = config("THROTTLE_BREAKER_SECONDS", cast=int, default=30)
+THROTTLE_LOCAL_MAXSIZE = config("THROTTLE_LOCAL_MAXSIZE", cast=int, default=10000)
+
+# Per-process cache of verified access tokens (CookieJWTAuthentication); entries
+# expire at the token's exp, or after MAX_TTL seconds, whichever comes first
+ACCESS_TOKEN_CACHE_ENABLED = config("ACCESS_TOKEN_CACHE_ENABLED", cast=bool, default=True)
+ACCESS_TOKEN_CACHE_MAXSIZE = config("ACCESS_TOKEN_CACHE_MAXSIZE", cast=int, default=4096)
+ACCESS_TOKEN_CACHE_MAX_TTL = config("ACCESS_TOKEN_CACHE_MAX_TTL", cast=float, default=300)
+
+# Refresh-token state (outstanding / blacklisted jti): "db" (simplejwt tables) or "redis"
+# (TTL'd keys in the TOKEN_STATE_CACHE cache; needs a non-evicting Redis, so the
+# system checks refuse `default` or a cache on the same server as `default`).
+# Migrate existing rows with `manage.py migrate_token_state` before switching
+TOKEN_STATE_BACKEND = config("TOKEN_STATE_BACKEND", default="db")
+TOKEN_STATE_CACHE = config("TOKEN_STATE_CACHE", default="token_state")
+
+# Expired token purge (cleanup_blacklisted_tokens task / purge_tokens command)
+TOKEN_PURGE_BATCH_SIZE = config("TOKEN_PURGE_BATCH_SIZE", cast=int, default=1000)
+TOKEN_PURGE_PAUSE = config("TOKEN_PURGE_PAUSE", cast=float, default=0.05)
+TOKEN_PURGE_MAX_SECONDS = config("TOKEN_PURGE_MAX_SECONDS", cast=int, default=300)
+
+# Concurrent refreshes of one refresh token (several tabs) share one minted
+# result; followers wait up to WAIT seconds for the leader. The result stays
+# shared for TTL seconds, so a replay of the just-rotated token within TTL also
+# gets the new pair: keep it to the few seconds tabs need. Logout drops the
+# result shared for the presented token; one shared for the token it was rotated
+# from, or stored by a refresh still minting when the logout lands, lives out its
+# TTL. Keys carry the user's token_epoch, so revoke_all_sessions makes every
+# earlier result unreachable (no keyspace scan)
+REFRESH_SINGLE_FLIGHT_TTL = config("REFRESH_SINGLE_FLIGHT_TTL", cast=float, default=2)
+REFRESH_SINGLE_FLIGHT_WAIT = config("REFRESH_SINGLE_FLIGHT_WAIT", cast=float, default=3)
+
+# Access tokens live ACCESS_TOKEN_LIFETIME shortened by a random fraction up to
+# JITTER; auth responses carry X-Token-Expires-In / X-Token-Refresh-After, the
+# latter drawn from [MIN, MAX] of the remaining lifetime
+ACCESS_TOKEN_LIFETIME_JITTER = config("ACCESS_TOKEN_LIFETIME_JITTER", cast=float, default=0.1)
+TOKEN_REFRESH_AFTER_MIN = config("TOKEN_REFRESH_AFTER_MIN", cast=float, default=0.7)
+TOKEN_REFRESH_AFTER_MAX = config("TOKEN_REFRESH_AFTER_MAX", cast=float, default=0.9)
+# Browsers only let scripts read these headers on cross-origin responses when exposed
+CORS_EXPOSE_HEADERS = ["X-Token-Expires-In", "X-Token-Refresh-After"]
+
+# Google login: signed, short-lived OAuth state cookie (no session involved)
+OAUTH_STATE_COOKIE = config("OAUTH_STATE_COOKIE", default="google_oauth_state")
+OAUTH_STATE_MAX_AGE = config("OAUTH_STATE_MAX_AGE", cast=int, default=600)
+
+# Shared outbound HTTP session (common.http): (connect, read) timeouts,
+# keep-alive pool size per host, retries for idempotent requests
+HTTP_CONNECT_TIMEOUT = config("HTTP_CONNECT_TIMEOUT", cast=float, default=3.05)
+HTTP_READ_TIMEOUT = config("HTTP_READ_TIMEOUT", cast=float, default=10)
+HTTP_POOL_CONNECTIONS = config("HTTP_POOL_CONNECTIONS", cast=int, default=10)
+HTTP_POOL_MAXSIZE = config("HTTP_POOL_MAXSIZE", cast=int, default=20)
+HTTP_RETRIES = config("HTTP_RETRIES", cast=int, default=2)
+
+# Serve login / refresh / logout / Google callback from the async views
+# (accounts.api.async_views) on their usual paths, instead of the DRF views; for
+# ASGI (uvicorn) deployments. Off, the async views aren't routed at all
+ASYNC_AUTH_VIEWS = config("ASYNC_AUTH_VIEWS", cast=bool, default=False)
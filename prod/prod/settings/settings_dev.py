@@ -1,7 +1,19 @@
+import sys
 from .settings_base import *
 
 DEBUG = True
 ALLOWED_HOSTS = ["*"]
+# curl / Postman / the test client send cookies without Origin
+API_ORIGIN_CHECK_STRICT = config("API_ORIGIN_CHECK_STRICT", cast=bool, default=False)
+
+# Full silk request recording (API included), for local debugging only. Off under
+# the test runners: silk keeps the last request in a thread-local and EXPLAINs later queries
+TESTING = "pytest" in sys.modules or sys.argv[1:2] == ["test"]
+SILK_ENABLED = config("SILK_ENABLED", cast=bool, default=not TESTING)
+if SILK_ENABLED:
+    INSTALLED_APPS = INSTALLED_APPS + ['silk']
+    MIDDLEWARE = MIDDLEWARE[:]
+    MIDDLEWARE.insert(MIDDLEWARE.index('middleware.DecryptRefreshMiddleware') + 1, 'silk.middleware.SilkyMiddleware')
 
 
 DATABASES = {
@@ -23,9 +23,11 @@ urlpatterns = [
     path('api/', include("accounts.urls" , namespace="accounts")),
     path('admin/', admin.site.urls),
     #path('__debug__/', include(debug_toolbar.urls)),
-    path('silk/', include('silk.urls', namespace='silk')),
 ]
 
+if getattr(settings, "SILK_ENABLED", False):
+    urlpatterns.append(path('silk/', include('silk.urls', namespace='silk')))
+
 
 
 